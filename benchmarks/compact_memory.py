@@ -0,0 +1,36 @@
+"""Memory per word of Parsr's dicts (as loaded from JSON) vs. `pd3f.compact.CompactPage` (measured with `tracemalloc`).
+
+Usage: python benchmarks/compact_memory.py [--pages 200]
+"""
+
+import argparse
+import json
+import tracemalloc
+
+from pd3f.compact import CompactPage
+
+from json_memory import synthetic_doc
+
+
+def allocated(make):
+    tracemalloc.start()
+    result = make()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    text = json.dumps(synthetic_doc(args.pages))
+    doc, dict_size = allocated(lambda: json.loads(text))
+    pages, compact_size = allocated(
+        lambda: [CompactPage(p, idx) for idx, p in enumerate(doc["pages"])]
+    )
+    n_words = sum(len(p.word_texts) for p in pages)
+    print(f"{n_words} words")
+    print(f"dicts: {dict_size / n_words:.0f} bytes per word")
+    print(f"compact: {compact_size / n_words:.0f} bytes per word")
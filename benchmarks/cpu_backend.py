@@ -0,0 +1,48 @@
+"""Compare the scores and the speed of `FlairScorer` and `TorchScriptScorer`.
+
+Scores the candidates of `newline_or_not` for consecutive lines of a text file.
+
+Usage: python benchmarks/cpu_backend.py text.txt [--lang multi-v0-fast] [--threads 1]
+"""
+
+import argparse
+import time
+
+from pd3f.cpu_backend import TorchScriptScorer
+from pd3f.scorer_registry import flair_scorer, parse_model_name
+
+
+def candidates(path):
+    lines = [l.strip() for l in open(path) if len(l.strip()) > 1]
+    return [[l1, l2, l1 + " " + l2] for l1, l2 in zip(lines, lines[1:])]
+
+
+def timed(scorer, groups):
+    start = time.perf_counter()
+    scores = [scorer.score(texts) for texts in groups]
+    return scores, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("text")
+    parser.add_argument("--lang", default="multi-v0-fast")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    groups = candidates(args.text)
+    flair = flair_scorer(*parse_model_name(args.lang))
+    start = time.perf_counter()
+    compiled = TorchScriptScorer(flair, num_threads=args.threads)
+    compile_time = time.perf_counter() - start
+
+    expected, flair_time = timed(flair, groups)
+    scores, compiled_time = timed(compiled, groups)
+
+    max_diff = max(
+        abs(a - b) / b for xs, ys in zip(scores, expected) for a, b in zip(xs, ys)
+    )
+    print(f"{len(groups)} calls, compiled in {compile_time:.2f}s")
+    print(f"flair:       {flair_time:.2f}s")
+    print(f"torchscript: {compiled_time:.2f}s")
+    print(f"max relative difference of the scores: {max_diff:.2e}")
@@ -0,0 +1,69 @@
+"""Remove duplicated headers: all pairs (`doc_info.remove_duplicates`) vs. the candidates of `pd3f.dedup.DuplicateIndex`.
+
+Every page has a running title (chapter name and page number) at the top and the page number at the bottom.
+The language model is replaced with the length of the text, so only the comparisons are measured.
+
+Usage: python benchmarks/dedup.py [--pages 300]
+"""
+
+import argparse
+import random
+import time
+
+import pd3f.doc_info
+from pd3f.compact import CompactPage
+from pd3f.dedup import remove_duplicates_indexed
+from pd3f.doc_info import remove_duplicates
+
+WORDS = "der die das und ist ein eine Vertrag nicht mit von auf Haus Ende klein Test Fall Methode".split()
+
+
+def group(ids, words, left, top):
+    content = []
+    for w in words:
+        box = {"l": left, "t": top, "w": 6 * len(w), "h": 12}
+        content.append({"id": next(ids), "type": "word", "content": w, "font": 1, "box": box})
+        left += 6 * len(w) + 4
+    box = {"l": content[0]["box"]["l"], "t": top, "w": left - content[0]["box"]["l"], "h": 12}
+    line = {"id": next(ids), "type": "line", "content": content, "box": box}
+    return {"id": next(ids), "type": "paragraph", "content": [line], "properties": {}, "box": box}
+
+
+def make_headers_footers(n_pages, seed=0):
+    rnd = random.Random(seed)
+    ids = iter(range(1, 1 << 30))
+    headers, footers = [], []
+    for idx_page in range(n_pages):
+        title = [rnd.choice(WORDS) for _ in range(rnd.randint(2, 8))]
+        page = CompactPage(
+            {
+                "elements": [
+                    group(ids, ["Kapitel", str(idx_page // 10 + 1)] + title, 50, 10),
+                    group(ids, [str(idx_page + 1)], 300, 780),
+                ]
+            },
+            idx_page,
+        )
+        headers.append(page.blocks[:1])
+        footers.append(page.blocks[1:])
+    return headers, footers
+
+
+def fake_score(text, lang):
+    return len(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    args = parser.parse_args()
+
+    pd3f.doc_info.single_score = fake_score
+    headers, footers = make_headers_footers(args.pages)
+
+    results = []
+    for f in (remove_duplicates, remove_duplicates_indexed):
+        start = time.perf_counter()
+        results.append([f(headers, "de"), f(footers, "de")])
+        print(f"{f.__name__}: {time.perf_counter() - start:.3f}s")
+    assert results[0] == results[1]
@@ -0,0 +1,81 @@
+"""Joining paragraphs in `DocumentOutput`: linear scans of a list vs. the dict of the elements.
+
+The language model is replaced with a stub that joins every other pair of paragraphs,
+so only the bookkeeping of `DocumentOutput` is measured.
+
+Usage: python benchmarks/doc_output.py [--elements 2500 5000 10000 20000]
+"""
+
+import argparse
+import time
+
+import pd3f.doc_output
+from pd3f.doc_output import DocumentOutput, Element
+
+PER_PAGE = 20
+
+
+class ListDocumentOutput(DocumentOutput):
+    """The elements in a list, looked up and replaced with linear scans (as before)
+    """
+
+    def __init__(self, data, header, footer, order, lang):
+        super().__init__(data, header, footer, order, lang)
+        self.items = list(data)
+
+    @property
+    def data(self):
+        return self.items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def get_element(self, elem_id):
+        if elem_id in self.merged_elements:
+            elem_id = self.merged_elements[elem_id]
+        result = list(filter(lambda x: x.id == elem_id, self))
+        if len(result) == 1:
+            return result[0]
+        return None
+
+    def merge(self, element, next_element, fixed):
+        self.items[self.items.index(element)] = fixed
+        self.items.remove(next_element)
+        self.merged_elements[next_element.id] = element.id
+
+
+def join_every_other(e1, e2, lang):
+    if e2.id % 2 == 1:
+        return Element("body", e1.lines + e2.lines, e1.id, idx_page=e1.idx_page)
+    return None
+
+
+def make_doc(cls, n):
+    # lowercase, so `reverse_paragraph` tries to join the paragraphs
+    data = [Element("body", [["word"]], i, idx_page=i // PER_PAGE) for i in range(n)]
+    order = [list(range(i, min(i + PER_PAGE, n))) for i in range(0, n, PER_PAGE)]
+    return cls(data, None, None, order, "en")
+
+
+def run(doc):
+    doc.reverse_page_break()
+    doc.reverse_paragraph()
+    return [len(x) for x in doc]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--elements", type=int, nargs="+", default=[2500, 5000, 10000, 20000])
+    args = parser.parse_args()
+
+    pd3f.doc_output.is_split_paragraph = join_every_other
+    for n in args.elements:
+        results = []
+        line = f"{n} elements:"
+        for cls in (ListDocumentOutput, DocumentOutput):
+            doc = make_doc(cls, n)
+            start = time.perf_counter()
+            results.append(run(doc))
+            line += f" {cls.__name__} {time.perf_counter() - start:.3f}s"
+        print(line)
+        assert results[0] == results[1]
@@ -0,0 +1,48 @@
+"""Similarity of bounding boxes: shapely vs. plain arithmetic vs. NumPy (one box against many).
+
+Requires shapely for the comparison with the previous implementation.
+
+Usage: python benchmarks/geometry.py [--boxes 10000]
+"""
+
+import argparse
+import random
+import time
+
+from pd3f.geometry import bbox, sim_bbox, sim_bounds_many
+
+
+def shapely_sim_bbox(e1, e2):
+    from shapely.geometry import MultiPoint, box
+
+    b1 = box(*MultiPoint(e1).convex_hull.bounds)
+    b2 = box(*MultiPoint(e2).convex_hull.bounds)
+    return b1.intersection(b2).area / max(b1.area, b2.area)
+
+
+def corners(rnd):
+    t, l = rnd.uniform(0, 800), rnd.uniform(0, 600)
+    h, w = rnd.uniform(1, 40), rnd.uniform(1, 400)
+    return [(t, l), (t + h, l), (t, l + w), (t + h, l + w)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boxes", type=int, default=10000)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    points = [corners(rnd) for _ in range(args.boxes)]
+    query = points[0]
+
+    results = []
+    for f in (shapely_sim_bbox, sim_bbox):
+        start = time.perf_counter()
+        results.append([f(query, x) for x in points])
+        print(f"{f.__name__}: {time.perf_counter() - start:.3f}s")
+
+    start = time.perf_counter()
+    boxes = [bbox(x) for x in points]
+    results.append(sim_bounds_many(bbox(query), boxes).tolist())
+    print(f"sim_bounds_many: {time.perf_counter() - start:.3f}s (including the bounding boxes)")
+    assert results[0] == results[1] == results[2]
@@ -0,0 +1,36 @@
+"""Measure how long `import pd3f` takes in a fresh interpreter.
+
+Usage: python benchmarks/import_time.py [--runs 10] [--max-seconds 1.0]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def import_time():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import pd3f"], check=True)
+    return time.perf_counter() - start
+
+
+def baseline_time():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    baseline = statistics.median(baseline_time() for _ in range(args.runs))
+    result = statistics.median(import_time() for _ in range(args.runs)) - baseline
+    print(f"import pd3f: {result:.3f}s (median of {args.runs} runs)")
+
+    if args.max_seconds is not None and result > args.max_seconds:
+        sys.exit(f"import takes longer than {args.max_seconds}s")
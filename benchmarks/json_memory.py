@@ -0,0 +1,120 @@
+"""Peak memory (RSS) of reading Parsr's JSON at once vs. page by page, and of `Export` vs. `BoundedExport`.
+
+Each variant runs in its own process. Without an input file, synthetic documents of the given numbers of pages
+are generated, so it shows how the memory grows with the size of the document. The language models are replaced
+by a cheap scorer, only the memory of the document is measured.
+
+Usage: python benchmarks/json_memory.py [parsr_output.json] [--pages 500 2000]
+"""
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+
+def synthetic_doc(n_pages):
+    ids = iter(range(10 ** 9))
+
+    def word(x, t):
+        return {"id": next(ids), "type": "word", "content": "Wort", "font": 1,
+                "box": {"l": x, "t": t, "w": 30, "h": 12}}
+
+    def line(t):
+        return {"id": next(ids), "type": "line", "box": {"l": 50, "t": t, "w": 400, "h": 12},
+                "content": [word(50 + 35 * i, t) for i in range(12)]}
+
+    def paragraph(t):
+        return {"id": next(ids), "type": "paragraph", "properties": {},
+                "box": {"l": 50, "t": t, "w": 400, "h": 140},
+                "content": [line(t + 14 * i) for i in range(10)]}
+
+    return {
+        "version": "0",
+        "fonts": [{"id": 1, "size": 12, "sizeUnit": "px"}],
+        "pages": [
+            {"pageNumber": p + 1, "elements": [paragraph(50 + 150 * i) for i in range(5)]}
+            for p in range(n_pages)
+        ],
+    }
+
+
+def rss_mb(field):
+    """`VmRSS` (current) or `VmHWM` (peak) of this process
+    """
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1]) / 1024
+
+
+def reset_peak_rss():
+    """Set the peak to the current RSS (Linux), e.g. the imports of the language models have a higher peak
+    """
+    Path("/proc/self/clear_refs").write_text("5")
+
+
+def use_length_scorer():
+    from dehyphen.dehyphen import Scorer
+
+    from pd3f import dehyphen_wrapper
+
+    class LengthScorer(Scorer):
+        def score(self, texts):
+            return [float(len(t)) for t in texts]
+
+    dehyphen_wrapper.registry.factory = lambda lang, fast: LengthScorer()
+    dehyphen_wrapper.set_score_store(None)
+
+
+def measure(mode, path):
+    if mode in ("export", "bounded"):
+        from pd3f import BoundedExport, Export
+
+        use_length_scorer()
+
+    gc.collect()
+    reset_peak_rss()
+    before = rss_mb("VmRSS")
+    if mode == "read_text":
+        data = json.loads(Path(path).read_text())
+        n_pages = len(data["pages"])
+    elif mode == "stream":
+        from pd3f.parsr_json import load_parsr_json
+
+        n_pages = len(load_parsr_json(path)["pages"])
+    elif mode == "export":
+        n_pages = len(Export(str(path)).info.order_page)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export = BoundedExport(str(path))
+            export.save_text(Path(tmp_dir) / "text.txt")
+        n_pages = len(export.info.order_page)
+    print(f"{mode}: {n_pages} pages, peak RSS +{rss_mb('VmHWM') - before:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_json", nargs="?")
+    parser.add_argument("--pages", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.input_json)
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = [args.input_json]
+        if args.input_json is None:
+            paths = []
+            for n_pages in args.pages:
+                path = Path(tmp_dir) / f"data_{n_pages}.json"
+                path.write_text(json.dumps(synthetic_doc(n_pages)))
+                paths.append(path)
+        for path in paths:
+            print(f"file size: {Path(path).stat().st_size / 1e6:.0f} MB")
+            for mode in ("read_text", "stream", "export", "bounded"):
+                subprocess.run([sys.executable, __file__, str(path), "--mode", mode], check=True)
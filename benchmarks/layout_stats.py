@@ -0,0 +1,66 @@
+"""Layout statistics of `DocumentInfo`: per-element loops and `Counter` expansion vs. NumPy arrays and weighted medians.
+
+Both work on `pd3f.compact.CompactPage`s.
+
+Usage: python benchmarks/layout_stats.py [--pages 500]
+"""
+
+import argparse
+import time
+from collections import Counter
+from statistics import median
+
+import numpy as np
+
+from pd3f.compact import CompactPage
+from pd3f.doc_info import calc_line_space, calc_word_space, median_from_counter
+from pd3f.layout_stats import count, line_boxes, line_spaces, word_spaces
+
+from json_memory import synthetic_doc
+
+
+def expanded_median(c):
+    data = []
+    for value, n in c.most_common():
+        data += [value] * n
+    return median(data)
+
+
+def with_loops(pages):
+    widths, lineheights, word_space = Counter(), Counter(), Counter()
+    for page in pages:
+        for e in page.blocks:
+            lis = e.lines
+            widths.update([x.w for x in lis])
+            lineheights.update(calc_line_space(lis))
+            word_space.update(calc_word_space(lis))
+    return [expanded_median(c) for c in (widths, lineheights, word_space)]
+
+
+def with_arrays(pages):
+    widths, lineheights, word_space = Counter(), Counter(), Counter()
+    for page in pages:
+        boxes = line_boxes(page)
+        widths.update(count(boxes[:, 2]))
+        lineheights.update(count(line_spaces(boxes, np.asarray(page.line_blocks))))
+        word_space.update(count(word_spaces(page)))
+    return [median_from_counter(c) for c in (widths, lineheights, word_space)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    args = parser.parse_args()
+
+    pages = [CompactPage(p, idx) for idx, p in enumerate(synthetic_doc(args.pages)["pages"])]
+
+    results = []
+    for f in (with_loops, with_arrays):
+        times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            result = f(pages)
+            times.append(time.perf_counter() - start)
+        results.append(result)
+        print(f"{f.__name__}: {min(times):.3f}s (best of 5)")
+    assert results[0] == results[1]
@@ -0,0 +1,37 @@
+"""Compare scoring with and without re-using the LM state of shared prefixes.
+
+Usage: python benchmarks/prefix_reuse.py parsr_output.json [--lang multi-v0-fast]
+"""
+
+import argparse
+import time
+
+from pd3f import Export, dehyphen_wrapper
+
+
+def export_time(input_json, lang):
+    # measure the language model, not the caches
+    dehyphen_wrapper.memo.clear()
+    start = time.perf_counter()
+    Export(input_json, lang=lang)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_json")
+    parser.add_argument("--lang", default="multi-v0-fast")
+    args = parser.parse_args()
+
+    dehyphen_wrapper.set_score_store(None)
+    dehyphen_wrapper.preload_scorers(args.lang)
+    baseline = export_time(args.input_json, args.lang)
+
+    dehyphen_wrapper.enable_prefix_scoring()
+    scorer = dehyphen_wrapper.get_scorer(args.lang)
+    with_prefixes = export_time(args.input_json, args.lang)
+
+    print(f"chars fed without re-use: {scorer.chars_total}")
+    print(f"chars fed with re-use:    {scorer.chars_fed}")
+    print(f"saved: {scorer.saved_share():.1%}")
+    print(f"time: {baseline:.2f}s -> {with_prefixes:.2f}s")
@@ -3,7 +3,8 @@ __version__ = "0.4.0"
 import logging
 from logging import NullHandler
 
-from .export import Export, extract
-from .parsr_wrapper import run_parsr
+from .bounded_export import BoundedExport
+from .export import Export, extract, extract_many
+from .parsr_wrapper import run_parsr, run_parsr_many
 
 logging.getLogger(__name__).addHandler(NullHandler())
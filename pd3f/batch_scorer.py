@@ -0,0 +1,145 @@
+"""Score the language model candidates of a whole document in batches.
+
+The export runs in rounds. During a round, every text that needs a score is
+recorded and a placeholder score is returned. The recorded texts are then
+scored in large batches (sorted by length to reduce padding). The export is
+repeated until a round finishes without any unknown text.
+
+The batched scores differ from the ones of the wrapped scorer by rounding
+errors. The scores of a call are only compared with each other (the best one
+wins), so if the best ones are within `tie_tolerance`, the call is passed to
+the wrapped scorer. A single text (e.g. `single_score`, its result is compared
+with the ones of other calls) is always scored by the wrapped scorer. So the
+decisions of the last round are the same as the ones of the one-call-at-a-time
+path.
+"""
+
+import logging
+import math
+
+from dehyphen.dehyphen import Scorer
+
+logger = logging.getLogger(__name__)
+
+
+def pad_batch(lm, texts):
+    """Char ids of the texts as right-padded tensors (sequence first): inputs, targets (the next chars) and mask
+    """
+    import torch
+
+    if not lm.is_forward_lm:
+        texts = [t[::-1] for t in texts]
+
+    ids = [[lm.dictionary.get_idx_for_item(c) for c in t] for t in texts]
+    seq_len = max(map(len, ids)) - 1
+
+    inputs = torch.zeros(seq_len, len(ids), dtype=torch.long)
+    targets = torch.zeros(seq_len, len(ids), dtype=torch.long)
+    mask = torch.zeros(seq_len, len(ids))
+    for i, x in enumerate(ids):
+        inputs[: len(x) - 1, i] = torch.tensor(x[:-1])
+        targets[: len(x) - 1, i] = torch.tensor(x[1:])
+        mask[: len(x) - 1, i] = 1
+    return inputs, targets, mask
+
+
+def lm_perplexities(lm, texts):
+    """Perplexity of each text, computed in one forward pass.
+
+    Same computation as Flair's `LanguageModel.calculate_perplexity` but with
+    right-padded sequences. Since the LM reads from left to right, the padding
+    does not change the predictions of the real characters.
+    """
+    import flair
+    import torch
+
+    inputs, targets, mask = pad_batch(lm, texts)
+    seq_len, n_texts = inputs.shape
+
+    with torch.no_grad():
+        hidden = lm.init_hidden(n_texts)
+        prediction, _, _ = lm.forward(inputs.to(flair.device), hidden)
+        loss = torch.nn.functional.cross_entropy(
+            prediction.view(-1, len(lm.dictionary)),
+            targets.view(-1).to(flair.device),
+            reduction="none",
+        ).view(seq_len, n_texts)
+        loss = (loss.cpu() * mask).sum(0) / mask.sum(0)
+
+    return [math.exp(x) for x in loss.tolist()]
+
+
+def near_tie(scores, tie_tolerance):
+    """Whether the best two scores are so close that the rounding errors of batching may swap them
+    """
+    best, second = sorted(scores)[:2]
+    return second - best <= tie_tolerance * abs(best)
+
+
+def score_batch(scorer, texts):
+    """Score the texts at once: with the scorer's own batch implementation (`score_batch`), in one forward pass of
+    the LMs of a `FlairScorer` or, for scorers without local LMs (e.g. `RemoteScorer`), with one `score` call
+    """
+    if hasattr(scorer, "score_batch"):
+        return scorer.score_batch(texts)
+    if hasattr(scorer, "lms"):
+        per_lm = [lm_perplexities(lm, texts) for lm in scorer.lms]
+        return [float(sum(x)) for x in zip(*per_lm)]
+    return scorer.score(texts)
+
+
+class BatchScorer(Scorer):
+    """Collects texts to score and scores them in batches with the LMs of a `FlairScorer`.
+
+    Scorers with their own batch implementation (`score_batch`) or without local LMs (e.g. `RemoteScorer`) get the whole batch at once.
+    """
+
+    def __init__(self, scorer, batch_size=64, tie_tolerance=1e-4):
+        self.scorer = scorer
+        self.batch_size = batch_size
+        self.tie_tolerance = tie_tolerance
+        self.scores = {}
+        # texts of a call -> scores of the wrapped scorer
+        self.exact = {}
+        # dict as ordered set
+        self.pending = {}
+
+    def exact_scores(self, texts):
+        key = tuple(texts)
+        if key not in self.exact:
+            self.exact[key] = self.scorer.score(list(texts))
+        return self.exact[key]
+
+    def score(self, texts):
+        assert min(map(len, texts)) > 1, "flair fails if there is only one character"
+        if len(texts) == 1:
+            return self.exact_scores(texts)
+
+        results = []
+        for t in texts:
+            if t in self.scores:
+                results.append(self.scores[t])
+            else:
+                # placeholder, the decision gets re-done in the next round
+                self.pending[t] = None
+                results.append(0.0)
+        if any(t not in self.scores for t in texts):
+            return results
+
+        if near_tie(results, self.tie_tolerance):
+            return self.exact_scores(texts)
+        return results
+
+    def flush(self):
+        """Score all pending texts, returns the number of newly scored texts.
+        """
+        texts = sorted(self.pending, key=len)
+        self.pending = {}
+
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i : i + self.batch_size]
+            for t, s in zip(batch, score_batch(self.scorer, batch)):
+                self.scores[t] = float(s)
+
+        logger.info(f"scored {len(texts)} texts in batches of {self.batch_size}")
+        return len(texts)
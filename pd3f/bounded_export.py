@@ -0,0 +1,205 @@
+"""Export very large documents with bounded memory.
+
+The JSON is read twice, one page at a time (see `pd3f.parsr_json`):
+
+1. compute the document-wide statistics (`DocumentInfo` without the elements)
+   and collect the header / footer candidates,
+2. export the pages and write the text while reading.
+
+Only a small window of exported paragraphs is kept: the ones that may still be
+joined with paragraphs of upcoming pages (`reverse_page_break`) or of the same
+page (`reverse_paragraph`). The output is the same as the one of `Export`.
+"""
+
+import io
+import logging
+from pathlib import Path
+
+from .compact import CompactPage
+from .doc_info import DocumentInfo, remove_page_number_header_footer
+from .doc_output import DocumentOutput, NewlineCollapsingWriter, element_text
+from .export import Export
+from .parsr_json import iter_parsr_json
+from .utils import flatten
+
+logger = logging.getLogger(__name__)
+
+
+def is_header_or_footer(e):
+    return any(e["properties"].get(x) for x in ("isHeader", "isFooter"))
+
+
+class PageWindow:
+    """Exported paragraphs of the last pages that may still change, older ones are written out.
+    """
+
+    def __init__(self, order, lang, join_pages, footnotes_last, write):
+        self.doc = DocumentOutput([], None, None, order, lang)
+        self.join_pages = join_pages
+        self.footnotes_last = footnotes_last
+        self.write = write
+        self.footnotes = []
+        # pages where `reverse_paragraph_on` still needs to run
+        self.pending = []
+        self.n_pages = 0
+
+    def add_page(self, elements):
+        idx_page = self.n_pages
+        self.n_pages += 1
+        for e in elements:
+            if self.footnotes_last and e.type == "footnotes":
+                self.footnotes.append(e)
+            else:
+                self.doc.append(e)
+
+        if self.join_pages and idx_page > 0:
+            self.doc.reverse_page_break_at(idx_page - 1)
+        self.pending.append(idx_page)
+
+        # the last paragraph of this page may get joined with the next page
+        open_element = None
+        if self.join_pages:
+            open_element = self.doc.get_last_of_type_on_page(
+                ("body", "heading"), idx_page
+            )
+        self.reverse_paragraphs(open_element)
+        self.flush(open_element)
+
+    def page_elements(self, idx_page):
+        elements = (self.doc.get_element(x) for x in self.doc.order[idx_page])
+        return [e for e in elements if e is not None]
+
+    def reverse_paragraphs(self, open_element):
+        """Join paragraphs on pending pages, in order, as long as they do not contain the open element.
+        So the paragraphs are joined after all page breaks that affect them were reversed, as in `Export`.
+        """
+        while self.pending:
+            idx_page = self.pending[0]
+            if open_element is not None and any(
+                e is open_element for e in self.page_elements(idx_page)
+            ):
+                return
+            self.doc.reverse_paragraph_on(idx_page)
+            self.pending.pop(0)
+
+    def flush(self, open_element):
+        """Write out the paragraphs until the first one that may still change
+        """
+        needed = set()
+        if open_element is not None:
+            needed.add(id(open_element))
+        for idx_page in self.pending:
+            needed.update(id(e) for e in self.page_elements(idx_page))
+
+        written = []
+        for e in self.doc:
+            if id(e) in needed:
+                break
+            self.write(e)
+            written.append(e)
+        for e in written:
+            self.doc.remove(e)
+
+    def close(self):
+        self.reverse_paragraphs(None)
+        self.flush(None)
+        for e in self.footnotes:
+            self.write(e)
+
+
+class BoundedExport(Export):
+    """`Export` for very large documents, `input_json` has to be a path.
+
+    The first pass runs when the object is created. The second pass runs on every call of
+    `save_text` / `save_markdown` (in bounded memory) or `text` / `markdown` (the whole text is returned).
+    Batched scoring (`batch_size`) is not supported.
+    """
+
+    def run(self, input_json):
+        if not (type(input_json) is str or isinstance(input_json, Path)):
+            raise ValueError("`BoundedExport` reads the JSON from a file")
+        if self.batch_size is not None:
+            raise ValueError("`BoundedExport` does not support `batch_size`")
+
+        self.input_path = input_json
+        self.info = DocumentInfo(keep_elements=False)
+        candidates, fonts = [], None
+        for key, value in iter_parsr_json(input_json):
+            if key == "pages":
+                page = self.clean_page(value)
+                idx_page = len(candidates)
+                self.info.add_page(CompactPage(page, idx_page))
+                elements = [e for e in page["elements"] if is_header_or_footer(e)]
+                candidates.append(CompactPage({"elements": elements}, idx_page))
+            elif key == "fonts":
+                fonts = value
+        self.info.finish(fonts)
+
+        for page in candidates:
+            for e in page.blocks:
+                self.fix_header_footer(e)
+            self.info.index_page(page)
+
+        self.header, self.footer, self.new_footnotes = None, None, None
+        if self.seperate_header_footer:
+            self.header, self.footer, self.new_footnotes = self.export_header_footer(
+                candidates
+            )
+        if self.remove_page_number and self.seperate_header_footer:
+            self.header = remove_page_number_header_footer(self.header)
+            self.footer = remove_page_number_header_footer(self.footer)
+
+        for page in candidates:
+            self.info.unindex_page(page)
+
+    def clean_page(self, page):
+        if self.fast:
+            page["elements"] = list(filter(None, page["elements"]))
+        return page
+
+    def write(self, f, markdown=False):
+        """Second pass: export the pages and write the text to the file object `f`
+        """
+        writer = NewlineCollapsingWriter(f)
+        writer.write("\n\n".join([str(x) for x in flatten(self.header or [])]))
+
+        window = PageWindow(
+            self.info.order_page,
+            self.lang,
+            join_pages=self.footnotes_last and self.remove_hyphens,
+            footnotes_last=self.footnotes_last,
+            write=lambda e: writer.write(element_text(e, markdown)),
+        )
+        idx_page = 0
+        for key, page in iter_parsr_json(self.input_path):
+            if key != "pages":
+                continue
+            page = CompactPage(self.clean_page(page), idx_page)
+            for e in page.blocks:
+                self.fix_header_footer(e)
+            self.info.index_page(page)
+            window.add_page(self.export_page(page, idx_page, self.new_footnotes))
+            self.info.unindex_page(page)
+            idx_page += 1
+        window.close()
+
+        writer.write("\n\n".join([str(x) for x in flatten(self.footer or [])]))
+        writer.close()
+
+    def text(self):
+        f = io.StringIO()
+        self.write(f)
+        return f.getvalue()
+
+    def markdown(self):
+        f = io.StringIO()
+        self.write(f, markdown=True)
+        return f.getvalue()
+
+    def save_text(self, output_path):
+        with open(output_path, "w") as f:
+            self.write(f)
+
+    def save_markdown(self, output_path):
+        with open(output_path, "w") as f:
+            self.write(f, markdown=True)
@@ -0,0 +1,184 @@
+"""Compact representation of Parsr's pages.
+
+In Parsr's JSON, every word is a dict with a nested `box` dict, several
+hundred bytes per word. Here, the words and lines of a page are stored as a
+struct of arrays: the boxes in `array("d")`, fonts, ids and the links to the
+parents in `array("l")`, the texts of the words (interned) in a list.
+The dicts are converted once when loading the document.
+
+`Block` is a top-level element of a page (paragraph, heading, ...). `Line` and
+`Word` are views (with `__slots__`) into the arrays of their page.
+"""
+
+import sys
+from array import array
+
+from .doc_index import PageIndex
+
+
+class Box:
+    __slots__ = ("l", "t", "w", "h")
+
+    def __init__(self, l, t, w, h):
+        self.l, self.t, self.w, self.h = l, t, w, h
+
+
+def box_values(box):
+    return box["l"], box["t"], box["w"], box["h"]
+
+
+class CompactPage:
+    """Words, lines and top-level elements (`blocks`) of a page
+
+    `word_boxes` / `line_boxes`: `l, t, w, h` of each word / line
+    `word_lines[i]`: index of the line of word `i` (`-1` if it's not part of a line)
+    `line_spans`: `first_word, end_word` of each line
+    `line_blocks[i]`: index of the block of line `i`
+    """
+
+    def __init__(self, page, idx_page):
+        self.idx_page = idx_page
+        index = PageIndex(page)
+
+        self.word_texts = [sys.intern(x["content"]) for x in index.words]
+        self.word_fonts = array("l", [x["font"] for x in index.words])
+        self.word_boxes = array("d")
+        for x in index.words:
+            self.word_boxes.extend(box_values(x["box"]))
+        self.word_lines = index.word_line
+
+        self.line_ids = array("l", [x["id"] for x in index.lines])
+        self.line_boxes = array("d")
+        for x in index.lines:
+            self.line_boxes.extend(box_values(x["box"]))
+        self.line_spans = array("l")
+        for span in index.line_spans:
+            self.line_spans.extend(span)
+        self.line_blocks = index.line_element
+
+        self.blocks = [
+            Block(self, idx, e, span)
+            for idx, (e, span) in enumerate(zip(index.elements, index.element_spans))
+        ]
+
+
+class Block:
+    """Top-level element of a page, e.g. a paragraph. `properties` is the dict of Parsr.
+    """
+
+    __slots__ = (
+        "page",
+        "idx",
+        "id",
+        "type",
+        "properties",
+        "level",
+        "box",
+        "first_line",
+        "end_line",
+        "first_word",
+        "end_word",
+    )
+
+    def __init__(self, page, idx, element, span):
+        self.page = page
+        self.idx = idx
+        self.id = element["id"]
+        self.type = element["type"]
+        self.properties = element["properties"]
+        self.level = element.get("level")
+        self.box = Box(*box_values(element["box"])) if "box" in element else None
+        self.first_line, self.end_line, self.first_word, self.end_word = span
+
+    @property
+    def idx_page(self):
+        return self.page.idx_page
+
+    @property
+    def lines(self):
+        return [Line(self.page, idx) for idx in range(self.first_line, self.end_line)]
+
+    @property
+    def words(self):
+        return [Word(self.page, idx) for idx in range(self.first_word, self.end_word)]
+
+
+class Line:
+    __slots__ = ("page", "idx")
+
+    def __init__(self, page, idx):
+        self.page = page
+        self.idx = idx
+
+    @property
+    def id(self):
+        return self.page.line_ids[self.idx]
+
+    @property
+    def idx_page(self):
+        return self.page.idx_page
+
+    @property
+    def block(self):
+        return self.page.blocks[self.page.line_blocks[self.idx]]
+
+    @property
+    def l(self):
+        return self.page.line_boxes[4 * self.idx]
+
+    @property
+    def t(self):
+        return self.page.line_boxes[4 * self.idx + 1]
+
+    @property
+    def w(self):
+        return self.page.line_boxes[4 * self.idx + 2]
+
+    @property
+    def h(self):
+        return self.page.line_boxes[4 * self.idx + 3]
+
+    @property
+    def box(self):
+        return Box(*self.page.line_boxes[4 * self.idx : 4 * self.idx + 4])
+
+    @property
+    def words(self):
+        first_word, end_word = self.page.line_spans[2 * self.idx : 2 * self.idx + 2]
+        return [Word(self.page, idx) for idx in range(first_word, end_word)]
+
+
+class Word:
+    __slots__ = ("page", "idx")
+
+    def __init__(self, page, idx):
+        self.page = page
+        self.idx = idx
+
+    @property
+    def content(self):
+        return self.page.word_texts[self.idx]
+
+    @property
+    def font(self):
+        return self.page.word_fonts[self.idx]
+
+    @property
+    def l(self):
+        return self.page.word_boxes[4 * self.idx]
+
+    @property
+    def t(self):
+        return self.page.word_boxes[4 * self.idx + 1]
+
+    @property
+    def w(self):
+        return self.page.word_boxes[4 * self.idx + 2]
+
+    @property
+    def h(self):
+        return self.page.word_boxes[4 * self.idx + 3]
+
+    @property
+    def box(self):
+        return Box(*self.page.word_boxes[4 * self.idx : 4 * self.idx + 4])
@@ -0,0 +1,116 @@
+"""Faster inference of the character language models on CPUs.
+
+The LMs are compiled with TorchScript (traced and frozen) together with the
+loss computation, so a whole batch of texts is scored without going through
+Python per character. The scores are run under `torch.inference_mode` with a
+fixed number of threads. When running many worker processes on one machine,
+set `num_threads` to about the number of cores divided by the number of
+workers to not oversubscribe the CPU.
+
+Enable it with `pd3f.dehyphen_wrapper.enable_torchscript(num_threads=2)`.
+"""
+
+import logging
+import math
+import warnings
+
+from dehyphen.dehyphen import Scorer
+
+from .batch_scorer import pad_batch
+
+logger = logging.getLogger(__name__)
+
+
+def set_threads(num_threads=None, interop_threads=None):
+    """Number of threads torch uses for one operation (intra-op) and to run operations in parallel (inter-op)
+    """
+    import torch
+
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    if interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # can only be set before torch started any parallel work
+            logger.warning(
+                f"could not set the number of inter-op threads to {interop_threads}"
+            )
+
+
+def compile_lm(lm):
+    """TorchScript module: (inputs, targets, mask) of `pad_batch` -> mean cross entropy of each text
+    """
+    import torch
+
+    class Loss(torch.nn.Module):
+        def __init__(self, lm):
+            super().__init__()
+            self.encoder = lm.encoder
+            self.rnn = lm.rnn
+            self.proj = lm.proj
+            self.decoder = lm.decoder
+            self.nlayers = lm.nlayers
+            self.hidden_size = lm.hidden_size
+
+        def forward(self, inputs, targets, mask):
+            # dropout is skipped, it does nothing in eval mode
+            h = torch.zeros(
+                self.nlayers, inputs.size(1), self.hidden_size, dtype=mask.dtype
+            )
+            output, _ = self.rnn(self.encoder(inputs), (h, h))
+            if self.proj is not None:
+                output = self.proj(output)
+            logits = self.decoder(output)
+            loss = torch.nn.functional.cross_entropy(
+                logits.view(-1, logits.size(2)), targets.view(-1), reduction="none"
+            ).view_as(mask)
+            return (loss * mask).sum(0) / mask.sum(0)
+
+    lm.eval()
+    example = pad_batch(lm, ["ab", "abc"])
+    with torch.no_grad(), warnings.catch_warnings():
+        # the LSTM's shape checks are traced as constants, the shapes are right by construction
+        warnings.simplefilter("ignore", torch.jit.TracerWarning)
+        traced = torch.jit.trace(Loss(lm).eval(), example, check_trace=False)
+    return torch.jit.freeze(traced)
+
+
+class TorchScriptScorer(Scorer):
+    """`FlairScorer` interface, the texts of a `score` call are scored in one batch by compiled LMs.
+    """
+
+    def __init__(self, scorer, num_threads=None, interop_threads=None):
+        set_threads(num_threads, interop_threads)
+        self.scorer = scorer
+        self.lms = scorer.lms
+        self.models = [(lm, compile_lm(lm)) for lm in self.lms]
+
+    def lm_perplexities(self, lm, model, texts):
+        import torch
+
+        with torch.inference_mode():
+            loss = model(*pad_batch(lm, texts))
+        return [math.exp(x) for x in loss.tolist()]
+
+    def score_batch(self, texts):
+        per_lm = [self.lm_perplexities(lm, model, texts) for lm, model in self.models]
+        return [float(sum(x)) for x in zip(*per_lm)]
+
+    def score(self, texts):
+        assert min(map(len, texts)) > 1, "flair fails if there is only one character"
+        return self.score_batch(texts)
+
+
+def torchscript_factory(base=None, **kwargs):
+    """Scorer factory for `ScorerRegistry`, `base` creates the `FlairScorer`s (default: Flair).
+    The other arguments are passed to `TorchScriptScorer`.
+    """
+    from .scorer_registry import flair_scorer
+
+    base = base or flair_scorer
+
+    def factory(lang, fast):
+        return TorchScriptScorer(base(lang, fast), **kwargs)
+
+    return factory
@@ -0,0 +1,131 @@
+"""Remove duplicated headers / footers without comparing all pairs of pages.
+
+`doc_info.remove_duplicates` compares the header (or footer) of each page with the ones of all previous pages
+(`doc_info.similiar_features`), so the number of comparisons grows quadratically with the pages.
+Two groups of elements can only be similar if:
+
+- their bounding boxes overlap, so they share a cell of a coarse grid
+- the overlap of the bounding boxes is large enough (`geometry.sim_bounds_many` for all candidates at once)
+- the lengths of their texts are close: the Jaccard similarity of the characters is at most `shorter / longer`
+- the Jaccard similarity of the characters is high enough
+
+`DuplicateIndex` keeps the `doc_info.GroupFeatures` of the kept groups. Only the groups that pass all checks are
+compared with `doc_info.similiar_features`. The results are the same as the ones of `remove_duplicates`.
+"""
+
+import logging
+from collections import defaultdict
+from math import floor
+
+from .doc_info import GroupFeatures, similiar_features
+from .geometry import sim_bounds_many
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateIndex:
+    """Groups of elements by the cells of the grid (with `cell_size`) that their bounding boxes cover
+    """
+
+    def __init__(self, sim_factor=0.8, sim_box=0.6, cell_size=100):
+        self.sim_factor = sim_factor
+        self.sim_box = sim_box
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+        # bounding box with area 0: the comparison divides by 0, so it's done for all of them (as before)
+        self.flat = set()
+        self.features = {}
+
+    def group_cells(self, bbox):
+        top, left, bottom, right = (floor(x / self.cell_size) for x in bbox)
+        return [(x, y) for x in range(top, bottom + 1) for y in range(left, right + 1)]
+
+    def add(self, key, f):
+        self.features[key] = f
+        if f.area == 0:
+            self.flat.add(key)
+            return
+        for cell in self.group_cells(f.bbox):
+            self.cells[cell].add(key)
+
+    def remove(self, key):
+        f = self.features.pop(key)
+        if f.area == 0:
+            self.flat.discard(key)
+            return
+        for cell in self.group_cells(f.bbox):
+            self.cells[cell].discard(key)
+
+    def similar_text(self, f1, f2):
+        from textdistance import jaccard
+
+        shorter, longer = min(f1.length, f2.length), max(f1.length, f2.length)
+        if shorter != longer and shorter <= longer * self.sim_factor:
+            return False
+        return jaccard(f1.counts, f2.counts) > self.sim_factor
+
+    def candidates(self, f):
+        """Keys of the groups that may be similar to the one with the features `f`, in the order they were added
+        """
+        if f.area == 0:
+            return sorted(self.flat)
+
+        keys = set()
+        for cell in self.group_cells(f.bbox):
+            keys.update(self.cells.get(cell, ()))
+        keys = sorted(keys)
+        if len(keys) == 0:
+            return []
+
+        sims = sim_bounds_many(f.bbox, [self.features[k].bbox for k in keys])
+        return [
+            k
+            for k, sim in zip(keys, sims)
+            if sim > self.sim_box and self.similar_text(f, self.features[k])
+        ]
+
+
+def remove_duplicates_indexed(page_items, lang):
+    """Same as `doc_info.remove_duplicates`, but only compares the candidates of a `DuplicateIndex`
+    """
+    index = DuplicateIndex()
+    results = [page_items[0]]
+    alive = [True]
+    if len(page_items[0]) > 0:
+        index.add(0, GroupFeatures(page_items[0]))
+
+    for elements in page_items[1:]:
+        cool = True
+        # `remove_duplicates` removes from the list while iterating over it, so the next group is skipped
+        skip = None
+        # an empty group is not similar to any other one
+        features = GroupFeatures(elements) if len(elements) > 0 else None
+        for key in index.candidates(features) if features is not None else []:
+            if key == skip:
+                continue
+            f = index.features[key]
+            if similiar_features(f, features):
+                logger.debug("items are super similiar")
+                if f.score(lang) <= features.score(lang):
+                    logger.debug(
+                        "okay, skipping here, the previous one got better / same score"
+                    )
+                    cool = False
+                    break
+                else:
+                    logger.debug("removing previous one, this is better")
+                    alive[key] = False
+                    index.remove(key)
+                    skip = key + 1
+                    while skip < len(alive) and not alive[skip]:
+                        skip += 1
+
+        key = len(results)
+        if cool:
+            results.append(elements)
+            if features is not None:
+                index.add(key, features)
+        else:
+            results.append([])
+        alive.append(True)
+    return [x for x, a in zip(results, alive) if a]
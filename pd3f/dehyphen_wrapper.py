@@ -2,50 +2,267 @@
 """
 
 
-from functools import lru_cache
+import inspect
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
 
-from joblib import Memory
+from .memo import LRUCache, content_key
+from .prefilter import PrefilteredScorer
+from .score_store import SQLiteScoreStore
+from .scorer_registry import ScorerRegistry, flair_scorer
 
-from dehyphen import FlairScorer
+# persistent cache, shared between processes (max 100mb)
+score_store = SQLiteScoreStore()
 
+# in-memory tier in front of the disk cache, so repeated lines (e.g. headers) never touch the disk
+memo = LRUCache(maxsize=10000)
 
-# cache max 100mb
-memory = Memory(
-    "~/.cache/pd3f/dehyphen", verbose=0, compress=5, bytes_limit=100 * 1000 * 1000
-)
+# loaded language models, adjust `registry.max_bytes` / `registry.max_models` to limit the memory usage
+registry = ScorerRegistry()
 
+# `(name, factory)` of the backend of the scorers and the options of micro batching, see `update_factory`
+backend = None
+micro_batching = None
 
-scorer = None
+# `(lang, BatchScorer)` while the scores of a document are collected for batch scoring.
+# Only in the context (thread, asyncio task) of `batched_scoring`, other threads score as usual.
+batch_scorer = ContextVar("batch_scorer", default=None)
+
+
+def active_batch_scorer(lang):
+    """The `BatchScorer` of `batched_scoring` for the language, `None` if there is none
+    """
+    active = batch_scorer.get()
+    if active is not None and active[0] == lang:
+        return active[1]
+    return None
 
 
 def get_scorer(lang):
-    """Simple singleton to avoid re-initialization of the language model.
+    """Get the scorer for the language (model name), avoids re-initialization of the language models.
+    """
+    scorer = active_batch_scorer(lang)
+    if scorer is not None:
+        return scorer
+    return registry.get(lang)
+
+
+def preload_scorers(*langs):
+    """Load the language models upfront, e.g. `preload_scorers("de", "en")`
+    """
+    registry.preload(*langs)
+
+
+def use_scoring_server(address, authkey=None, key_file=None):
+    """Send all scoring requests to a `pd3f.scoring_server.ScoringServer` instead of loading the models in this process.
+    The server requires its key: `authkey` (bytes) or the path of its `key_file`.
+    """
+    from .scoring_server import RemoteScorer, check_authkey, read_key_file
+
+    if authkey is None and key_file is not None:
+        authkey = read_key_file(key_file)
+    check_authkey(authkey)
+
+    def remote_scorer(lang, fast):
+        return RemoteScorer(address, lang + "-fast" if fast else lang, authkey)
+
+    set_backend("scoring server", remote_scorer)
+
+
+def enable_micro_batching(**kwargs):
+    """Score the texts of concurrent callers (threads, asyncio tasks) together.
+    See `pd3f.micro_batcher.MicroBatcher` for the options, e.g. `max_batch_size`, `max_wait`.
+    """
+    global micro_batching
+    micro_batching = kwargs
+    update_factory()
+
+
+def enable_prefix_scoring():
+    """Re-use the state of the language models for shared prefixes, see `pd3f.prefix_scorer`.
+    """
+    from .prefix_scorer import prefix_scoring_factory
+
+    set_backend("prefix scoring", prefix_scoring_factory())
+
+
+def enable_torchscript(num_threads=None, interop_threads=None):
+    """Score with TorchScript-compiled language models on the CPU, see `pd3f.cpu_backend`.
+    """
+    from .cpu_backend import torchscript_factory
+
+    set_backend(
+        "torchscript",
+        torchscript_factory(num_threads=num_threads, interop_threads=interop_threads),
+    )
+
+
+def set_backend(name, factory):
+    """Score with the scorers of `factory` (see `update_factory`). Only one backend can be active.
+    """
+    global backend
+    if backend is not None and backend[0] != name:
+        raise ValueError(f"cannot enable {name}, the scorers already use {backend[0]}")
+    backend = name, factory
+    update_factory()
+
+
+def update_factory():
+    """Set the factory of `registry`: the scorers of the backend (`use_scoring_server`, `enable_prefix_scoring` or
+    `enable_torchscript`, at most one of them) and, if enabled, micro batching around them.
+    The scorers are re-created, so the `enable_` functions can be called in any order.
+    """
+    factory = flair_scorer if backend is None else backend[1]
+    if micro_batching is not None:
+        from .micro_batcher import micro_batching_factory
+
+        factory = micro_batching_factory(base=factory, **micro_batching)
+
+    registry.clear()
+    registry.factory = factory
+
+
+def scoring_variant():
+    """How the scores are computed, e.g. `torchscript+micro batching`, part of the keys of the cached results.
+    Empty for the scorers of Flair.
+    """
+    parts = [] if backend is None else [backend[0]]
+    if micro_batching is not None:
+        parts.append("micro batching")
+    return "+".join(parts)
+
+
+def use_scoring_server_from_env():
+    """`use_scoring_server` with the environment variables `PD3F_SCORING_SERVER` (address) and
+    `PD3F_SCORING_SERVER_KEY` (the key) or `PD3F_SCORING_SERVER_KEY_FILE`. Returns `False` if no server is set.
+    """
+    if "PD3F_SCORING_SERVER" not in os.environ:
+        return False
+    authkey = os.environ.get("PD3F_SCORING_SERVER_KEY")
+    use_scoring_server(
+        os.environ["PD3F_SCORING_SERVER"],
+        authkey=None if authkey is None else authkey.encode(),
+        key_file=os.environ.get("PD3F_SCORING_SERVER_KEY_FILE"),
+    )
+    return True
+
+
+@contextmanager
+def batched_scoring(lang, batch_size=64):
+    """All scoring functions for `lang` use a `BatchScorer` within this context (only in the current thread / task).
+    """
+    from .batch_scorer import BatchScorer
+
+    scorer = BatchScorer(registry.get(lang), batch_size)
+    token = batch_scorer.set((lang, scorer))
+    try:
+        yield scorer
+    finally:
+        batch_scorer.reset(token)
+
+
+def set_memo_size(maxsize):
+    """Set the number of results kept in memory, `0` disables the in-memory tier.
+    """
+    memo.resize(maxsize)
+
+
+def set_score_store(store):
+    """Set the persistent cache, e.g. a `SQLiteScoreStore` on a shared volume. `None` disables it.
+    """
+    global score_store
+    score_store = store
+
+
+def cached(persistent=True):
+    """Cache results in memory and, if `persistent`, in the score store.
+    But not while collecting scores for batch scoring (results may be based on placeholders).
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            if active_batch_scorer(arguments["lang"]) is not None:
+                return func(*args, **kwargs)
+
+            key = content_key(tuple(arguments.values()))
+            # results of other backends may differ (e.g. by rounding errors)
+            model = arguments["lang"]
+            if scoring_variant():
+                model += "/" + scoring_variant()
+
+            def compute():
+                if not persistent or score_store is None:
+                    return func(*args, **kwargs)
+                return score_store.get_or_compute(
+                    model, func.__name__, key, lambda: func(*args, **kwargs),
+                )
+
+            return memo.get((model, func.__name__, key), compute)
+
+        return wrapper
+
+    return decorator
+
+
+def dehyphen_paragraph(lines, lang, prefilter=None):
+    """Remove hyphens if appropriate, a `Prefilter` may take obvious decisions without the language model.
+    """
+    if prefilter is None:
+        return lm_dehyphen_paragraph(lines, lang)
+    # the result depends on the prefilter, so only the scores of the language model are cached
+    return PrefilteredScorer(lambda: CachedScorer(lang), prefilter).dehyphen_paragraph(
+        lines
+    )
+
+
+class CachedScorer:
+    """Scores of the language model for `lang` through the caches (see `lm_score`)
     """
-    global scorer
-    if scorer is None:
-        # simplify Flair's naming of models
-        if lang.endswith("-fast"):
-            scorer = FlairScorer(lang=lang[:-5], fast=True)
-        else:
-            scorer = FlairScorer(lang=lang)
-    return scorer
+
+    def __init__(self, lang):
+        self.lang = lang
+
+    def score(self, texts):
+        return lm_score(texts, self.lang)
 
 
-@memory.cache
-def dehyphen_paragraph(lines, lang):
+@cached()
+def lm_score(texts, lang):
+    scorer = get_scorer(lang)
+    return scorer.score(list(texts))
+
+
+@cached()
+def lm_dehyphen_paragraph(lines, lang):
     scorer = get_scorer(lang)
     return scorer.dehyphen_paragraph(lines)
 
 
-@memory.cache
+@cached()
 def is_split_paragraph(p1, p2, lang):
     scorer = get_scorer(lang)
     return scorer.is_split_paragraph(p1, p2)
 
 
-@memory.cache
-def newline_or_not(l1, l2, lang):
-    """Decide whether to add a newline or not.
+def newline_or_not(l1, l2, lang, prefilter=None):
+    """Decide whether to add a newline or not. A `Prefilter` may decide without the language model.
+    """
+    if prefilter is not None:
+        decision = prefilter.newline_or_not(l1, l2)
+        if decision is not None:
+            return decision
+    return lm_newline_or_not(l1, l2, lang)
+
+
+@cached()
+def lm_newline_or_not(l1, l2, lang):
+    """Decide whether to add a newline or not (with the language model).
     """
     # Flair does not work with only one char, thus this special case
     if len(l1) == 1 and len(l1[0]) == 1:
@@ -60,7 +277,7 @@ def newline_or_not(l1, l2, lang):
     return best_score_idx != 2
 
 
-@lru_cache
+@cached(persistent=False)
 def single_score(text, lang):
     scorer = get_scorer(lang)
     # Flair does not work with only one char, thus this special case
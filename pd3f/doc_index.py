@@ -0,0 +1,80 @@
+"""Index of the lines and words of Parsr's elements.
+
+`doc_info.extract_elements` walks the nested JSON to find the lines or words
+of an element. Here, each page is walked once: its lines and words are
+stored in flat lists in document order, together with links to the line and
+the top-level element they belong to. `pd3f.compact` uses it to convert the
+pages.
+"""
+
+from array import array
+
+
+class PageIndex:
+    """Lines and words of a page
+
+    `elements`: the top-level elements of the page
+    `lines` / `words`: all lines / words of the page in document order
+    `line_element[i]`: position (in `page["elements"]`) of the element of line `i`
+    `word_line[j]`: index of the line of word `j` (`-1` if it's not part of a line), `word_element[j]`: position of its element
+    `element_spans[k]`: `(first_line, end_line, first_word, end_word)` of the element at position `k`
+    `line_spans[i]`: `(first_word, end_word)` of line `i`
+    """
+
+    def __init__(self, page):
+        self.elements = list(page["elements"])
+        self.lines, self.words = [], []
+        self.line_element = array("l")
+        self.word_line, self.word_element = array("l"), array("l")
+        self.element_spans, self.line_spans = [], []
+
+        for idx_element, e in enumerate(self.elements):
+            first_line, first_word = len(self.lines), len(self.words)
+            self.walk(e, idx_element, -1)
+            self.element_spans.append(
+                (first_line, len(self.lines), first_word, len(self.words))
+            )
+
+    def walk(self, x, idx_element, idx_line):
+        """Same traversal as `extract_elements`: stops at words and collects the outermost lines
+        """
+        if type(x) is list:
+            for y in x:
+                # most items are words, don't recurse for them
+                if type(y) is dict and y.get("type") == "word":
+                    self.words.append(y)
+                    self.word_line.append(idx_line)
+                    self.word_element.append(idx_element)
+                else:
+                    self.walk(y, idx_element, idx_line)
+            return
+        if type(x) is not dict:
+            return
+
+        if x.get("type") == "word":
+            self.words.append(x)
+            self.word_line.append(idx_line)
+            self.word_element.append(idx_element)
+        elif x.get("type") == "line" and idx_line == -1:
+            idx_line, first_word = len(self.lines), len(self.words)
+            self.lines.append(x)
+            self.line_element.append(idx_element)
+            self.line_spans.append(None)
+            if "content" in x:
+                self.walk(x["content"], idx_element, idx_line)
+            self.line_spans[idx_line] = (first_word, len(self.words))
+        elif "content" in x:
+            self.walk(x["content"], idx_element, idx_line)
+
+    def element_lines(self, idx_element):
+        first_line, end_line, _, _ = self.element_spans[idx_element]
+        return self.lines[first_line:end_line]
+
+    def element_words(self, idx_element):
+        _, _, first_word, end_word = self.element_spans[idx_element]
+        return self.words[first_word:end_word]
+
+    def line_words(self, idx_line):
+        first_word, end_word = self.line_spans[idx_line]
+        return self.words[first_word:end_word]
+
@@ -3,13 +3,15 @@
 
 import logging
 from collections import Counter
+from functools import cached_property
 from statistics import median
 
-from textdistance import jaccard
-from cleantext import clean, fix_bad_unicode
+import numpy as np
 
+from .compact import Block, Line
 from .dehyphen_wrapper import single_score
-from .geometry import sim_bbox
+from .geometry import area, bbox, sim_bounds
+from .layout_stats import count, line_boxes, line_spaces, weighted_median, word_spaces
 from .utils import flatten
 
 logger = logging.getLogger(__name__)
@@ -20,16 +22,14 @@ def avg_word_space(line):
 
     src: https://github.com/axa-group/Parsr/blob/69e6b9bf33f1cc43d5a87d428cedf1132ccc48e8/server/src/types/DocumentRepresentation/Paragraph.ts#L460
     """
+    words = line.words
 
     def calc_margins(index, word):
         if index > 0:
-            return word["box"]["l"] - (
-                line["content"][index - 1]["box"]["l"]
-                + line["content"][index - 1]["box"]["w"]
-            )
+            return word.l - (words[index - 1].l + words[index - 1].w)
         return 0
 
-    margins = [calc_margins(i, w) for i, w in enumerate(line["content"])]
+    margins = [calc_margins(i, w) for i, w in enumerate(words)]
 
     if len(margins) <= 1:
         return sum(margins)
@@ -61,7 +61,7 @@ def extract_elements(outer_element, element_type):
 
 
 def font_stats(outer_element):
-    return [x["font"] for x in extract_elements(outer_element, "word")]
+    return [x.font for x in outer_element.words]
 
 
 def most_used_font(element):
@@ -70,76 +70,132 @@ def most_used_font(element):
 
 def get_lineheight(l1, l2):
     # l1 or l2 can be the upper line
-    if l2["box"]["t"] < l1["box"]["t"]:
+    if l2.t < l1.t:
         l1, l2 = l2, l1
-    dif = l2["box"]["t"] - l1["box"]["t"] - l1["box"]["h"]
+    dif = l2.t - l1.t - l1.h
     # it may happen that the lines are on the same
     return dif if dif > 0 else None
 
 
 def median_from_counter(c):
-    data = []
-    for value, count in c.most_common():
-        data += [value] * count
-    return median(data)
+    return weighted_median(list(c.keys()), list(c.values()))
+
+
+def word_texts(e):
+    """Texts of the words of a `pd3f.compact` element / line. Other data is searched with `extract_elements`.
+    """
+    if isinstance(e, (Block, Line)):
+        return [x.content for x in e.words]
+    return [x["content"] for x in extract_elements(e, "word")]
 
 
 def only_text(es):
+    from cleantext import fix_bad_unicode
+
     r = []
     for e in es:
-        for x in extract_elements(e, "word"):
-            r.append(x["content"].strip())
+        for x in word_texts(e):
+            r.append(x.strip())
     return fix_bad_unicode(" ".join(r))
 
 
 def only_points(es):
     r = []
     for e in es:
-        b = e["box"]
-        r.append((b["t"], b["l"]))
-        r.append((b["t"] + b["h"], b["l"]))
-        r.append((b["t"], b["l"] + b["w"]))
-        r.append((b["t"] + b["h"], b["l"] + b["w"]))
+        b = e.box
+        r.append((b.t, b.l))
+        r.append((b.t + b.h, b.l))
+        r.append((b.t, b.l + b.w))
+        r.append((b.t + b.h, b.l + b.w))
     return r
 
 
-def super_similiar(es1, es2, sim_factor=0.8, sim_box=0.6):
-    """Check if two elements are super similiar by text (Jaccad) and visually (compare bbox).
+class GroupFeatures:
+    """Features of a group of elements (e.g. the header of a page) to compare it with other ones.
+    They are computed once (when they are needed) and then reused for all comparisons.
     """
-    text1 = only_text(es1)
-    text2 = only_text(es2)
 
-    points1 = only_points(es1)
-    points2 = only_points(es2)
+    def __init__(self, elements):
+        self.elements = elements
+        self.text = only_text(elements)
+        self.length = len(self.text)
+        self.scores = {}
+
+    @cached_property
+    def counts(self):
+        """Counts of the characters, the same as Jaccard of `textdistance` uses for the text
+        """
+        return Counter(self.text)
+
+    @cached_property
+    def points(self):
+        return only_points(self.elements)
+
+    @cached_property
+    def bbox(self):
+        return bbox(self.points)
+
+    @cached_property
+    def area(self):
+        return area(self.bbox)
 
-    if min(len(points1), len(points2)) < 4:
+    @cached_property
+    def without_page_number(self):
+        """The text without numbers, punctuation, `seite` and `von`
+        """
+        from cleantext import clean
+
+        return (
+            clean(self.text, replace_with_number="", no_punct=True)
+            .replace("seite", "")
+            .replace("von", "")
+        )
+
+    def score(self, lang):
+        if lang not in self.scores:
+            self.scores[lang] = single_score(self.text, lang)
+        return self.scores[lang]
+
+
+def similiar_features(f1, f2, sim_factor=0.8, sim_box=0.6):
+    """Same as `super_similiar` for the `GroupFeatures` of the two groups
+    """
+    from textdistance import jaccard
+
+    if min(len(f1.points), len(f2.points)) < 4:
         return False
 
     logger.debug("points")
-    logger.debug(points1)
-    logger.debug(points2)
+    logger.debug(f1.points)
+    logger.debug(f2.points)
 
-    j_sim = jaccard(text1, text2)
-    b_sim = sim_bbox(points1, points2)
+    j_sim = jaccard(f1.counts, f2.counts)
+    b_sim = sim_bounds(f1.bbox, f2.bbox)
 
     logger.debug(f"footer/header sims {j_sim} {b_sim}")
 
     return j_sim > sim_factor and b_sim > sim_box
 
 
+def super_similiar(es1, es2, sim_factor=0.8, sim_box=0.6):
+    """Check if two elements are super similiar by text (Jaccad) and visually (compare bbox).
+    """
+    return similiar_features(GroupFeatures(es1), GroupFeatures(es2), sim_factor, sim_box)
+
+
 def remove_duplicates(page_items, lang):
-    results = [page_items[0]]
-    for elements in page_items[1:]:
+    features = [GroupFeatures(x) for x in page_items]
+    # index of the group in `page_items` or `None` if it was removed
+    results = [0]
+    for idx, elements in enumerate(page_items[1:], 1):
         cool = True
         for r in results:
-            if len(r) == 0:
+            if r is None or len(page_items[r]) == 0:
                 continue
             # only choose the best first one?
-            if super_similiar(r, elements):
+            if similiar_features(features[r], features[idx]):
                 logger.debug("items are super similiar")
-                if single_score(only_text(r), lang) <= single_score(
-                    only_text(elements), lang
-                ):
+                if features[r].score(lang) <= features[idx].score(lang):
                     logger.debug(
                         "okay, skipping here, the previous one got better / same score"
                     )
@@ -150,10 +206,10 @@ def remove_duplicates(page_items, lang):
                     results.remove(r)
 
         if cool:
-            results.append(elements)
+            results.append(idx)
         else:
-            results.append([])
-    return results
+            results.append(None)
+    return [[] if r is None else page_items[r] for r in results]
 
 
 def remove_page_number_header_footer(page_items):
@@ -161,16 +217,9 @@ def remove_page_number_header_footer(page_items):
 
     TODO: Make it work if the pager number is part of a bigger header/footer. And also consider the language.
     """
-    texts = [
-        clean(only_text(x), replace_with_number="", no_punct=True)
-        .replace("seite", "")
-        .replace("von", "")
-        for x in page_items
-    ]
-
     results = []
-    for idx, x in enumerate(page_items):
-        if texts[idx].strip() != "":
+    for x in page_items:
+        if GroupFeatures(x).without_page_number.strip() != "":
             results.append(x)
     return results
 
@@ -194,40 +243,53 @@ def calc_word_space(lines):
     return wordspace
 
 class DocumentInfo:
-    def __init__(self, input_data) -> None:
-        self.input_data = input_data
-
-        # needs to be done first
-        self.element_order_page()
-        self.document_font_stats()
-        self.document_paragraph_stats()
-
-        # free memory (code should have been re-written but whatehver)
-        del self.input_data
+    """Document-wide statistics. Either pass all `input_data` or add the pages one by one with `add_page` and then call `finish`.
+    The pages are `pd3f.compact.CompactPage`s.
 
-    def document_paragraph_stats(self):
-        """
-        """
+    `keep_elements`: keep all elements in `id_to_elem`. Otherwise, only the elements of pages added with `index_page`.
+    """
 
+    def __init__(self, input_data=None, keep_elements=True) -> None:
+        self.keep_elements = keep_elements
+        self.order_page = []
+        self.id_to_elem = {}
+        self.font_counter = Counter()
         self.counter_width = Counter()
         self.counter_height = Counter()
         self.counter_lineheight = Counter()
         self.counter_line_left = Counter()
         self.counter_space_words = Counter()
 
-        for n_page, p in enumerate(self.input_data["pages"]):
-            for e in p["elements"]:
-                lis = extract_elements(e, "line")
-                for x in lis:
-                    x["idx_page"] = n_page
-                    self.id_to_elem[x["id"]] = x
+        if input_data is not None:
+            for page in input_data["pages"]:
+                self.add_page(page)
+            self.finish(input_data["fonts"])
 
-                self.counter_width.update([x["box"]["w"] for x in lis])
-                self.counter_height.update([x["box"]["h"] for x in lis])
-                self.counter_lineheight.update(calc_line_space(lis))
-                self.counter_line_left.update([x["box"]["l"] for x in lis])
-                self.counter_space_words.update(calc_word_space(lis))
+    def add_page(self, page):
+        # needs to be done first
+        self.element_order_page(page)
+        self.page_font_stats(page)
+        self.page_paragraph_stats(page)
+
+    def finish(self, fonts):
+        """Compute the statistics after all pages were added
+        """
+        self.document_font_stats(fonts)
+        self.document_paragraph_stats()
 
+    def page_paragraph_stats(self, page):
+        """Count the line widths, heights etc. of the page (see `pd3f.layout_stats`)
+        """
+        boxes = line_boxes(page)
+        self.counter_width.update(count(boxes[:, 2]))
+        self.counter_height.update(count(boxes[:, 3]))
+        self.counter_lineheight.update(count(line_spaces(boxes, np.asarray(page.line_blocks))))
+        self.counter_line_left.update(count(boxes[:, 0]))
+        self.counter_space_words.update(count(word_spaces(page)))
+
+    def document_paragraph_stats(self):
+        """
+        """
         if (
             min(
                 map(
@@ -263,23 +325,21 @@ class DocumentInfo:
         # print(f"counter counter_space_words: {self.counter_space_words.most_common(5)}")
         # print("median_word_space===", self.median_word_space)
 
-    def document_font_stats(self):
+    def page_font_stats(self, page):
+        self.font_counter.update(page.word_fonts)
+
+    def document_font_stats(self, fonts):
         """Get statistics about font usage in the document
         """
-        c = Counter()
-        for p in self.input_data["pages"]:
-            for e in p["elements"]:
-                c.update(font_stats(e))
-
+        c = self.font_counter
         if len(c) == 0:
             raise ValueError(
                 "Something is wrong with the document. Is the text in the PDF broken (copy the text out of the doc and see how it looks)?"
             )
 
         self.body_font = c.most_common(1)[0][0]
-        self.font_counter = c
         self.font_info = {}
-        for x in self.input_data["fonts"]:
+        for x in fonts:
             self.font_info[x["id"]] = x
             assert x["sizeUnit"] == "px"
 
@@ -293,38 +353,42 @@ class DocumentInfo:
     def on_same_page(self, e1, e2):
         """Check if both elements are on the same page
         """
-        return (
-            self.id_to_elem[e1["id"]]["idx_page"]
-            == self.id_to_elem[e2["id"]]["idx_page"]
-        )
+        return e1.idx_page == e2.idx_page
 
-    def element_order_page(self):
+    def element_order_page(self, page):
         """Save the order of paragraphes for each page, exclude header / footer
         """
-        self.order_page = []
-        self.id_to_elem = {}
-        for idx_page, p in enumerate(self.input_data["pages"]):
-            per_page = []
-            for e in p["elements"]:
-                # not all elements are included here
-                e["idx_page"] = idx_page
-                self.id_to_elem[e["id"]] = e
-
-                if not e["type"] in ("paragraph", "heading"):
-                    continue
-                if "isHeader" in e["properties"] and e["properties"]["isHeader"]:
-                    continue
-                if "isFooter" in e["properties"] and e["properties"]["isFooter"]:
-                    continue
-
-                per_page.append(e["id"])
-            self.order_page.append(per_page)
+        per_page = []
+        for e in page.blocks:
+            # not all elements are included here
+            if self.keep_elements:
+                self.id_to_elem[e.id] = e
+
+            if not e.type in ("paragraph", "heading"):
+                continue
+            if "isHeader" in e.properties and e.properties["isHeader"]:
+                continue
+            if "isFooter" in e.properties and e.properties["isFooter"]:
+                continue
+
+            per_page.append(e.id)
+        self.order_page.append(per_page)
+
+    def index_page(self, page):
+        """Make the elements of a page available in `id_to_elem`
+        """
+        for e in page.blocks:
+            self.id_to_elem[e.id] = e
+
+    def unindex_page(self, page):
+        for e in page.blocks:
+            self.id_to_elem.pop(e.id, None)
 
     def is_body_paragrah(self, para):
-        lines = extract_elements(para, "line")
-        w_lines = [x["box"]["w"] for x in lines]
-        h_lines = [x["box"]["h"] for x in lines]
-        l_lines = [x["box"]["l"] for x in lines]
+        lines = para.lines
+        w_lines = [x.w for x in lines]
+        h_lines = [x.h for x in lines]
+        l_lines = [x.l for x in lines]
 
         logger.debug("is it a body para?")
         if abs(self.median_line_width - max(w_lines)) > 5:
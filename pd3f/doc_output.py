@@ -1,6 +1,7 @@
 """Document represenation after extraction stuff from parsr
 """
 
+import io
 import logging
 import re
 
@@ -12,31 +13,62 @@ logger = logging.getLogger(__name__)
 
 
 class DocumentOutput:
+    """The exported elements in the order of the output. They are stored in a dict by their id (dicts keep the order),
+    so looking up, replacing and removing an element takes constant time.
+    """
+
     def __init__(self, data, header, footer, order, lang):
-        self.data = data or []
+        self.elements = {e.id: e for e in data or []}
         self.header = header or []
         self.footer = footer or []
         self.order = order or []
         self.lang = lang
+        # id of an element that was joined into another one -> id of the other one
         self.merged_elements = {}
 
+    @property
+    def data(self):
+        return list(self.elements.values())
+
+    def __iter__(self):
+        return iter(self.elements.values())
+
+    def __len__(self):
+        return len(self.elements)
+
     def __getitem__(self, key):
         return self.data[key]
 
-    def __setitem__(self, key, value):
-        self.data[key] = value
+    def append(self, element):
+        self.elements[element.id] = element
+
+    def remove(self, element):
+        del self.elements[element.id]
+
+    def resolve(self, elem_id):
+        """Follow `merged_elements` to the id of the element that contains `elem_id` now.
+        The chain gets shortened on the way, so later calls are faster.
+        """
+        path = []
+        while elem_id in self.merged_elements:
+            path.append(elem_id)
+            elem_id = self.merged_elements[elem_id]
+        for x in path[:-1]:
+            self.merged_elements[x] = elem_id
+        return elem_id
 
     def get_element(self, elem_id):
         """Returns element from the data. Returns `None` if the element is not part out of the output anymore.
         """
-        if elem_id in self.merged_elements:
-            elem_id = self.merged_elements[elem_id]
-        result = list(filter(lambda x: x.id == elem_id, self))
+        # may be gone if the elem was port of footer / header and is gone now (due to dudeplication)
+        return self.elements.get(self.resolve(elem_id))
 
-        # `result` may be empty if the elem was port of footer / header and is gone now (due to dudeplication)
-        if len(result) == 1:
-            return result[0]
-        return None
+    def merge(self, element, next_element, fixed):
+        """Replace `element` with `fixed` (the joined paragraphs, it keeps the id of `element`) and remove `next_element`
+        """
+        self.elements[element.id] = fixed
+        self.remove(next_element)
+        self.merged_elements[next_element.id] = element.id
 
     def get_first_of_type_on_page(self, find_types, idx_page):
         for ele_id in self.order[idx_page]:
@@ -62,38 +94,41 @@ class DocumentOutput:
         gets complicated when footnotes are not re-ordered
         """
         for idx, page in enumerate(self.order[:-1]):
-            logger.info(f"reversing page break page #{idx}")
-            last_element = self.get_last_of_type_on_page(("body", "heading"), idx)
-            next_element = self.get_first_of_type_on_page(("body", "heading"), idx + 1)
+            self.reverse_page_break_at(idx)
 
-            if last_element is None or next_element is None:
-                logger.debug("some element is none, cannot test")
-                continue
+    def reverse_page_break_at(self, idx):
+        """join the last paragraph of page `idx` with the first of the next page if it was split
+        """
+        logger.info(f"reversing page break page #{idx}")
+        last_element = self.get_last_of_type_on_page(("body", "heading"), idx)
+        next_element = self.get_first_of_type_on_page(("body", "heading"), idx + 1)
 
-            if last_element.type == "heading" or next_element.type == "heading":
-                logger.debug("some element is a header, cannot test")
-                continue
+        if last_element is None or next_element is None:
+            logger.debug("some element is none, cannot test")
+            return
 
-            # It cannot contain newlines
-            if last_element.ends_newline:
-                last_element[-1][-1] = last_element[-1][-1].strip()
-                #print(
-                #   f"the last element has ends with a newline. Do not try to join with the next one."
-                #)
-                #continue
-
-            fixed = is_split_paragraph(last_element, next_element, self.lang)
-            if fixed is None:
-                logger.debug("looks like a split paragraph")
-                continue
+        if last_element.type == "heading" or next_element.type == "heading":
+            logger.debug("some element is a header, cannot test")
+            return
+
+        # It cannot contain newlines
+        if last_element.ends_newline:
+            last_element[-1][-1] = last_element[-1][-1].strip()
+            #print(
+            #   f"the last element has ends with a newline. Do not try to join with the next one."
+            #)
+            #continue
 
-            logger.debug("joining the following paragraphs")
-            logger.debug(f"{last_element}\n{next_element}\n{fixed}")
+        fixed = is_split_paragraph(last_element, next_element, self.lang)
+        if fixed is None:
+            logger.debug("looks like a split paragraph")
+            return
 
-            # set new paragraph
-            self[self.data.index(last_element)] = fixed
-            self.data.remove(next_element)
-            self.merged_elements[next_element.id] = last_element.id
+        logger.debug("joining the following paragraphs")
+        logger.debug(f"{last_element}\n{next_element}\n{fixed}")
+
+        # set new paragraph
+        self.merge(last_element, next_element, fixed)
 
     def reverse_paragraph(self):
         """join paragraphs that were split between pages
@@ -101,45 +136,46 @@ class DocumentOutput:
         gets complicated when footnotes are not re-ordered
         """
         for idx, page in enumerate(self.order):
-            #print(f"reversing reverse_paragraph break page #{idx}")
-
-            para = 0;
-            prevparagraph = ""
-            nextparagraph = ""
-            for ele_id in self.order[idx]:
-                ele = self.get_element(ele_id)
-                if ele is None:
-                    continue
-                if ele.type in ("body"):
-                    para += 1;
-
-                    if para > 1:
-                        nextparagraph = ele
-                        #print(para, "::::nextparagraph:::", nextparagraph)
-                        #print(para, "::::prevparagraph:::", prevparagraph)
-                        firstword = nextparagraph[0]
-                        firstword = firstword[0].strip()
-                        #if (len(firstword) > 0) and ((firstword[0].islower()) or (firstword[0].isnumeric())):
-                        if (len(firstword) > 0) and (firstword[0].islower()):
-                            #print("****Start Call is_split_paragraph")
-                            fixed = is_split_paragraph(prevparagraph, nextparagraph, self.lang)
-                            if fixed is None:
-                                #print("looks like a split paragraph")
-                                prevparagraph = ele
-                                continue
-                            else:
-                                ele = fixed
-                                #print("Join Paragraph::::::::::::::;")
-                                # set new paragraph
-                                self[self.data.index(prevparagraph)] = fixed
-                                self.data.remove(nextparagraph)
-                                self.merged_elements[nextparagraph.id] = prevparagraph.id
-                                #print(fixed)
-                        #else:
-                            #print("looks like a split paragraph")
-                    prevparagraph = ele
+            self.reverse_paragraph_on(idx)
 
+    def reverse_paragraph_on(self, idx):
+        """join paragraphs on page `idx` that were split
+        """
+        #print(f"reversing reverse_paragraph break page #{idx}")
 
+        para = 0;
+        prevparagraph = ""
+        nextparagraph = ""
+        for ele_id in self.order[idx]:
+            ele = self.get_element(ele_id)
+            if ele is None:
+                continue
+            if ele.type in ("body"):
+                para += 1;
+
+                if para > 1:
+                    nextparagraph = ele
+                    #print(para, "::::nextparagraph:::", nextparagraph)
+                    #print(para, "::::prevparagraph:::", prevparagraph)
+                    firstword = nextparagraph[0]
+                    firstword = firstword[0].strip()
+                    #if (len(firstword) > 0) and ((firstword[0].islower()) or (firstword[0].isnumeric())):
+                    if (len(firstword) > 0) and (firstword[0].islower()):
+                        #print("****Start Call is_split_paragraph")
+                        fixed = is_split_paragraph(prevparagraph, nextparagraph, self.lang)
+                        if fixed is None:
+                            #print("looks like a split paragraph")
+                            prevparagraph = ele
+                            continue
+                        else:
+                            ele = fixed
+                            #print("Join Paragraph::::::::::::::;")
+                            # set new paragraph
+                            self.merge(prevparagraph, nextparagraph, fixed)
+                            #print(fixed)
+                    #else:
+                        #print("looks like a split paragraph")
+                prevparagraph = ele
 
     def reorder_footnotes(self):
         new_data, all_footsnotes = [], []
@@ -149,27 +185,77 @@ class DocumentOutput:
             else:
                 new_data.append(element)
 
-        self.data = new_data + all_footsnotes
+        self.elements = {e.id: e for e in new_data + all_footsnotes}
 
     def markdown(self):
         return self.text(markdown=True)
 
     def text(self, markdown=False):
-        txt = ""
+        return "".join(self.chunks(markdown))
 
-        txt += "\n\n".join([str(x) for x in flatten(self.header)])
-
-        for element in self:
-            if markdown and element.type == "heading":
-                # prepend dashes
-                txt += "#" * element.level + " "
-            txt += str(element)
+    def chunks(self, markdown=False):
+        """Generate the text (header, elements, footer) in chunks, one per element.
+        Runs of 3 or more newlines are collapsed to 2 on the way (see `NewlineCollapsingWriter`).
+        """
+        f = io.StringIO()
+        writer = NewlineCollapsingWriter(f)
 
-        txt += "\n\n".join([str(x) for x in flatten(self.footer)])
+        def flush():
+            chunk = f.getvalue()
+            f.seek(0)
+            f.truncate()
+            return chunk
 
-        # hotfix, there are sometimes too many newlines
-        txt = re.sub(r"(\n){3,}", "\n\n", txt)
-        return txt
+        writer.write("\n\n".join([str(x) for x in flatten(self.header)]))
+        for element in self:
+            writer.write(element_text(element, markdown))
+            if chunk := flush():
+                yield chunk
+        writer.write("\n\n".join([str(x) for x in flatten(self.footer)]))
+        writer.close()
+        if chunk := flush():
+            yield chunk
+
+    def write(self, f, markdown=False):
+        """Write the text to the file object `f` while rendering it
+        """
+        for chunk in self.chunks(markdown):
+            f.write(chunk)
+
+
+def element_text(element, markdown=False):
+    if markdown and element.type == "heading":
+        # prepend dashes
+        return "#" * element.level + " " + str(element)
+    return str(element)
+
+
+class NewlineCollapsingWriter:
+    """Writes text to a file and collapses runs of 3 or more newlines to 2, also across `write` calls.
+    Same result as the hotfix in `DocumentOutput.text`. Call `close` at the end to write pending newlines.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        # newlines at the end of the text so far, not written yet
+        self.newlines = 0
+
+    def write_newlines(self, n):
+        self.f.write("\n\n" if n >= 3 else "\n" * n)
+
+    def write(self, text):
+        stripped = text.lstrip("\n")
+        if stripped == "":
+            self.newlines += len(text)
+            return
+        self.write_newlines(self.newlines + len(text) - len(stripped))
+        body = stripped.rstrip("\n")
+        self.f.write(re.sub(r"(\n){3,}", "\n\n", body))
+        self.newlines = len(stripped) - len(body)
+
+    def close(self):
+        self.write_newlines(self.newlines)
+        self.newlines = 0
 
 
 class Element:
@@ -3,30 +3,39 @@
 Transforms parsr's JSON to an internal document format, exports to text.
 """
 
-import json
 import logging
 import string
 from collections import Counter
 from functools import cached_property
 from pathlib import Path
 
-from cleantext import clean, fix_bad_unicode
-
-from .dehyphen_wrapper import dehyphen_paragraph, newline_or_not
+from .compact import CompactPage
+from .dedup import remove_duplicates_indexed
+from .dehyphen_wrapper import batched_scoring, dehyphen_paragraph, newline_or_not
 from .doc_info import (
     DocumentInfo,
     avg_word_space,
     most_used_font,
-    remove_duplicates,
     roughly_same_font,
     remove_page_number_header_footer,
 )
 from .doc_output import DocumentOutput, Element
-from .parsr_wrapper import run_parsr
+from .parsr_json import iter_parsr_json
+from .parsr_wrapper import run_parsr, run_parsr_many
 
 logger = logging.getLogger(__name__)
 
 
+def check_gpu(force_gpu):
+    if force_gpu:
+        import torch
+
+        if not torch.cuda.is_available():
+            raise ValueError("not using CUDA (GPU)")
+        else:
+            logger.debug("using CUDA")
+
+
 def extract(
     file_path,
     tables=False,
@@ -37,6 +46,8 @@ def extract(
     fast=False,
     parsr_config={},
     parsr_adjust_cleaner_config=[],
+    parsr_cache=None,
+    pages_per_chunk=None,
     **kwargs,
 ):
     """Run pd3f on the given PDF file.
@@ -54,7 +65,7 @@ def extract(
 
     `fast`: Drop some Parsr steps to speed up computations
 
-    `parsr_location`: Set Parsr location
+    `parsr_location`: Set Parsr location, `host:port` or a list of them to distribute the work (see `pd3f.parsr_pool`)
 
     pd3f provides a base config for parsr. To customize it, you have two choices:
 
@@ -74,14 +85,13 @@ def extract(
         parsr_adjust_cleaner_config=[["reading-order-detection", {"minVerticalGapWidth": 20}])
     ```
 
-    """
-    if force_gpu:
-        import torch
+    `parsr_cache`: skip Parsr for PDFs that were already processed with the same config. `True` to use the default cache in `~/.cache/pd3f/parsr`, or a `pd3f.parsr_cache.ParsrCache`.
 
-        if not torch.cuda.is_available():
-            raise ValueError("not using CUDA (GPU)")
-        else:
-            logger.debug("using CUDA")
+    `pages_per_chunk`: split long PDFs into chunks of this many pages that Parsr processes at the same time (requires `pypdf`)
+
+    Further keyword arguments are passed to `Export`, e.g. `batch_size` to score the whole document in batches.
+    """
+    check_gpu(force_gpu)
 
     input_json, tables_csv = run_parsr(
         file_path,
@@ -90,6 +100,8 @@ def extract(
         fast=fast,
         config=parsr_config,
         adjust_cleaner_config=parsr_adjust_cleaner_config,
+        cache=parsr_cache,
+        pages_per_chunk=pages_per_chunk,
     )
     e = Export(
         input_json,
@@ -103,6 +115,51 @@ def extract(
     return e.text(), tables_csv
 
 
+def extract_many(
+    file_paths,
+    tables=False,
+    experimental=False,
+    force_gpu=False,
+    lang="multi",
+    parsr_location="localhost:3001",
+    fast=False,
+    parsr_config={},
+    parsr_adjust_cleaner_config=[],
+    parsr_cache=None,
+    max_in_flight=None,
+    pages_per_chunk=None,
+    **kwargs,
+):
+    """Run pd3f on many PDF files, Parsr works on up to `max_in_flight` of them at the same time (`None`: limited by the Parsr instances).
+
+    Yields `(file_path, text, tables_csv)` in the order Parsr finishes the files. The other arguments are the same as for `extract`,
+    with `pages_per_chunk` the chunks of all files are processed at the same time.
+    """
+    check_gpu(force_gpu)
+
+    for file_path, (input_json, tables_csv) in run_parsr_many(
+        file_paths,
+        max_in_flight=max_in_flight,
+        check_tables=tables,
+        parsr_location=parsr_location,
+        fast=fast,
+        config=parsr_config,
+        adjust_cleaner_config=parsr_adjust_cleaner_config,
+        cache=parsr_cache,
+        pages_per_chunk=pages_per_chunk,
+    ):
+        e = Export(
+            input_json,
+            seperate_header_footer=experimental,
+            footnotes_last=experimental,
+            remove_page_number=experimental,
+            lang=lang,
+            fast=fast,
+            **kwargs,
+        )
+        yield file_path, e.text(), tables_csv
+
+
 class LinesWithNone:
     """Utility class to make it easier to work with lines that may be None (invalid).
     """
@@ -170,16 +227,14 @@ class Export:
         ocrd=None,
         lang="multi",
         fast=False,
+        batch_size=None,
+        prefilter=None,
     ):
-        if type(input_json) is str:
-            self.input_data = json.loads(Path(input_json).read_text())
-        elif isinstance(input_json, Path):
-            self.input_data = json.loads(input_json.read_text())
-        elif type(input_json) is dict:
-            self.input_data = input_json
-        else:
-            raise ValueError("problem with reading input json data")
+        """`batch_size`: collect all language model candidates of the document first, then score them in batches of this size.
+        The output is the same as without batching (scoring one candidate at a time).
 
+        `prefilter`: a `pd3f.prefilter.Prefilter` to take obvious line-join / dehyphenation decisions without the language model.
+        """
         self.remove_punct_paragraph = remove_punct_paragraph
         self.seperate_header_footer = seperate_header_footer
         self.remove_duplicate_header_footer = remove_duplicate_header_footer
@@ -190,6 +245,9 @@ class Export:
         self.footnotes_last = footnotes_last
         self.ocrd = ocrd  # not used atm
         self.lang = lang  # name of Flair model (where the language is included)
+        self.prefilter = prefilter
+        self.fast = fast
+        self.batch_size = batch_size
 
         if seperate_header_footer and any((remove_footer, remove_header)):
             raise ValueError(
@@ -200,44 +258,73 @@ class Export:
         # The same looking font is sometimes super different for OCRd PDFs. Is it a bug?
         self.consider_font_size_linebreak = False
 
-        if fast:
-            # In the fast mode, not all elments are classified via Parsr. So we may have some leftover values with None.
-            # pd3f-core only works with non-none elements so remove them here.
+        self.run(input_json)
 
-            # FIXME: This is dirty because `fast` is also encoded in `lang`
-            self.delete_none_elements()
+    def run(self, input_json):
+        if type(input_json) is str or isinstance(input_json, Path):
+            # collect the statistics while reading the pages one by one
+            self.input_data, self.info = self.load(input_json, self.fast)
+        elif type(input_json) is dict:
+            self.input_data = input_json
+            if self.fast:
+                self.delete_none_elements()
+            # the pages are converted to the internal representation, see `pd3f.compact`
+            pages = [CompactPage(p, idx) for idx, p in enumerate(input_json["pages"])]
+            self.input_data = {**input_json, "pages": pages}
+            self.info = DocumentInfo(self.input_data)
+        else:
+            raise ValueError("problem with reading input json data")
 
-        self.info = DocumentInfo(self.input_data)
         self.fix_headers_footers()
-        self.export()
+
+        if self.batch_size is None:
+            self.export()
+        else:
+            self.export_batched(self.batch_size)
 
     def delete_none_elements(self):
+        # In the fast mode, not all elments are classified via Parsr. So we may have some leftover values with None.
+        # pd3f-core only works with non-none elements so remove them here.
+
+        # FIXME: This is dirty because `fast` is also encoded in `lang`
         for p in self.input_data["pages"]:
             p["elements"] = list(filter(None, p["elements"]))
 
-    def export_header_footer(self):
+    @staticmethod
+    def load(path, fast):
+        """Read Parsr's JSON page by page (see `pd3f.parsr_json`), returns the data (with `pd3f.compact.CompactPage`s) and its `DocumentInfo`
+        """
+        data = {"pages": []}
+        info = DocumentInfo()
+        for key, value in iter_parsr_json(path):
+            if key == "pages":
+                if fast:
+                    value["elements"] = list(filter(None, value["elements"]))
+                page = CompactPage(value, len(data["pages"]))
+                info.add_page(page)
+                data["pages"].append(page)
+            else:
+                data[key] = value
+        info.finish(data["fonts"])
+        return data, info
+
+    def export_header_footer(self, pages):
         headers, footers = [], []
 
-        for idx_page, page in enumerate(self.input_data["pages"]):
+        for idx_page, page in enumerate(pages):
             header_per_page, footer_per_page = [], []
-            for element in page["elements"]:
-                if (
-                    "isHeader" in element["properties"]
-                    and element["properties"]["isHeader"]
-                ):
+            for element in page.blocks:
+                if "isHeader" in element.properties and element.properties["isHeader"]:
                     header_per_page.append(element)
 
-                if (
-                    "isFooter" in element["properties"]
-                    and element["properties"]["isFooter"]
-                ):
+                if "isFooter" in element.properties and element.properties["isFooter"]:
                     footer_per_page.append(element)
             headers.append(header_per_page)
             footers.append(footer_per_page)
 
         if self.remove_duplicate_header_footer:
-            headers = remove_duplicates(headers, self.lang)
-            footers = remove_duplicates(footers, self.lang)
+            headers = remove_duplicates_indexed(headers, self.lang)
+            footers = remove_duplicates_indexed(footers, self.lang)
 
         cleaned_header, cleaned_footer, footnotes = [], [], []
         for idx_page, (header_per_page, footer_per_page) in enumerate(
@@ -260,54 +347,29 @@ class Export:
     def fix_headers_footers(self):
         """The output for header and footer for Parsr is not the best. Make use of some simple heuristics based on the font to improve it.
         """
-        for idx_page, page in enumerate(self.input_data["pages"]):
-            for idx_e, e in enumerate(page["elements"]):
-                if "isHeader" in e["properties"] and e["properties"]["isHeader"]:
-                    if self.info.is_body_paragrah(e):
-                        del self.input_data["pages"][idx_page]["elements"][idx_e][
-                            "properties"
-                        ]["isHeader"]
-                if "isFooter" in e["properties"] and e["properties"]["isFooter"]:
-                    if self.info.is_body_paragrah(e):
-                        del self.input_data["pages"][idx_page]["elements"][idx_e][
-                            "properties"
-                        ]["isFooter"]
+        for page in self.input_data["pages"]:
+            for e in page.blocks:
+                self.fix_header_footer(e)
+
+    def fix_header_footer(self, e):
+        if "isHeader" in e.properties and e.properties["isHeader"]:
+            if self.info.is_body_paragrah(e):
+                del e.properties["isHeader"]
+        if "isFooter" in e.properties and e.properties["isFooter"]:
+            if self.info.is_body_paragrah(e):
+                del e.properties["isFooter"]
 
     def export(self):
         cleaned_header, cleaned_footer, new_footnotes = None, None, None
 
         if self.seperate_header_footer:
-            cleaned_header, cleaned_footer, new_footnotes = self.export_header_footer()
+            cleaned_header, cleaned_footer, new_footnotes = self.export_header_footer(
+                self.input_data["pages"]
+            )
 
         cleaned_data = []
         for idx_page, page in enumerate(self.input_data["pages"]):
-            logger.info(f"export page #{idx_page}")
-            for element in page["elements"]:
-                if (
-                    (self.seperate_header_footer or self.remove_header)
-                    and "isHeader" in element["properties"]
-                    and element["properties"]["isHeader"]
-                ):
-                    continue
-                if (
-                    (self.seperate_header_footer or self.remove_footer)
-                    and "isFooter" in element["properties"]
-                    and element["properties"]["isFooter"]
-                ):
-                    continue
-                # currently not used
-                if element["type"] == "heading":
-                    cleaned_data.append(self.export_heading(element))
-                if element["type"] == "paragraph":
-                    result_para = self.export_paragraph(element, idx_page)
-                    result_para and cleaned_data.append(result_para)
-
-            # only append new foofnotes here, most likel get reorced anyhow
-            if new_footnotes is not None:
-                footer_on_this_page = [
-                    x for x in new_footnotes if x.idx_page == idx_page
-                ]
-                cleaned_data += footer_on_this_page
+            cleaned_data += self.export_page(page, idx_page, new_footnotes)
 
         if self.remove_page_number:
             cleaned_header = remove_page_number_header_footer(cleaned_header)
@@ -327,6 +389,50 @@ class Export:
 
         self.doc.reverse_paragraph()
 
+    def export_page(self, page, idx_page, new_footnotes):
+        logger.info(f"export page #{idx_page}")
+        cleaned_data = []
+        for element in page.blocks:
+            if (
+                (self.seperate_header_footer or self.remove_header)
+                and "isHeader" in element.properties
+                and element.properties["isHeader"]
+            ):
+                continue
+            if (
+                (self.seperate_header_footer or self.remove_footer)
+                and "isFooter" in element.properties
+                and element.properties["isFooter"]
+            ):
+                continue
+            # currently not used
+            if element.type == "heading":
+                cleaned_data.append(self.export_heading(element))
+            if element.type == "paragraph":
+                result_para = self.export_paragraph(element, idx_page)
+                result_para and cleaned_data.append(result_para)
+
+        # only append new foofnotes here, most likel get reorced anyhow
+        if new_footnotes is not None:
+            footer_on_this_page = [x for x in new_footnotes if x.idx_page == idx_page]
+            cleaned_data += footer_on_this_page
+        return cleaned_data
+
+    def export_batched(self, batch_size):
+        """Export in rounds: collect the texts to score, score them in batches, apply the decisions.
+
+        A decision may depend on previous ones (e.g. dehyphenation after adding newlines), so new texts can come up.
+        The export is done when a round does not require new scores.
+        """
+        with batched_scoring(self.lang, batch_size) as scorer:
+            n_round = 0
+            while True:
+                n_round += 1
+                self.export()
+                if scorer.flush() == 0:
+                    break
+            logger.info(f"batched export finished after {n_round} rounds")
+
     def add_linebreak(
         self, line, next_line, text_line, text_next_line, paragraph, num_lines
     ):
@@ -341,10 +447,8 @@ class Export:
                 return True
 
         avg_space = avg_word_space(line)
-        space_para_line = line["box"]["l"] - paragraph["box"]["l"]
-        available_space = (
-            paragraph["box"]["w"] - line["box"]["w"] - avg_space - space_para_line
-        )
+        space_para_line = line.l - paragraph.box.l
+        available_space = paragraph.box.w - line.w - avg_space - space_para_line
 
         # if there is no next line
         if next_line is None or not next_line or text_next_line is None:
@@ -370,7 +474,7 @@ class Export:
             #print("Case 3.1 end with -")
             return False
 
-        if available_space >= next_line["content"][0]["box"]["w"]:
+        if available_space >= next_line.words[0].w:
             logger.debug(
                 f"There is enough space on the lext for the next word. So adding a linebreak between {text_line}{text_next_line}"
             )
@@ -392,9 +496,13 @@ class Export:
 
         logger.debug("testing the lines: ")
         logger.debug(f"{text_line} {text_next_line}")
-        return newline_or_not(" ".join(text_line), " ".join(text_next_line), self.lang)
+        return newline_or_not(
+            " ".join(text_line), " ".join(text_next_line), self.lang, self.prefilter
+        )
 
     def line_to_words(self, line):
+        from cleantext import fix_bad_unicode
+
         words, fonts = [], []
         prev_right = 0
         treshold1 = 60;
@@ -403,34 +511,34 @@ class Export:
         else:
             treshold1 = 60
 
-        for word in line["content"]:
+        for word in line.words:
             istab = False
-            if word["type"] == "word":
-                box = word["box"]
-                if prev_right != 0:
-                    space = box["l"] - prev_right
-
-                    # if space > self.info.median_word_space * 4.25:
-                    if space > treshold1:
-                        istab=True
-                w_fixed = word["content"]
-                w_fixed = fix_bad_unicode(w_fixed).strip()
-                if istab:
-                    words.append("@TAB@"+w_fixed)
-                else:
-                    words.append(w_fixed)
-                fonts.append(word["font"])
-                prev_right = word["box"]["l"] + word["box"]["w"]
+            if prev_right != 0:
+                space = word.l - prev_right
+
+                # if space > self.info.median_word_space * 4.25:
+                if space > treshold1:
+                    istab=True
+            w_fixed = word.content
+            w_fixed = fix_bad_unicode(w_fixed).strip()
+            if istab:
+                words.append("@TAB@"+w_fixed)
+            else:
+                words.append(w_fixed)
+            fonts.append(word.font)
+            prev_right = word.l + word.w
         return words, fonts
 
     def lines_to_paragraph(self, paragraph, idx_page, test_footnote):
+        from cleantext import clean
+
         def no_alphanum_char(text):
             """Checks if text only contains non-alpha-num chars, e.g. puncts
             """
             text = clean(text, no_punct=True)
             return any([x.isalnum() for x in text])
 
-        raw_lines = paragraph["content"]
+        raw_lines = paragraph.lines
         font_counter = Counter()
         lines = []
 
@@ -481,14 +589,14 @@ class Export:
                     if (
                         lines[i][0].isnumeric()
                         and lines[i + 1][0].isnumeric()
-                        and raw_lines[i + 1]["content"][0]["font"]
-                        != raw_lines[i]["content"][-1]["font"]
+                        and raw_lines[i + 1].words[0].font
+                        != raw_lines[i].words[-1].font
                     ):
                         lines[i].append("\n")
                     else:
                         lines[i].append(" ")
             # TODO: dehyphen
-            return Element("footnotes", lines.valid, paragraph["id"], idx_page=idx_page)
+            return Element("footnotes", lines.valid, paragraph.id, idx_page=idx_page)
         else:
             # ordinary paragraph
             #print("case 2: ")
@@ -522,13 +630,15 @@ class Export:
 
             if self.remove_hyphens:
                 #print("dehyphen START:")
-                lines = dehyphen_paragraph(lines, lang=self.lang)
+                lines = dehyphen_paragraph(
+                    lines, lang=self.lang, prefilter=self.prefilter
+                )
                 #print("lines 4: ", lines)
 
             return Element(
                 "body",
                 lines,
-                paragraph["id"],
+                paragraph.id,
                 idx_page=idx_page,
                 num_newlines=num_newlines,
                 ends_newline=ends_newline,
@@ -536,12 +646,11 @@ class Export:
 
     # not working right now
     def export_heading(self, e):
-        raw_lines = e["content"]
         lines = []
-        for l in raw_lines:
+        for l in e.lines:
             rl, _ = self.line_to_words(l)
             lines.append(rl)
-        return Element("heading", lines, e["id"], e["level"])
+        return Element("heading", lines, e.id, e.level)
 
     def export_paragraph(self, e, idx_page, test_footnote=True):
         return self.lines_to_paragraph(e, idx_page, test_footnote)
@@ -568,17 +677,17 @@ class Export:
             return False
 
         # check if this is the last paragraph
-        if self.info.order_page[idx_page][-1] != paragraph["id"]:
+        if self.info.order_page[idx_page][-1] != paragraph.id:
             return False
 
         # if the previous element ends with `:` it expects something, so it can't be the last paragraph
         # print("self.info.order_page[idx_page]: ", self.info.order_page[idx_page])
         if len(self.info.order_page[idx_page]) > 1:
             prev_elem = self.info.id_to_elem[self.info.order_page[idx_page][-2]]
-            prev_elem_words, _ = self.line_to_words(prev_elem["content"][-1])
+            prev_elem_words, _ = self.line_to_words(prev_elem.lines[-1])
             # print("prev_elem_words[-1]==", prev_elem_words[-1])
             if prev_elem_words[-1].endswith(":"):
-                logger.debug(f"Id of cur para: {paragraph['id']}")
+                logger.debug(f"Id of cur para: {paragraph.id}")
                 logger.debug(
                     f"not a footnote para because of : in {prev_elem_words[-1]}"
                 )
@@ -596,8 +705,15 @@ class Export:
     def text(self):
         return self.doc.text()
 
+    def chunks(self, markdown=False):
+        """Generate the text in chunks, see `DocumentOutput.chunks`
+        """
+        return self.doc.chunks(markdown)
+
     def save_markdown(self, output_path):
-        Path(output_path).write_text(self.markdown())
+        with open(output_path, "w") as f:
+            self.doc.write(f, markdown=True)
 
     def save_text(self, output_path):
-        Path(output_path).write_text(self.text())
+        with open(output_path, "w") as f:
+            self.doc.write(f)
@@ -1,17 +1,47 @@
 """Compare geometric shapes
+
+The points are the corners of axis-aligned boxes (see `doc_info.only_points`), so the bounding box of the convex
+hull is just the minimum and maximum of the coordinates.
 """
 
-from shapely.geometry import MultiPoint, box
+import numpy as np
 
 
 def bbox(points):
+    """Bounding box `(min_x, min_y, max_x, max_y)` of the points
+    """
     assert len(points) >= 4
-    h = MultiPoint(points).convex_hull
-    return box(*h.bounds)
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def area(b):
+    return (b[2] - b[0]) * (b[3] - b[1])
+
+
+def sim_bounds(b1, b2):
+    """Shared area of two bounding boxes, relative to the larger one
+    """
+    w = min(b1[2], b2[2]) - max(b1[0], b2[0])
+    h = min(b1[3], b2[3]) - max(b1[1], b2[1])
+    shared_area = max(w, 0) * max(h, 0)
+    return shared_area / max(area(b1), area(b2))
 
 
 def sim_bbox(e1, e2):
-    b1 = bbox(e1)
-    b2 = bbox(e2)
-    shared_area = b1.intersection(b2).area
-    return shared_area / max(b1.area, b2.area)
+    return sim_bounds(bbox(e1), bbox(e2))
+
+
+def sim_bounds_many(b, bs):
+    """`sim_bounds` of the bounding box `b` and each row of the `(n, 4)` array `bs`.
+    It's `nan` if both boxes have no area.
+    """
+    b = np.asarray(b, dtype=float)
+    bs = np.asarray(bs, dtype=float).reshape(-1, 4)
+    w = np.minimum(b[2], bs[:, 2]) - np.maximum(b[0], bs[:, 0])
+    h = np.minimum(b[3], bs[:, 3]) - np.maximum(b[1], bs[:, 1])
+    shared_area = np.maximum(w, 0) * np.maximum(h, 0)
+    areas = (bs[:, 2] - bs[:, 0]) * (bs[:, 3] - bs[:, 1])
+    with np.errstate(invalid="ignore"):
+        return shared_area / np.maximum(area(b), areas)
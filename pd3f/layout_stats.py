@@ -0,0 +1,83 @@
+"""Layout statistics of the lines of a page, computed with NumPy.
+
+The boxes of the lines and words of a `pd3f.compact.CompactPage` are stored
+in arrays. The widths, line spaces (`doc_info.calc_line_space`) and word
+spaces (`doc_info.calc_word_space`) are computed with array operations and
+counted. The medians are taken from the counts without expanding them.
+The values are the same as the ones of the functions in `doc_info`.
+"""
+
+from bisect import bisect_right
+from itertools import accumulate
+from statistics import StatisticsError
+
+import numpy as np
+
+
+def line_boxes(page):
+    """`(n, 4)` array with left, top, width and height of the lines of a `CompactPage`
+    """
+    return np.asarray(page.line_boxes).reshape(-1, 4)
+
+
+def line_spaces(boxes, line_element):
+    """Space between consecutive lines of the same element (see `doc_info.get_lineheight`)
+    """
+    same = line_element[1:] == line_element[:-1]
+    b1, b2 = boxes[:-1][same], boxes[1:][same]
+    # the upper one may be the second line
+    swap = b2[:, 1] < b1[:, 1]
+    upper = np.where(swap[:, None], b2, b1)
+    lower = np.where(swap[:, None], b1, b2)
+    dif = lower[:, 1] - upper[:, 1] - upper[:, 3]
+    return dif[dif > 0]
+
+
+def word_spaces(page):
+    """Average word space (see `doc_info.avg_word_space`) of the lines of elements with more than one line
+    """
+    line_element = np.asarray(page.line_blocks)
+    n_lines = np.bincount(line_element, minlength=1)[line_element]
+    idx_lines = np.flatnonzero(n_lines > 1)
+    if len(idx_lines) == 0:
+        return np.zeros(0)
+
+    word_boxes = np.asarray(page.word_boxes).reshape(-1, 4)
+    word_line = np.asarray(page.word_lines)
+    lefts, widths = word_boxes[:, 0], word_boxes[:, 2]
+
+    # the first word of a line has no margin
+    margins = np.zeros(len(word_line))
+    later = (word_line[1:] == word_line[:-1]) & (word_line[1:] >= 0)
+    margins[1:][later] = (lefts[1:] - (lefts[:-1] + widths[:-1]))[later]
+
+    in_line = word_line >= 0
+    n = len(line_element)
+    # `np.bincount` adds up the margins of a line one after another, as `sum` does
+    sums = np.bincount(word_line[in_line], weights=margins[in_line], minlength=n)[idx_lines]
+    n_words = np.bincount(word_line[in_line], minlength=n)[idx_lines]
+    return np.where(n_words > 1, sums / np.maximum(n_words - 1, 1), sums)
+
+
+def count(values):
+    """Count the values of an array, as a dict to update a `Counter`
+    """
+    unique, counts = np.unique(values, return_counts=True)
+    return dict(zip(unique.tolist(), counts.tolist()))
+
+
+def weighted_median(values, counts):
+    """Same as `statistics.median` of the data where each value occurs `counts` times
+    """
+    if len(values) == 0:
+        raise StatisticsError("no median for empty data")
+    values, counts = zip(*sorted(zip(values, counts), key=lambda x: x[0]))
+    ends = list(accumulate(counts))
+    n = ends[-1]
+
+    def at(i):
+        return values[bisect_right(ends, i)]
+
+    if n % 2 == 1:
+        return at(n // 2)
+    return (at(n // 2 - 1) + at(n // 2)) / 2
@@ -0,0 +1,69 @@
+"""In-process memoization in front of the (slower) disk cache
+"""
+
+import copy
+import threading
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def content_key(x):
+    """Turn (nested) arguments into a hashable key based on their content.
+
+    Much cheaper than pickling the arguments. Objects (e.g. `Element`) are keyed by their attributes.
+    """
+    if isinstance(x, (str, bytes, int, float, bool, type(None))):
+        return x
+    if isinstance(x, (list, tuple)):
+        return tuple(content_key(e) for e in x)
+    if isinstance(x, dict):
+        return tuple((k, content_key(v)) for k, v in sorted(x.items()))
+    return (type(x).__name__, content_key(vars(x)))
+
+
+class LRUCache:
+    """Bounded least-recently-used cache with hit/miss counters.
+
+    Values are copied when stored and when returned because the callers modify them in place.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Returns the cached value for `key`, calls `compute()` on a miss.
+        """
+        with self.lock:
+            if key in self.data:
+                self.hits += 1
+                self.data.move_to_end(key)
+                return copy.deepcopy(self.data[key])
+            self.misses += 1
+
+        value = compute()
+        if self.maxsize > 0:
+            with self.lock:
+                self.data[key] = copy.deepcopy(value)
+                self.data.move_to_end(key)
+                while len(self.data) > self.maxsize:
+                    self.data.popitem(last=False)
+        return value
+
+    def resize(self, maxsize):
+        with self.lock:
+            self.maxsize = maxsize
+            while len(self.data) > max(maxsize, 0):
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.data))
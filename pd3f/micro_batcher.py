@@ -0,0 +1,192 @@
+"""Gather scoring requests of concurrent callers into batches.
+
+Callers (threads, asyncio tasks or the connections of a `ScoringServer`)
+submit texts. A background thread scores them in batches: a batch is sent
+when it is full or when its oldest text has waited `max_wait` seconds. Texts
+are grouped by length to reduce padding.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from dehyphen.dehyphen import Scorer
+
+from .batch_scorer import near_tie, score_batch
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Calls `score_batch` (list of texts -> list of scores) for batches of submitted texts.
+
+    `max_batch_size`: send a batch when it has this many texts (more throughput)
+
+    `max_wait`: send a batch when its oldest text waited this many seconds (less latency)
+
+    `bucket_width`: texts whose lengths differ by less than this go into the same batch
+    """
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait=0.01, bucket_width=32):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.bucket_width = bucket_width
+
+        # bucket -> list of (text, future, time of submission)
+        self.buckets = {}
+        self.cond = threading.Condition()
+        self.closed = False
+
+        self.batch_sizes = Counter()
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.n_texts = 0
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, text):
+        future = Future()
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("micro batcher is closed")
+            bucket = len(text) // self.bucket_width
+            self.buckets.setdefault(bucket, []).append(
+                (text, future, time.monotonic())
+            )
+            self.cond.notify()
+        return future
+
+    def score(self, texts):
+        futures = [self.submit(t) for t in texts]
+        return [f.result() for f in futures]
+
+    async def score_async(self, texts):
+        futures = [asyncio.wrap_future(self.submit(t)) for t in texts]
+        return list(await asyncio.gather(*futures))
+
+    def next_batch(self):
+        """Returns the next batch to score, or the time to wait for one
+        """
+        now = time.monotonic()
+        ready, wait = None, None
+        for bucket, items in self.buckets.items():
+            waited = now - items[0][2]
+            if (
+                len(items) >= self.max_batch_size
+                or waited >= self.max_wait
+                or self.closed
+            ):
+                # the bucket with the oldest text goes first
+                if ready is None or items[0][2] < self.buckets[ready][0][2]:
+                    ready = bucket
+            else:
+                left = self.max_wait - waited
+                wait = left if wait is None else min(wait, left)
+
+        if ready is None:
+            return None, wait
+
+        items = self.buckets[ready]
+        batch = items[: self.max_batch_size]
+        del items[: self.max_batch_size]
+        if len(items) == 0:
+            del self.buckets[ready]
+        return batch, None
+
+    def run(self):
+        while True:
+            with self.cond:
+                while True:
+                    batch, wait = self.next_batch()
+                    if batch is not None:
+                        break
+                    if self.closed:
+                        return
+                    self.cond.wait(wait)
+            self.process(batch)
+
+    def process(self, batch):
+        start = time.monotonic()
+        for _, _, submitted in batch:
+            self.queue_wait_total += start - submitted
+            self.queue_wait_max = max(self.queue_wait_max, start - submitted)
+        self.batch_sizes[len(batch)] += 1
+        self.n_texts += len(batch)
+
+        texts = list(dict.fromkeys(t for t, _, _ in batch))
+        try:
+            scores = dict(zip(texts, self.score_batch(texts)))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for text, future, _ in batch:
+            future.set_result(scores[text])
+
+    def stats(self):
+        """Metrics to tune `max_batch_size` / `max_wait`
+        """
+        return {
+            "texts": self.n_texts,
+            "batches": sum(self.batch_sizes.values()),
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "mean_queue_wait": self.queue_wait_total / max(self.n_texts, 1),
+            "max_queue_wait": self.queue_wait_max,
+        }
+
+    def close(self):
+        """Score the remaining texts and stop the background thread
+        """
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+
+
+class MicroBatchingScorer(Scorer):
+    """`FlairScorer` interface, the texts of concurrent callers are scored together (see `batch_scorer.score_batch`).
+
+    Like `BatchScorer`, a single text (its score is compared with the ones of other calls) and calls whose best
+    scores are within `tie_tolerance` are scored by the wrapped scorer, so the decisions don't depend on the batches.
+    """
+
+    def __init__(self, scorer, tie_tolerance=1e-4, **kwargs):
+        self.scorer = scorer
+        self.tie_tolerance = tie_tolerance
+        # for `scorer_registry.model_size`, there are none for e.g. a `RemoteScorer`
+        self.lms = getattr(scorer, "lms", [])
+        self.batcher = MicroBatcher(self.score_batch, **kwargs)
+
+    def score_batch(self, texts):
+        return score_batch(self.scorer, texts)
+
+    def score(self, texts):
+        assert min(map(len, texts)) > 1, "flair fails if there is only one character"
+        if len(texts) == 1:
+            return self.scorer.score(texts)
+        scores = self.batcher.score(texts)
+        if near_tie(scores, self.tie_tolerance):
+            return self.scorer.score(texts)
+        return scores
+
+    def close(self):
+        self.batcher.close()
+
+
+def micro_batching_factory(base=None, **kwargs):
+    """Scorer factory for `ScorerRegistry`, wraps the scorers of the factory `base` (default: Flair).
+    The other arguments are passed to `MicroBatcher`.
+    """
+    from .scorer_registry import flair_scorer
+
+    base = base or flair_scorer
+
+    def factory(lang, fast):
+        return MicroBatchingScorer(base(lang, fast), **kwargs)
+
+    return factory
@@ -0,0 +1,116 @@
+"""Cache the output of Parsr on disk.
+
+An entry is identified by the hash of the PDF's bytes and the hash of the
+config sent to Parsr (after `setup_config`), so a PDF is only processed again
+if the PDF or the config changes. The entries are gzipped JSON files, the least
+recently used ones are removed when the cache gets too big.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(file_path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def config_hash(parsr_config, check_tables):
+    """The same config always gives the same hash, regardless of the order of the keys
+    """
+    canonical = json.dumps(
+        {"config": parsr_config, "tables": check_tables},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ParsrCache:
+    """Parsr's results (JSON and tables) in a directory
+
+    `max_bytes`: remove the least recently used entries if the (compressed) entries get bigger
+    """
+
+    def __init__(self, path="~/.cache/pd3f/parsr", max_bytes=1000 * 1000 * 1000):
+        self.path = Path(path).expanduser()
+        self.max_bytes = max_bytes
+
+    def key(self, file_path, parsr_config, check_tables):
+        return f"{file_hash(file_path)}-{config_hash(parsr_config, check_tables)}"
+
+    def entry(self, key):
+        return self.path / f"{key}.json.gz"
+
+    def get(self, key):
+        """Returns a tuple `(found, (json, tables))`
+        """
+        try:
+            with gzip.open(self.entry(key), "rt", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            return False, None
+        except (OSError, ValueError):
+            logger.warning(f"removing broken entry {key} from the Parsr cache")
+            self.entry(key).unlink(missing_ok=True)
+            return False, None
+
+        # mark as recently used
+        try:
+            os.utime(self.entry(key))
+        except FileNotFoundError:
+            pass
+        return True, (value["json"], value["tables"])
+
+    def set(self, key, value):
+        self.path.mkdir(parents=True, exist_ok=True)
+        data, tables = value
+        # write to a temporary file first, other processes never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                gz.write(json.dumps({"json": data, "tables": tables}).encode("utf-8"))
+            os.replace(tmp_path, self.entry(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.reduce_size()
+
+    def entries(self):
+        """Existing entries with their size and time of last use, least recently used first
+        """
+        result = []
+        for p in self.path.glob("*.json.gz"):
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            result.append((stat.st_mtime, stat.st_size, p))
+        return sorted(result)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def reduce_size(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            logger.debug(f"evicted {p.name} from the Parsr cache")
+
+    def clear(self):
+        for _, _, p in self.entries():
+            p.unlink(missing_ok=True)
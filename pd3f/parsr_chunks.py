@@ -0,0 +1,101 @@
+"""Process large PDFs in chunks of pages.
+
+The PDF is split into chunks that Parsr processes at the same time (possibly
+on several instances, see `pd3f.parsr_pool`). The JSON outputs are merged
+into one document: pages are numbered continuously, element ids are shifted
+to be unique and the font tables are combined. The steps of pd3f that look at
+the whole document (e.g. removing duplicate headers / footers or reversing
+page breaks) then work on the merged document as usual.
+
+Splitting requires `pypdf` (`pip install "pd3f[chunks]"`).
+"""
+
+import json
+from pathlib import Path
+
+
+def split_pdf(file_path, pages_per_chunk, out_dir, prefix=""):
+    """Write chunks of `pages_per_chunk` pages to `out_dir` (named `{prefix}{stem}_{n:05d}.pdf`), returns their paths in order.
+    Returns `[file_path]` if the PDF is not longer than one chunk.
+    """
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError as e:
+        raise ImportError('splitting PDFs requires pypdf: pip install "pd3f[chunks]"') from e
+
+    reader = PdfReader(str(file_path))
+    n_pages = len(reader.pages)
+    if n_pages <= pages_per_chunk:
+        return [str(file_path)]
+
+    paths = []
+    for idx, start in enumerate(range(0, n_pages, pages_per_chunk)):
+        writer = PdfWriter()
+        for page in reader.pages[start : start + pages_per_chunk]:
+            writer.add_page(page)
+        path = Path(out_dir) / f"{prefix}{Path(file_path).stem}_{idx:05d}.pdf"
+        with open(path, "wb") as f:
+            writer.write(f)
+        paths.append(str(path))
+    return paths
+
+
+def remap_ids(pages, offset, font_ids):
+    """Shift all element ids by `offset` and replace font ids with `font_ids[id]` (in place).
+    Returns the largest id before shifting.
+    """
+    max_id = -1
+    stack = [pages]
+    while stack:
+        x = stack.pop()
+        if isinstance(x, dict):
+            if isinstance(x.get("id"), int):
+                max_id = max(max_id, x["id"])
+                x["id"] += offset
+            if isinstance(x.get("font"), int):
+                x["font"] = font_ids[x["font"]]
+            stack.extend(x.values())
+        elif isinstance(x, list):
+            stack.extend(x)
+    return max_id
+
+
+def merge_parsr_json(chunks):
+    """Merge Parsr's JSON outputs of consecutive chunks of a PDF into one (the chunks get modified).
+    """
+    merged = {k: v for k, v in chunks[0].items() if k not in ("fonts", "pages")}
+    # font without its id -> font of the merged document
+    fonts = {}
+    pages = []
+    metadata = []
+    next_id = 0
+
+    for chunk in chunks:
+        font_ids = {}
+        for font in chunk.get("fonts", []):
+            key = json.dumps({k: v for k, v in font.items() if k != "id"}, sort_keys=True)
+            if key not in fonts:
+                fonts[key] = {**font, "id": len(fonts) + 1}
+            font_ids[font["id"]] = fonts[key]["id"]
+
+        max_id = remap_ids(chunk["pages"], next_id, font_ids)
+        for m in chunk.get("metadata", []):
+            if isinstance(m, dict):
+                if isinstance(m.get("id"), int):
+                    m["id"] += next_id
+                if isinstance(m.get("elements"), list):
+                    m["elements"] = [
+                        e + next_id if isinstance(e, int) else e for e in m["elements"]
+                    ]
+            metadata.append(m)
+
+        for page in chunk["pages"]:
+            page["pageNumber"] = len(pages) + 1
+            pages.append(page)
+        next_id += max_id + 1
+
+    merged["fonts"] = list(fonts.values())
+    merged["pages"] = pages
+    if "metadata" in merged:
+        merged["metadata"] = metadata
+    return merged
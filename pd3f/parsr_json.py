@@ -0,0 +1,119 @@
+"""Read Parsr's JSON output one page at a time.
+
+`json.loads(Path(path).read_text())` holds the whole text and the whole
+parsed document in memory at the same time. Here, the file is read in chunks
+and the pages are decoded one by one (with `json.JSONDecoder.raw_decode`), so
+the text of at most one page is held in memory in addition to the parsed
+data.
+"""
+
+import json
+
+decoder = json.JSONDecoder()
+
+WHITESPACE = " \t\n\r"
+
+
+class Reader:
+    """Buffered reading of a text file, `pos` is the current position in `buf`
+    """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self, min_size=None):
+        """Append at least `min_size` chars (or until the end of the file) to the buffer, drop the consumed part
+        """
+        chunks = [self.buf[self.pos :]]
+        size = len(chunks[0])
+        target = size + (min_size or self.chunk_size)
+        while size < target and not self.eof:
+            chunk = self.f.read(self.chunk_size)
+            if chunk == "":
+                self.eof = True
+            chunks.append(chunk)
+            size += len(chunk)
+        self.buf = "".join(chunks)
+        self.pos = 0
+
+    def skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return
+            self.read_more()
+
+    def peek(self):
+        self.skip_whitespace()
+        if self.pos == len(self.buf):
+            raise ValueError("unexpected end of JSON")
+        return self.buf[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at {self.buf[self.pos:self.pos + 20]!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value
+        """
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                # a number may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # grow the buffer geometrically to not decode a big value too often
+            self.read_more(max(self.chunk_size, len(self.buf) - self.pos))
+
+
+def iter_parsr_json(path, chunk_size=1 << 16):
+    """Yields `("pages", page)` for each page and `(key, value)` for the other top-level fields, in the order of the file.
+    """
+    with open(path, encoding="utf-8") as f:
+        r = Reader(f, chunk_size)
+        r.expect("{")
+        if r.peek() == "}":
+            return
+        while True:
+            key = r.value()
+            r.expect(":")
+            if key == "pages":
+                r.expect("[")
+                if r.peek() == "]":
+                    r.pos += 1
+                else:
+                    while True:
+                        yield "pages", r.value()
+                        if r.peek() == "]":
+                            r.pos += 1
+                            break
+                        r.expect(",")
+            else:
+                yield key, r.value()
+
+            if r.peek() == "}":
+                return
+            r.expect(",")
+
+
+def load_parsr_json(path, chunk_size=1 << 16):
+    """Same result as `json.loads(Path(path).read_text())` for Parsr's JSON
+    """
+    data = {"pages": []}
+    for key, value in iter_parsr_json(path, chunk_size):
+        if key == "pages":
+            data["pages"].append(value)
+        else:
+            data[key] = value
+    return data
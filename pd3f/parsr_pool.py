@@ -0,0 +1,219 @@
+"""Distribute the documents over several Parsr instances.
+
+`parsr_location` of `run_parsr` / `extract` can be a single `host:port`, a list of them or a `ParsrPool`.
+A new job goes to the healthy instance with the fewest outstanding jobs. An instance that can't be
+reached is skipped until it passes a health check again and the job is retried on another instance.
+An HTTP error (e.g. Parsr failed on one PDF) only retries the job, the instance stays in the pool.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from parsr_client import ParsrClient
+
+logger = logging.getLogger(__name__)
+
+
+class NoParsrAvailable(ConnectionError):
+    pass
+
+
+def is_connection_error(error):
+    """The instance can't be reached (in contrast to an error response for a job)
+    """
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class ParsrBackend(ParsrClient):
+    """`ParsrClient` that re-uses its connections (one HTTP session per thread) and fails on HTTP errors.
+    """
+
+    def __init__(self, server, max_jobs=4, timeout=60):
+        super().__init__(server)
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.outstanding = 0
+        self.healthy = True
+        self.last_check = 0.0
+        self.local = threading.local()
+        self.executor_lock = threading.Lock()
+        self.fetch_executor = None
+
+    def __repr__(self):
+        return f"ParsrBackend({self.server!r})"
+
+    def executor(self):
+        """Threads to download the results (see `parsr_wrapper.fetch_results`). They are kept, so are their sessions.
+        """
+        with self.executor_lock:
+            if self.fetch_executor is None:
+                self.fetch_executor = ThreadPoolExecutor(
+                    max_workers=8, thread_name_prefix=f"parsr-{self.server}"
+                )
+            return self.fetch_executor
+
+    def request(self, method, path, **kwargs):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        kwargs.setdefault("timeout", self.timeout)
+        r = session.request(method, f"http://{self.server}/api/v1/{path}", **kwargs)
+        r.raise_for_status()
+        return r
+
+    def send_document(self, file, config, **kwargs):
+        with open(file, "rb") as f_pdf, open(config, "rb") as f_config:
+            packet = {
+                "file": (file, f_pdf, "application/pdf"),
+                "config": (config, f_config, "application/json"),
+            }
+            r = self.request("POST", "document", files=packet)
+        return {
+            "file": file,
+            "config": config,
+            "status_code": r.status_code,
+            "server_response": r.text,
+        }
+
+    def get_status(self, request_id):
+        r = self.request("GET", f"queue/{request_id}")
+        return {"request_id": request_id, "server_response": r.json()}
+
+    def download(self, path, file_path, chunk_size=1 << 20):
+        """Stream the response to a file without holding it in memory
+        """
+        with self.request("GET", path, stream=True) as r, open(file_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+
+    def get_json(self, request_id):
+        return self.request("GET", f"json/{request_id}").json()
+
+    def get_text(self, request_id):
+        return self.request("GET", f"text/{request_id}").text
+
+    def get_markdown(self, request_id):
+        return self.request("GET", f"markdown/{request_id}").text
+
+    def get_table(
+        self, request_id, page=None, table=None, seperator=";", column_names=None
+    ):
+        # same parsing as `ParsrClient.get_table`
+        import pandas as pd
+        from io import StringIO
+
+        if page is None and table is None:
+            r = self.request("GET", f"csv/{request_id}")
+        else:
+            r = self.request("GET", f"csv/{request_id}/{page}/{table}")
+        if r.text == "":
+            return r.text
+        try:
+            df = pd.read_csv(StringIO(r.text), sep=seperator, names=column_names)
+            return df.where((pd.notnull(df)), " ")
+        except Exception:
+            return r.text
+
+    def check_health(self, timeout=5):
+        try:
+            self.request("GET", "default-config", timeout=timeout)
+            self.healthy = True
+        except requests.RequestException:
+            self.healthy = False
+        self.last_check = time.monotonic()
+        return self.healthy
+
+
+class ParsrPool:
+    """Routes jobs to the Parsr instance with the fewest outstanding jobs.
+
+    `max_jobs_per_backend`: maximum number of jobs per instance at the same time
+
+    `health_check_interval`: seconds until a failed instance gets checked again
+
+    `max_attempts`: how often a document is tried (on different instances) before giving up
+    """
+
+    def __init__(
+        self,
+        locations,
+        max_jobs_per_backend=4,
+        health_check_interval=30,
+        max_attempts=3,
+        timeout=60,
+    ):
+        if isinstance(locations, str):
+            locations = [locations]
+        self.backends = [
+            ParsrBackend(l, max_jobs=max_jobs_per_backend, timeout=timeout)
+            for l in locations
+        ]
+        self.health_check_interval = health_check_interval
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+
+    def capacity(self):
+        return sum(b.max_jobs for b in self.backends)
+
+    def check_health(self):
+        """Check all instances now, returns the healthy ones
+        """
+        return [b for b in self.backends if b.check_health()]
+
+    def is_usable(self, backend):
+        if (
+            not backend.healthy
+            and time.monotonic() - backend.last_check > self.health_check_interval
+        ):
+            backend.check_health()
+        return backend.healthy
+
+    def acquire(self):
+        """Reserve a slot on the least busy healthy instance, `None` if all of them are busy.
+        If no instance is healthy, all of them get checked again right away. Raises `NoParsrAvailable` if none passes.
+        """
+        with self.lock:
+            usable = [b for b in self.backends if self.is_usable(b)]
+            if len(usable) == 0:
+                usable = self.check_health()
+            if len(usable) == 0:
+                raise NoParsrAvailable(
+                    f"no healthy Parsr instance in {[b.server for b in self.backends]}"
+                )
+            free = [b for b in usable if b.outstanding < b.max_jobs]
+            if len(free) == 0:
+                return None
+            backend = min(free, key=lambda b: b.outstanding)
+            backend.outstanding += 1
+            return backend
+
+    def release(self, backend, failed=False):
+        """Free the slot, `failed`: the instance can't be reached (see `is_connection_error`)
+        """
+        with self.lock:
+            backend.outstanding -= 1
+            if failed:
+                logger.warning(f"Parsr at {backend.server} can't be reached")
+                backend.healthy = False
+                backend.last_check = time.monotonic()
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def get_pool(parsr_location):
+    """The pool for a location or a list of locations, created once and re-used afterwards
+    """
+    if isinstance(parsr_location, ParsrPool):
+        return parsr_location
+    if isinstance(parsr_location, str):
+        parsr_location = [parsr_location]
+    key = tuple(parsr_location)
+    with pools_lock:
+        if key not in pools:
+            pools[key] = ParsrPool(key)
+        return pools[key]
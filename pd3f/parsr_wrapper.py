@@ -4,12 +4,14 @@
 import importlib.resources
 import json
 import logging
+import os
+import shutil
 import tempfile
+import time
+from collections import deque
 from pathlib import Path
 
-from parsr_client import ParsrClient as client
-
-from .utils import update_dict, write_dict
+from .utils import update_dict
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +52,107 @@ def setup_config(config, adjust_cleaner_config, check_tables, fast):
     return jdata
 
 
+def send_to_parsr(parsr, file_path, parsr_config):
+    """Upload the PDF, returns the id of Parsr's job
+    """
+    with tempfile.NamedTemporaryFile(mode="w+") as tmp_config:
+        json.dump(parsr_config, tmp_config)
+        tmp_config.flush()  # persist
+
+        # TODO: when upgrading to v3.2, use file_path and config_path
+        logger.info(f"sending PDF to Parsr: {file_path}")
+
+        logger.debug(parsr_config)
+
+        response = parsr.send_document(
+            file=file_path, config=tmp_config.name, wait_till_finished=False,
+        )
+    return response["server_response"]
+
+
+def parsr_finished(parsr, request_id):
+    """Parsr reports the progress as long as the job is running
+    """
+    return "progress-percentage" not in parsr.get_status(request_id)["server_response"]
+
+
+def fetch_results(
+    parsr, request_id, file_path, out_dir, text, markdown, check_tables,
+):
+    """Get the results of a finished job, optionally write them to `out_dir`.
+
+    Every artifact is downloaded once and at the same time as the others (by the threads of `ParsrBackend.executor`).
+    With `out_dir`, the responses are streamed to the files and the JSON is parsed from `data.json`.
+    """
+    logger.info(f"got response from Parsr: {file_path}")
+
+    if not out_dir is None:
+        out_dir = Path(out_dir) / Path(file_path).stem
+        out_dir.mkdir(exist_ok=True, parents=True)
+
+    def get_json():
+        if out_dir is None:
+            return parsr.get_json(request_id)
+        parsr.download(f"json/{request_id}", out_dir / "data.json")
+        with open(out_dir / "data.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    # the threads (and their connections) are re-used for the next jobs
+    executor = parsr.executor()
+    json_future = executor.submit(get_json)
+    tables_info_future = None
+    if check_tables:
+        tables_info_future = executor.submit(parsr.get_tables_info, request_id)
+    downloads = []
+    if not out_dir is None:
+        if text:
+            downloads.append(
+                executor.submit(
+                    parsr.download, f"text/{request_id}", out_dir / "text.txt"
+                )
+            )
+        if markdown:
+            downloads.append(
+                executor.submit(
+                    parsr.download, f"markdown/{request_id}", out_dir / "text.md"
+                )
+            )
+
+    tables = None
+    if check_tables:
+        table_futures = [
+            # table gets returned as panda df
+            executor.submit(parsr.get_table, request_id, page, table)
+            for page, table in tables_info_future.result()
+        ]
+        tables = [f.result().to_csv() for f in table_futures]
+
+    data = json_future.result()
+    for f in downloads:
+        # raises the errors of the downloads
+        f.result()
+
+    if not out_dir is None and check_tables:
+        write_tables(out_dir, tables)
+
+    return data, tables
+
+
+def write_tables(out_dir, tables):
+    for idx, t in enumerate(tables):
+        (out_dir / f"table_{idx}.csv").write_text(t, encoding="utf-8")
+
+
+def write_results(out_dir, file_path, data, tables):
+    """Write results (e.g. from the cache) to `out_dir`, like `fetch_results` does
+    """
+    out_dir = Path(out_dir) / Path(file_path).stem
+    out_dir.mkdir(exist_ok=True, parents=True)
+    (out_dir / "data.json").write_text(json.dumps(data))
+    if tables is not None:
+        write_tables(out_dir, tables)
+
+
 def run_parsr(
     file_path,
     out_dir=None,
@@ -60,56 +163,294 @@ def run_parsr(
     check_tables=False,
     fast=False,
     parsr_location="localhost:3001",
+    poll_interval=2,
+    cache=None,
+    pages_per_chunk=None,
     **kwargs,
 ):
     """Wrapper to interact with parsr (using parsr's Python client)
+
+    `parsr_location`: `host:port`, a list of them or a `ParsrPool`
+
+    `cache`: a `ParsrCache` to skip Parsr for PDFs that were already processed with the same config, `True` for the default cache
+
+    `pages_per_chunk`: split long PDFs into chunks of this many pages that are processed at the same time, see `pd3f.parsr_chunks`
+    """
+    for _, result in run_parsr_many(
+        [file_path],
+        out_dir=out_dir,
+        config=config,
+        adjust_cleaner_config=adjust_cleaner_config,
+        text=text,
+        markdown=markdown,
+        check_tables=check_tables,
+        fast=fast,
+        parsr_location=parsr_location,
+        poll_interval=poll_interval,
+        cache=cache,
+        pages_per_chunk=pages_per_chunk,
+    ):
+        return result
+
+
+def run_parsr_many(
+    file_paths,
+    max_in_flight=None,
+    out_dir=None,
+    config={},
+    adjust_cleaner_config=[],
+    text=False,
+    markdown=False,
+    check_tables=False,
+    fast=False,
+    parsr_location="localhost:3001",
+    poll_interval=2,
+    cache=None,
+    pages_per_chunk=None,
+    **kwargs,
+):
+    """Process many PDFs with Parsr at once, at most `max_in_flight` jobs are submitted at the same time
+    (`None`: as many as the Parsr instances of `parsr_location` accept, see `ParsrPool`).
+
+    Yields `(file_path, (json, tables))` in the order the jobs finish. New jobs are submitted
+    when the caller asks for the next result, so Parsr keeps working on the submitted jobs
+    while the caller processes a result. A job that fails because of a network or HTTP error
+    is retried (at most `max_attempts` of the pool times), on another Parsr instance if the instance can't be reached.
+    If no instance is reachable, the jobs wait for one to come back. Results found in `cache` (see `run_parsr`) are yielded
+    right after the first jobs are submitted.
+
+    `pages_per_chunk`: split long PDFs into chunks, see `run_parsr_many_chunked`
     """
-    parsr = client(parsr_location)
+    if pages_per_chunk is not None:
+        yield from run_parsr_many_chunked(
+            file_paths,
+            pages_per_chunk,
+            max_in_flight=max_in_flight,
+            out_dir=out_dir,
+            config=config,
+            adjust_cleaner_config=adjust_cleaner_config,
+            text=text,
+            markdown=markdown,
+            check_tables=check_tables,
+            fast=fast,
+            parsr_location=parsr_location,
+            poll_interval=poll_interval,
+            cache=cache,
+        )
+        return
+
+    import requests
+
+    from .parsr_pool import NoParsrAvailable, get_pool, is_connection_error
+
+    pool = get_pool(parsr_location)
 
     parsr_config = setup_config(config, adjust_cleaner_config, check_tables, fast)
 
-    with tempfile.NamedTemporaryFile(mode="w+") as tmp_config:
-        json.dump(parsr_config, tmp_config)
-        tmp_config.flush()  # persist
+    if cache is True:
+        from .parsr_cache import ParsrCache
 
-        # TODO: when upgrading to v3.2, use file_path and config_path
-        logger.info("sending PDF to Parsr")
+        cache = ParsrCache()
 
-        logger.debug(parsr_config)
+    # file path -> key in the cache
+    keys = {}
+    # (file path, (json, tables)) found in the cache
+    hits = []
+    # (file path, number of failed attempts)
+    queue = deque()
+    for file_path in file_paths:
+        if cache is not None:
+            keys[file_path] = cache.key(file_path, parsr_config, check_tables)
+            # text and markdown are not cached
+            if out_dir is None or not (text or markdown):
+                found, result = cache.get(keys[file_path])
+                if found:
+                    logger.info(f"found Parsr's results in the cache: {file_path}")
+                    if not out_dir is None:
+                        write_results(out_dir, file_path, *result)
+                    hits.append((file_path, result))
+                    continue
+        queue.append((file_path, 0))
+    # (backend, request id) -> (file path, number of failed attempts)
+    in_flight = {}
 
-        parsr.send_document(
-            file=file_path,
-            config=tmp_config.name,
-            wait_till_finished=True,
-            save_request_id=True,
-            silent=False,
-        )
+    def failed(file_path, attempts, error):
+        if attempts + 1 >= pool.max_attempts:
+            raise error
+        logger.warning(f"retrying {file_path} after error: {error}")
+        queue.appendleft((file_path, attempts + 1))
 
-    logger.info("got response from Parsr")
+    try:
+        while queue or in_flight or hits:
+            while queue and (max_in_flight is None or len(in_flight) < max_in_flight):
+                try:
+                    backend = pool.acquire()
+                except NoParsrAvailable as e:
+                    # wait for the running jobs, otherwise wait for an instance (costs an attempt of the next job)
+                    if not in_flight and not hits:
+                        failed(*queue.popleft(), e)
+                    break
+                if backend is None:
+                    break
+                file_path, attempts = queue.popleft()
+                try:
+                    request_id = send_to_parsr(backend, file_path, parsr_config)
+                except requests.RequestException as e:
+                    pool.release(backend, failed=is_connection_error(e))
+                    failed(file_path, attempts, e)
+                    continue
+                in_flight[(backend, request_id)] = file_path, attempts
 
-    tables = []
-    if check_tables:
-        for page, table in parsr.get_tables_info():
-            # table gets returned as panda df
-            tables.append(parsr.get_table(page=page, table=table))
+            finished, hits = hits, []
+            for (backend, request_id), (file_path, attempts) in list(
+                in_flight.items()
+            ):
+                try:
+                    if not parsr_finished(backend, request_id):
+                        continue
+                    result = fetch_results(
+                        backend,
+                        request_id,
+                        file_path,
+                        out_dir,
+                        text,
+                        markdown,
+                        check_tables,
+                    )
+                except requests.RequestException as e:
+                    del in_flight[(backend, request_id)]
+                    pool.release(backend, failed=is_connection_error(e))
+                    failed(file_path, attempts, e)
+                    continue
+                del in_flight[(backend, request_id)]
+                pool.release(backend)
+                if cache is not None:
+                    cache.set(keys[file_path], result)
+                finished.append((file_path, result))
 
-    if not out_dir is None:
-        out_dir = Path(out_dir) / Path(file_path).stem
-        out_dir.mkdir(exist_ok=True, parents=True)
+            yield from finished
 
-        if text:
-            (out_dir / "text.txt").write_text(parsr.get_text())
+            if not finished:
+                time.sleep(poll_interval)
+    finally:
+        # the caller stopped early or there was an error
+        for backend, _ in in_flight:
+            pool.release(backend)
 
-        if markdown:
-            (out_dir / "text.md").write_text(parsr.get_markdown())
 
-        if check_tables:
-            for idx, t in enumerate(tables):
-                (out_dir / f"table_{idx}.csv").write_text(t.to_csv())
+def link_file(source, target):
+    """Symlink (or, if not possible, copy) `source` to `target`, returns the path of `target`
+    """
+    try:
+        os.symlink(Path(source).resolve(), target)
+    except OSError:
+        shutil.copyfile(source, target)
+    return str(target)
 
-        write_dict(parsr.get_json(), out_dir / "data.json")
 
-    if not check_tables:
-        return parsr.get_json(), None
-    return parsr.get_json(), [x.to_csv() for x in tables]
+def run_parsr_many_chunked(
+    file_paths,
+    pages_per_chunk,
+    max_in_flight=None,
+    out_dir=None,
+    config={},
+    adjust_cleaner_config=[],
+    text=False,
+    markdown=False,
+    check_tables=False,
+    fast=False,
+    parsr_location="localhost:3001",
+    poll_interval=2,
+    cache=None,
+):
+    """`run_parsr_many` for long PDFs: they are split into chunks of `pages_per_chunk` pages, Parsr processes the
+    chunks (of all PDFs) at the same time. The results of a PDF get merged when all of its chunks are done.
+    """
+    from .parsr_chunks import merge_parsr_json, split_pdf
+
+    if cache is True:
+        from .parsr_cache import ParsrCache
+
+        cache = ParsrCache()
+
+    parsr_config = setup_config(config, adjust_cleaner_config, check_tables, fast)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        chunks_out_dir = None if out_dir is None else Path(tmp_dir) / "out"
+        # index of the PDF -> its path, key in the cache, its chunks, number of chunks that are not done
+        paths, keys, file_chunks, pending = {}, {}, {}, {}
+        # chunk -> index of the PDF
+        chunk_files = {}
+        for idx, file_path in enumerate(file_paths):
+            if cache is not None:
+                # the chunking changes the output of Parsr, e.g. the detection of headers
+                keys[idx] = cache.key(
+                    file_path,
+                    {"config": parsr_config, "pages_per_chunk": pages_per_chunk},
+                    check_tables,
+                )
+                if out_dir is None or not (text or markdown):
+                    found, result = cache.get(keys[idx])
+                    if found:
+                        if not out_dir is None:
+                            write_results(out_dir, file_path, *result)
+                        yield file_path, result
+                        continue
+
+            # the index makes the names of the chunks (and their outputs) unique, the PDFs may have the same name
+            prefix = f"{idx}_"
+            chunks = split_pdf(file_path, pages_per_chunk, tmp_dir, prefix=prefix)
+            if chunks == [str(file_path)]:
+                chunks = [link_file(file_path, Path(tmp_dir) / (prefix + Path(file_path).name))]
+            logger.info(f"processing {file_path} in {len(chunks)} chunks")
+            paths[idx] = file_path
+            file_chunks[idx] = chunks
+            pending[idx] = len(chunks)
+            chunk_files.update((c, idx) for c in chunks)
+
+        # chunk -> (json, tables)
+        results = {}
+        for c, result in run_parsr_many(
+            list(chunk_files),
+            max_in_flight=max_in_flight,
+            out_dir=chunks_out_dir,
+            config=config,
+            adjust_cleaner_config=adjust_cleaner_config,
+            text=text,
+            markdown=markdown,
+            check_tables=check_tables,
+            fast=fast,
+            parsr_location=parsr_location,
+            poll_interval=poll_interval,
+        ):
+            idx = chunk_files[c]
+            file_path = paths[idx]
+            results[c] = result
+            pending[idx] -= 1
+            if pending[idx] > 0:
+                continue
+
+            chunks = file_chunks[idx]
+            data = merge_parsr_json([results[c][0] for c in chunks])
+            tables = None
+            if check_tables:
+                tables = [t for c in chunks for t in results[c][1]]
+            for c in chunks:
+                del results[c]
+
+            if not out_dir is None:
+                write_results(out_dir, file_path, data, tables)
+                for name, wanted in (("text.txt", text), ("text.md", markdown)):
+                    if wanted:
+                        path = Path(out_dir) / Path(file_path).stem / name
+                        with open(path, "w", encoding="utf-8") as f:
+                            for c in chunks:
+                                f.write(
+                                    (chunks_out_dir / Path(c).stem / name).read_text(
+                                        encoding="utf-8"
+                                    )
+                                )
 
+            if cache is not None:
+                cache.set(keys[idx], (data, tables))
+            yield file_path, (data, tables)
@@ -0,0 +1,205 @@
+"""Cheap decisions in front of the language model.
+
+Many decisions are obvious, e.g. a line ending with `Abs.` is followed by a
+number, `Zusammen-` and `arbeit` form `Zusammenarbeit`. A prefilter answers
+such cases from simple statistics and defers the rest (returns `None`) to the
+language model.
+"""
+
+import json
+import string
+from collections import Counter
+from pathlib import Path
+
+
+class Prefilter:
+    """Base class, subclass to plug in other models. Counts how many decisions were taken / deferred.
+    """
+
+    def __init__(self, threshold=0.95):
+        self.threshold = threshold
+        self.counts = Counter()
+
+    def decide_newline(self, l1, l2):
+        """Return `True` (newline), `False` (space) or `None` (not sure)
+        """
+        return None
+
+    def decide_dehyphen(self, options):
+        """Given the options of `dehyphen` (separate, compound, joined) return the index of the best one or `None`
+        """
+        return None
+
+    def newline_or_not(self, l1, l2):
+        # leave empty lines and single characters to `dehyphen_wrapper.lm_newline_or_not`, it has special cases for them
+        if len(l1.strip()) < 2 or len(l2.strip()) < 2:
+            return self.count("newline_or_not", None)
+        return self.count("newline_or_not", self.decide_newline(l1, l2))
+
+    def dehyphen(self, options):
+        return self.count("dehyphen", self.decide_dehyphen(options))
+
+    def count(self, kind, decision):
+        self.counts[(kind, "deferred" if decision is None else "decided")] += 1
+        return decision
+
+    def avoided(self):
+        """Share of decisions taken without the language model, per kind
+        """
+        kinds = {k for k, _ in self.counts}
+        return {
+            k: self.counts[(k, "decided")]
+            / (self.counts[(k, "decided")] + self.counts[(k, "deferred")])
+            for k in kinds
+        }
+
+
+def normalize(word):
+    return word.strip().lower()
+
+
+class ChainedPrefilter(Prefilter):
+    """Ask the prefilters one after another, the first decision wins.
+    E.g. `ChainedPrefilter(CasePrefilter(), WordFrequencyPrefilter.load(path))`
+    """
+
+    def __init__(self, *prefilters):
+        super().__init__()
+        self.prefilters = prefilters
+
+    def decide_newline(self, l1, l2):
+        for p in self.prefilters:
+            decision = p.decide_newline(l1, l2)
+            if decision is not None:
+                return decision
+        return None
+
+    def decide_dehyphen(self, options):
+        for p in self.prefilters:
+            decision = p.decide_dehyphen(options)
+            if decision is not None:
+                return decision
+        return None
+
+
+class CasePrefilter(Prefilter):
+    """Decide newlines based on the case of the letters (which `normalize` drops):
+
+    - the next line starts with a lowercase letter: the sentence continues, no newline
+    - the line ends with a sentence (`.`, `!`, `?`) and the next one starts with a capital letter: newline
+
+    `min_word_length`: the last word (without punctuation) needs to be at least this long to end a sentence,
+    so most abbreviations (`Dr.`, `Abs.`, `etc.`) are left to the other models.
+    """
+
+    def __init__(self, min_word_length=4):
+        super().__init__()
+        self.min_word_length = min_word_length
+
+    def decide_newline(self, l1, l2):
+        if len(l1.split()) == 0 or len(l2.split()) == 0:
+            return None
+        w1, w2 = l1.split()[-1], l2.split()[0]
+
+        if w2[0].islower():
+            return False
+        if (
+            w1[-1] in ".!?"
+            and len(w1.strip(string.punctuation)) >= self.min_word_length
+            and w2[0].isupper()
+        ):
+            return True
+        return None
+
+
+class WordFrequencyPrefilter(Prefilter):
+    """Decide based on word statistics of a text corpus of the language.
+
+    For newlines: how often is a word the last one of a line, how often is it followed by the next word.
+    For hyphens: how often does the joined word / the word with hyphen appear.
+
+    `min_count`: only decide if the words appeared at least this often
+    """
+
+    def __init__(self, words, breaks, bigrams, threshold=0.95, min_count=5):
+        super().__init__(threshold)
+        self.words = Counter(words)
+        self.breaks = Counter(breaks)
+        self.bigrams = Counter(bigrams)
+        self.min_count = min_count
+
+    @classmethod
+    def from_text(cls, text, **kwargs):
+        """Build from plain text. Newlines are considered as real line breaks (e.g. one paragraph per line).
+        """
+        words, breaks, bigrams = Counter(), Counter(), Counter()
+        for line in text.splitlines():
+            tokens = [normalize(x) for x in line.split()]
+            if len(tokens) == 0:
+                continue
+            words.update(tokens)
+            bigrams.update(" ".join(x) for x in zip(tokens, tokens[1:]))
+            breaks[tokens[-1]] += 1
+        return cls(words, breaks, bigrams, **kwargs)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        data = json.loads(Path(path).read_text())
+        return cls(data["words"], data["breaks"], data["bigrams"], **kwargs)
+
+    def save(self, path):
+        data = {"words": self.words, "breaks": self.breaks, "bigrams": self.bigrams}
+        Path(path).write_text(json.dumps(data, ensure_ascii=False))
+
+    def decide_newline(self, l1, l2):
+        if len(l1.split()) == 0 or len(l2.split()) == 0:
+            return None
+        w1 = normalize(l1.split()[-1])
+        w2 = normalize(l2.split()[0])
+
+        n = self.words[w1]
+        if n < self.min_count:
+            return None
+
+        p_break = self.breaks[w1] / n
+        if p_break >= self.threshold:
+            return True
+        if 1 - p_break >= self.threshold and self.bigrams[f"{w1} {w2}"] > 0:
+            return False
+        return None
+
+    def decide_dehyphen(self, options):
+        _, compound, joined = [normalize(x).strip(string.punctuation) for x in options]
+        n_compound, n_joined = self.words[compound], self.words[joined]
+        n = n_compound + n_joined
+
+        if n < self.min_count:
+            return None
+        if n_joined / n >= self.threshold:
+            return 2
+        if n_compound / n >= self.threshold:
+            return 1
+        return None
+
+
+class PrefilteredScorer:
+    """Use the prefilter's decisions for `dehyphen`, ask the scorer only if the prefilter is not sure.
+
+    `get_scorer`: returns the scorer, only called when needed (avoids loading the language model)
+    """
+
+    def __init__(self, get_scorer, prefilter):
+        self.get_scorer = get_scorer
+        self.prefilter = prefilter
+
+    def score(self, options):
+        decision = self.prefilter.dehyphen(options)
+        if decision is None:
+            return self.get_scorer().score(options)
+        return [0.0 if i == decision else 1.0 for i in range(len(options))]
+
+    def dehyphen_paragraph(self, lines):
+        from dehyphen.dehyphen import Scorer
+
+        # re-use dehyphen's algorithm, it calls `self.score` for each hyphen
+        return Scorer.dehyphen_paragraph(self, lines)
@@ -0,0 +1,140 @@
+"""Re-use the state of the language model for texts with shared prefixes.
+
+`newline_or_not` scores `l1`, `l2` and `l1 + " " + l2`. The forward LM reads
+`l1` twice, the backward LM reads `l2` twice (it reads from right to left).
+Likewise, the options of `dehyphen` and `is_split_paragraph` share long
+prefixes. Here, the texts of one `score` call are arranged in a prefix tree:
+shared prefixes are fed to the LM once, the branches continue from the saved
+recurrent state.
+"""
+
+import math
+
+from dehyphen.dehyphen import Scorer
+
+
+def common_prefix_length(a, b):
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
+class PrefixState:
+    """State of the LM after reading a prefix: hidden state, prediction of the next char and the summed loss
+    """
+
+    def __init__(self, hidden=None, logits=None, loss=0.0):
+        self.hidden = hidden
+        self.logits = logits
+        self.loss = loss
+
+
+class PrefixScorer(Scorer):
+    """`FlairScorer` interface, scores texts of a `score` call along their prefix tree.
+
+    `chars_fed` / `chars_total` count the chars fed to the LMs with / without re-using prefixes.
+    """
+
+    def __init__(self, scorer):
+        self.scorer = scorer
+        self.lms = scorer.lms
+        self.chars_fed = 0
+        self.chars_total = 0
+
+    def score_batch(self, texts):
+        per_lm = [self.lm_perplexities(lm, texts) for lm in self.lms]
+        return [float(sum(x)) for x in zip(*per_lm)]
+
+    def score(self, texts):
+        assert min(map(len, texts)) > 1, "flair fails if there is only one character"
+        return self.score_batch(texts)
+
+    def saved_share(self):
+        return 1 - self.chars_fed / max(self.chars_total, 1)
+
+    def lm_perplexities(self, lm, texts):
+        import torch
+
+        def read(state, chars, keep_state):
+            """Continue reading `chars`, the last char only needs to be fed if the state is needed afterwards.
+            """
+            loss = state.loss
+            if state.logits is not None:
+                target = torch.tensor([lm.dictionary.get_idx_for_item(chars[0])])
+                loss += torch.nn.functional.cross_entropy(
+                    state.logits.view(1, -1), target.to(state.logits.device)
+                ).item()
+
+            feed = chars if keep_state else chars[:-1]
+            if len(feed) == 0:
+                return PrefixState(state.hidden, None, loss)
+
+            ids = [lm.dictionary.get_idx_for_item(c) for c in chars]
+            inputs = torch.tensor(ids[: len(feed)]).unsqueeze(1)
+            hidden = state.hidden
+            if hidden is None:
+                hidden = lm.init_hidden(1)
+            with torch.no_grad():
+                prediction, _, hidden = lm.forward(
+                    inputs.to(next(lm.parameters()).device), hidden
+                )
+            prediction = prediction.view(len(feed), -1)
+            self.chars_fed += len(feed)
+
+            # prediction j is for char j + 1
+            targets = torch.tensor(ids[1:]).to(prediction.device)
+            n_pred = len(targets)
+            if n_pred > 0:
+                loss += torch.nn.functional.cross_entropy(
+                    prediction[:n_pred], targets, reduction="sum"
+                ).item()
+
+            logits = prediction[-1] if keep_state else None
+            return PrefixState(hidden, logits, loss)
+
+        def walk(group, n_prefix, state):
+            """All texts in `group` (sorted) share the prefix of length `n_prefix`, `state` is the LM's state after reading it
+            """
+            if len(group) == 1:
+                t = group[0]
+                results[t] = read(state, t[n_prefix:], False).loss
+                return
+
+            n_common = common_prefix_length(group[0], group[-1])
+            if n_common > n_prefix:
+                state = read(state, group[0][n_prefix:n_common], True)
+            # sorted: a text that ends here comes first
+            if len(group[0]) == n_common:
+                results[group[0]] = state.loss
+                group = group[1:]
+
+            start = 0
+            for i in range(1, len(group) + 1):
+                if i == len(group) or group[i][n_common] != group[start][n_common]:
+                    walk(group[start:i], n_common, state)
+                    start = i
+
+        if not lm.is_forward_lm:
+            texts = [t[::-1] for t in texts]
+
+        results = {}
+        walk(sorted(set(texts)), 0, PrefixState())
+        self.chars_total += sum(len(t) - 1 for t in set(texts))
+
+        # perplexity: exponentiate the mean cross entropy of predicting each char (except the first)
+        return [math.exp(results[t] / (len(t) - 1)) for t in texts]
+
+
+def prefix_scoring_factory(base=None):
+    """Scorer factory for `ScorerRegistry`, `base` creates the `FlairScorer`s (default: Flair)
+    """
+    from .scorer_registry import flair_scorer
+
+    base = base or flair_scorer
+
+    def factory(lang, fast):
+        return PrefixScorer(base(lang, fast))
+
+    return factory
@@ -0,0 +1,224 @@
+"""Persistent storage of language model results, shared between processes.
+
+Results are stored by (model, function, hash of the input). The default
+backend is a single SQLite file in WAL mode: many processes can read and
+write at the same time. The least recently used results are evicted when the
+file gets too big. Snapshots allow to start new workers with a warm cache.
+
+The results are stored as JSON (see `encode_value`), so reading a store that others can write to may give wrong
+results, but doesn't run their code. The file is only readable / writable by its owner.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def input_hash(key):
+    """Stable hash of a content key (see `memo.content_key`)
+    """
+    return hashlib.sha1(repr(key).encode("utf-8")).digest()
+
+
+def encode_value(value):
+    """JSON of a result: booleans, numbers, `None`, lists of words or a `doc_output.Element` (of `is_split_paragraph`)
+    """
+    from .doc_output import Element
+
+    if isinstance(value, Element):
+        value = {
+            "element": {
+                "element_type": value.type,
+                "lines": value.lines,
+                "element_id": value.id,
+                "idx_page": value.idx_page,
+                "num_newlines": value.num_newlines,
+                "level": value.level,
+                "ends_newline": value.ends_newline,
+            }
+        }
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+def decode_value(data):
+    from .doc_output import Element
+
+    value = json.loads(data.decode("utf-8"))
+    if isinstance(value, dict):
+        return Element(**value["element"])
+    return value
+
+
+class ScoreStore:
+    """Interface for storage backends, subclass to plug in other storage
+    """
+
+    def get(self, model, function, key):
+        """Returns a tuple `(found, value)`
+        """
+        raise NotImplementedError
+
+    def set(self, model, function, key, value):
+        raise NotImplementedError
+
+    def get_or_compute(self, model, function, key, compute):
+        found, value = self.get(model, function, key)
+        if found:
+            return value
+        value = compute()
+        self.set(model, function, key, value)
+        return value
+
+
+class SQLiteScoreStore(ScoreStore):
+    """Score store in a single SQLite file
+
+    `max_bytes`: evict least recently used results if the stored results get bigger
+
+    `touch_interval`: only update the access time of a result if it is older (in seconds), avoids a write for every read
+    """
+
+    def __init__(
+        self,
+        path="~/.cache/pd3f/scores.sqlite",
+        max_bytes=100 * 1000 * 1000,
+        touch_interval=60,
+        timeout=30,
+    ):
+        self.path = Path(path).expanduser()
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.timeout = timeout
+        self.writes = 0
+        self.local = threading.local()
+
+    def connection(self):
+        """One connection per process and thread (SQLite connections can't be shared).
+
+        The file is only created when it's used for the first time.
+        """
+        con = getattr(self.local, "con", None)
+        if con is None or self.local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # SQLite creates the journal files with the same permissions
+            os.close(os.open(self.path, os.O_CREAT | os.O_RDWR, 0o600))
+            con = sqlite3.connect(str(self.path), timeout=self.timeout)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            with con:
+                con.execute(
+                    """CREATE TABLE IF NOT EXISTS results (
+                        model TEXT NOT NULL,
+                        function TEXT NOT NULL,
+                        key BLOB NOT NULL,
+                        value BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        last_used REAL NOT NULL,
+                        PRIMARY KEY (model, function, key)
+                    )"""
+                )
+                con.execute(
+                    "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+                )
+            self.local.con = con
+            self.local.pid = os.getpid()
+        return con
+
+    def get(self, model, function, key):
+        h = input_hash(key)
+        con = self.connection()
+        row = con.execute(
+            "SELECT value, last_used FROM results WHERE model=? AND function=? AND key=?",
+            (model, function, h),
+        ).fetchone()
+        if row is None:
+            return False, None
+        try:
+            value = decode_value(row[0])
+        except (ValueError, KeyError, TypeError):
+            # e.g. written by an older version
+            return False, None
+
+        now = time.time()
+        if now - row[1] > self.touch_interval:
+            with con:
+                con.execute(
+                    "UPDATE results SET last_used=? WHERE model=? AND function=? AND key=?",
+                    (now, model, function, h),
+                )
+        return True, value
+
+    def set(self, model, function, key, value):
+        data = encode_value(value)
+        con = self.connection()
+        with con:
+            con.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (model, function, input_hash(key), data, len(data), time.time()),
+            )
+        self.writes += 1
+        # checking the size is not free, so only do it from time to time
+        if self.writes % 1000 == 0:
+            self.reduce_size()
+
+    def size(self):
+        return self.connection().execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+
+    def reduce_size(self, max_bytes=None):
+        """Delete least recently used results until the stored results are smaller than `max_bytes`
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        con = self.connection()
+        with con:
+            excess = self.size() - max_bytes
+            if excess <= 0:
+                return 0
+
+            rows = con.execute(
+                "SELECT rowid, size FROM results ORDER BY last_used"
+            )
+            to_delete = []
+            for rowid, size in rows:
+                if excess <= 0:
+                    break
+                to_delete.append((rowid,))
+                excess -= size
+            rows.close()
+            con.executemany("DELETE FROM results WHERE rowid=?", to_delete)
+
+        logger.info(f"evicted {len(to_delete)} results from {self.path}")
+        return len(to_delete)
+
+    def export_snapshot(self, path):
+        """Write a consistent copy of the store to `path`, e.g. to seed new workers
+        """
+        with sqlite3.connect(str(path)) as target:
+            self.connection().backup(target)
+        target.close()
+
+    def import_snapshot(self, path):
+        """Add the results of a snapshot, existing results are kept
+        """
+        con = self.connection()
+        con.execute("ATTACH DATABASE ? AS snapshot", (str(path),))
+        try:
+            with con:
+                con.execute(
+                    "INSERT OR IGNORE INTO results SELECT * FROM snapshot.results"
+                )
+        finally:
+            con.execute("DETACH DATABASE snapshot")
+        self.reduce_size()
+
+    def clear(self):
+        with self.connection() as con:
+            con.execute("DELETE FROM results")
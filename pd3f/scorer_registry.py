@@ -0,0 +1,113 @@
+"""Keep language models of several languages loaded at the same time
+"""
+
+import gc
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def parse_model_name(lang):
+    """Simplify Flair's naming of models, e.g. `multi-v0-fast` -> `("multi-v0", True)`
+    """
+    if lang.endswith("-fast"):
+        return lang[:-5], True
+    return lang, False
+
+
+def flair_scorer(lang, fast):
+    from dehyphen import FlairScorer
+
+    return FlairScorer(lang=lang, fast=fast)
+
+
+def model_size(scorer):
+    """Memory used by the parameters of the scorer's language models (in bytes)
+    """
+    return sum(
+        p.numel() * p.element_size()
+        for lm in getattr(scorer, "lms", [])
+        for p in lm.parameters()
+    )
+
+
+def close_scorer(scorer):
+    """Some scorers hold resources (e.g. threads)
+    """
+    if hasattr(scorer, "close"):
+        scorer.close()
+
+
+class ScorerRegistry:
+    """Holds `FlairScorer`s by language and speed, evicts the least recently used if there are too many.
+
+    `max_bytes`: memory budget for the parameters of all loaded models, `None` for no limit
+
+    `max_models`: maximum number of loaded scorers, `None` for no limit
+
+    `factory`: creates a scorer given `lang` and `fast`
+    """
+
+    def __init__(self, max_bytes=None, max_models=None, factory=flair_scorer):
+        self.max_bytes = max_bytes
+        self.max_models = max_models
+        self.factory = factory
+        self.scorers = OrderedDict()
+        self.sizes = {}
+        self.lock = threading.RLock()
+
+    def get(self, lang):
+        key = parse_model_name(lang)
+        with self.lock:
+            if key in self.scorers:
+                self.scorers.move_to_end(key)
+                return self.scorers[key]
+
+            logger.info(f"loading language model {lang}")
+            scorer = self.factory(*key)
+            self.scorers[key] = scorer
+            self.sizes[key] = model_size(scorer)
+            self.evict()
+            return scorer
+
+    def preload(self, *langs):
+        """Load the models upfront, e.g. when starting a long-running worker
+        """
+        for lang in langs:
+            self.get(lang)
+
+    def loaded(self):
+        with self.lock:
+            return list(self.scorers)
+
+    def total_bytes(self):
+        return sum(self.sizes.values())
+
+    def over_budget(self):
+        if self.max_models is not None and len(self.scorers) > self.max_models:
+            return True
+        return self.max_bytes is not None and self.total_bytes() > self.max_bytes
+
+    def evict(self):
+        """Remove least recently used scorers until within budget, always keep the most recent one
+        """
+        evicted = False
+        with self.lock:
+            while len(self.scorers) > 1 and self.over_budget():
+                key, scorer = self.scorers.popitem(last=False)
+                del self.sizes[key]
+                close_scorer(scorer)
+                evicted = True
+                logger.info(f"evicted language model {key}")
+        if evicted:
+            gc.collect()
+
+    def clear(self):
+        with self.lock:
+            for scorer in self.scorers.values():
+                close_scorer(scorer)
+            self.scorers.clear()
+            self.sizes.clear()
+        gc.collect()
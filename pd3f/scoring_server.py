@@ -0,0 +1,240 @@
+"""Share the language models between many worker processes.
+
+A single server process loads the models, the workers send their requests
+over a Unix socket. The requests are pickled, so the clients have to authenticate with a
+secret key. Start the server with:
+
+```bash
+python -m pd3f.scoring_server /tmp/pd3f.sock --key-file /tmp/pd3f.key --preload de
+```
+
+If the key file does not exist, a new key is written to it (readable only by the user). The socket
+is also only accessible by the user.
+
+Then, in the workers, call `pd3f.dehyphen_wrapper.use_scoring_server("/tmp/pd3f.sock", key_file="/tmp/pd3f.key")`.
+Or set the environment variables `PD3F_SCORING_SERVER=/tmp/pd3f.sock` and `PD3F_SCORING_SERVER_KEY_FILE=/tmp/pd3f.key`
+(or the key itself in `PD3F_SCORING_SERVER_KEY`) and call `pd3f.dehyphen_wrapper.use_scoring_server_from_env()`.
+"""
+
+import argparse
+import logging
+import os
+import pickle
+import secrets
+import socket
+import struct
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (
+    Client,
+    Listener,
+    answer_challenge,
+    deliver_challenge,
+)
+
+from .scorer_registry import ScorerRegistry
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("score", "dehyphen_paragraph", "is_split_paragraph")
+
+
+def create_key_file(path):
+    """Write a new random key to `path` (mode 0600), returns the key
+    """
+    key = secrets.token_hex(32).encode()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def read_key_file(path):
+    with open(path, "rb") as f:
+        key = f.read().strip()
+    if len(key) == 0:
+        raise ValueError(f"the key file {path} is empty")
+    return key
+
+
+def check_authkey(authkey):
+    if not authkey:
+        raise ValueError("the scoring server requires an `authkey`, see `create_key_file`")
+    return authkey
+
+
+class ScoringServer:
+    """Serves requests of `RemoteScorer`s, one thread per connection. Only clients with the `authkey` (bytes) can connect.
+
+    `auth_timeout`: seconds a client has to authenticate, the connection is closed afterwards
+    """
+
+    def __init__(self, address, authkey, registry=None, auth_timeout=5):
+        self.address = address
+        self.authkey = check_authkey(authkey)
+        self.registry = registry or ScorerRegistry()
+        self.auth_timeout = auth_timeout
+        # the socket is created with mode 0600
+        umask = os.umask(0o177)
+        try:
+            # without `authkey`: the clients authenticate in their threads, so a slow client does not block the others
+            self.listener = Listener(address, family="AF_UNIX")
+        finally:
+            os.umask(umask)
+        self.running = False
+
+    def serve_forever(self):
+        self.running = True
+        logger.info(f"scoring server listening on {self.address}")
+        while self.running:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                if not self.running:
+                    break
+                logger.exception("could not accept a client")
+                continue
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def authenticate(self, conn):
+        """Same handshake as `Listener(authkey=...).accept`, but a client that does not answer within `auth_timeout` gets an error
+        """
+        set_recv_timeout(conn, self.auth_timeout)
+        deliver_challenge(conn, self.authkey)
+        answer_challenge(conn, self.authkey)
+        set_recv_timeout(conn, 0)
+
+    def handle(self, conn):
+        with conn:
+            try:
+                self.authenticate(conn)
+            except (OSError, EOFError, AuthenticationError) as e:
+                logger.warning(f"rejected a client: {e!r}")
+                return
+
+            while True:
+                try:
+                    method, lang, args = conn.recv()
+                except (OSError, EOFError):
+                    return
+                try:
+                    if method not in METHODS:
+                        raise ValueError(f"unknown method {method}")
+                    scorer = self.registry.get(lang)
+                    response = True, getattr(scorer, method)(*args)
+                except Exception as e:
+                    logger.exception(f"error when handling {method}")
+                    response = False, picklable_error(e)
+                try:
+                    conn.send(response)
+                except OSError:
+                    return
+
+    def shutdown(self):
+        self.running = False
+        # wake up `accept`
+        try:
+            Client(self.address, family="AF_UNIX", authkey=self.authkey).close()
+        except OSError:
+            pass
+        self.listener.close()
+
+
+def set_recv_timeout(conn, timeout):
+    """Reading from the connection raises an `OSError` after `timeout` seconds without data, `0` to wait forever
+    """
+    sock = socket.socket(fileno=os.dup(conn.fileno()))
+    with sock:
+        seconds = int(timeout)
+        sock.setsockopt(
+            socket.SOL_SOCKET,
+            socket.SO_RCVTIMEO,
+            struct.pack("ll", seconds, int((timeout - seconds) * 1e6)),
+        )
+
+
+def picklable_error(e):
+    """The error or, if it can't be sent to the client, a `RuntimeError` with its description
+    """
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        return RuntimeError(repr(e))
+
+
+class RemoteScorer:
+    """Same interface as `FlairScorer` but the work is done by a `ScoringServer`.
+    """
+
+    def __init__(self, address, lang, authkey):
+        self.address = address
+        self.lang = lang
+        self.authkey = check_authkey(authkey)
+        self.local = threading.local()
+
+    def connection(self):
+        """One connection per process and thread
+        """
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def call(self, method, *args):
+        conn = self.connection()
+        conn.send((method, self.lang, args))
+        ok, result = conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def score(self, texts):
+        return self.call("score", list(texts))
+
+    def dehyphen_paragraph(self, lines):
+        return self.call("dehyphen_paragraph", lines)
+
+    def is_split_paragraph(self, para1, para2):
+        return self.call("is_split_paragraph", para1, para2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve pd3f's language models")
+    parser.add_argument("address", help="path of the Unix socket")
+    parser.add_argument(
+        "--key-file",
+        required=True,
+        help="file with the key of the clients, created if it does not exist",
+    )
+    parser.add_argument("--preload", nargs="*", default=[], help="models to load")
+    parser.add_argument("--max-models", type=int, default=None)
+    parser.add_argument(
+        "--micro-batching",
+        action="store_true",
+        help="score the texts of concurrent clients together",
+    )
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=0.01, help="in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    registry = ScorerRegistry(max_models=args.max_models)
+    if args.micro_batching:
+        from .micro_batcher import micro_batching_factory
+
+        registry.factory = micro_batching_factory(
+            max_batch_size=args.max_batch_size, max_wait=args.max_wait
+        )
+    if os.path.exists(args.key_file):
+        authkey = read_key_file(args.key_file)
+    else:
+        authkey = create_key_file(args.key_file)
+    server = ScoringServer(args.address, authkey, registry=registry)
+    server.registry.preload(*args.preload)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
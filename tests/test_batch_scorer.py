@@ -0,0 +1,95 @@
+import string
+
+import pytest
+from dehyphen import FlairScorer
+from flair.data import Dictionary
+from flair.models import LanguageModel
+
+from pd3f.batch_scorer import *
+
+
+def small_scorer():
+    torch = pytest.importorskip("torch")
+    torch.manual_seed(0)
+
+    d = Dictionary()
+    for c in string.printable:
+        d.add_item(c)
+
+    scorer = FlairScorer.__new__(FlairScorer)
+    scorer.lms = [
+        LanguageModel(d, is_forward_lm=forward, hidden_size=32, nlayers=1).eval()
+        for forward in (True, False)
+    ]
+    return scorer
+
+
+def test_lm_perplexities():
+    scorer = small_scorer()
+    texts = ["ab", "Das ist ein Test.", "Das ist", "ein Test.", "Hallo Welt"]
+
+    for lm in scorer.lms:
+        for x, y in zip(lm_perplexities(lm, texts), texts):
+            assert x == pytest.approx(lm.calculate_perplexity(y), rel=1e-5)
+
+
+def test_batch_scorer():
+    scorer = small_scorer()
+    batch = BatchScorer(scorer, batch_size=2)
+    lines = [["Die", "Zusammen-"], ["arbeit", "ist", "gut."]]
+
+    # first round: placeholders only
+    assert batch.dehyphen_paragraph([list(l) for l in lines]) == lines
+    # option 1 and 2 are the same here
+    assert batch.flush() == 2
+    assert batch.flush() == 0
+
+    assert batch.dehyphen_paragraph(
+        [list(l) for l in lines]
+    ) == scorer.dehyphen_paragraph([list(l) for l in lines])
+
+
+class OffByRounding:
+    """Batched scores that differ a little from the exact ones (of `score`)
+    """
+
+    def __init__(self, exact):
+        self.exact = exact
+
+    def score(self, texts):
+        return [self.exact[t] for t in texts]
+
+    def score_batch(self, texts):
+        return [self.exact[t] * (1 + 1e-7) if t == "ab" else self.exact[t] for t in texts]
+
+
+def test_batch_scorer_ties():
+    batch = BatchScorer(OffByRounding({"ab": 2.0, "cd": 2.0, "ef": 3.0}))
+    batch.score(["ab", "cd", "ef"])
+    batch.flush()
+    # "ab" would be worse than "cd" with the batched scores
+    assert batch.score(["ab", "cd", "ef"]) == [2.0, 2.0, 3.0]
+    assert batch.score(["ab", "ef"]) == [2.0 * (1 + 1e-7), 3.0]
+    # a single text is compared with the scores of other calls
+    assert batch.score(["ab"]) == [2.0]
+
+
+def test_batched_scoring_context(monkeypatch):
+    import threading
+
+    from pd3f import dehyphen_wrapper
+
+    monkeypatch.setattr(dehyphen_wrapper.registry, "factory", lambda lang, fast: OffByRounding({}))
+    with dehyphen_wrapper.batched_scoring("de") as scorer:
+        assert dehyphen_wrapper.get_scorer("de") is scorer
+        assert dehyphen_wrapper.active_batch_scorer("en") is None
+
+        other_thread = []
+        t = threading.Thread(
+            target=lambda: other_thread.append(dehyphen_wrapper.active_batch_scorer("de"))
+        )
+        t.start()
+        t.join()
+        assert other_thread == [None]
+    assert dehyphen_wrapper.active_batch_scorer("de") is None
+    dehyphen_wrapper.registry.clear()
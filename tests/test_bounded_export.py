@@ -0,0 +1,92 @@
+import copy
+import json
+import random
+
+import pytest
+
+from pd3f import dehyphen_wrapper
+from pd3f.bounded_export import *
+
+from .test_batch_scorer import small_scorer
+
+WORDS = "der die das und ist ein eine Zusammen- arbeit Vertrag nicht mit von auf Haus- halt Ende. klein Test- fall".split()
+
+
+def make_doc(n_pages, seed=0):
+    """Parsr-like JSON with headers, footers, footnotes and paragraphs that may be split
+    """
+    rnd = random.Random(seed)
+    ids = iter(range(1, 1 << 30))
+    fonts = [
+        {"id": 1, "size": 12, "sizeUnit": "px", "name": "body"},
+        {"id": 2, "size": 9, "sizeUnit": "px", "name": "small"},
+    ]
+
+    def para(t, words, font=1, props=None):
+        lines = []
+        for idx, line_words in enumerate(words):
+            x, content = 50, []
+            for w in line_words:
+                box = {"l": x, "t": t + idx * 14, "w": 6 * len(w), "h": 12}
+                content.append({"id": next(ids), "type": "word", "content": w, "font": font, "box": box})
+                x += 6 * len(w) + 4
+            box = {"l": 50, "t": t + idx * 14, "w": x - 54, "h": 12}
+            lines.append({"id": next(ids), "type": "line", "content": content, "box": box})
+        box = {"l": 50, "t": t, "w": 400, "h": 14 * len(words)}
+        return {"id": next(ids), "type": "paragraph", "content": lines, "properties": props or {}, "box": box}
+
+    pages = []
+    for idx_page in range(n_pages):
+        elements = [para(10, [["Vertrag", "über", "Zusammenarbeit"]], 2, {"isHeader": True})]
+        t = 50
+        for _ in range(3):
+            words = [[rnd.choice(WORDS) for _ in range(rnd.randint(3, 8))] for _ in range(rnd.randint(1, 5))]
+            elements.append(para(t, words))
+            t += 14 * len(words) + 20
+        if idx_page % 2:
+            elements.append(para(t, [["1", "Fußnote", "eins"], ["2", "Fußnote", "zwei"]], 2))
+        elements.append(para(780, [["Seite", str(idx_page + 1)]], 2, {"isFooter": True}))
+        pages.append(
+            {"pageNumber": idx_page + 1, "box": {"l": 0, "t": 0, "w": 600, "h": 800}, "elements": elements}
+        )
+    return {"version": "0", "metadata": [], "fonts": fonts, "pages": pages}
+
+
+@pytest.fixture
+def scorer(monkeypatch):
+    s = small_scorer()
+    dehyphen_wrapper.registry.clear()
+    monkeypatch.setattr(dehyphen_wrapper.registry, "factory", lambda lang, fast: s)
+    monkeypatch.setattr(dehyphen_wrapper, "score_store", None)
+    yield s
+    dehyphen_wrapper.registry.clear()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"footnotes_last": False},
+        {"remove_hyphens": False},
+        {"remove_duplicate_header_footer": False},
+        {"remove_page_number": False},
+    ],
+)
+def test_bounded_export(tmp_path, scorer, options):
+    for seed in range(3):
+        doc = make_doc(6, seed)
+        path = tmp_path / "data.json"
+        path.write_text(json.dumps(doc))
+
+        expected = Export(copy.deepcopy(doc), **options)
+        bounded = BoundedExport(str(path), **options)
+        assert bounded.text() == expected.text()
+        assert bounded.markdown() == expected.markdown()
+
+        bounded.save_text(tmp_path / "out.txt")
+        assert (tmp_path / "out.txt").read_text() == expected.text()
+
+
+def test_bounded_export_needs_path(scorer):
+    with pytest.raises(ValueError):
+        BoundedExport(make_doc(1))
@@ -0,0 +1,23 @@
+from pd3f.compact import *
+
+
+def test_compact_page():
+    def word(text, l):
+        return {"type": "word", "content": text, "font": 2, "box": {"l": l, "t": 10, "w": 20, "h": 12}}
+
+    line = {"id": 5, "type": "line", "content": [word("Hallo", 0), word("Welt", 30)], "box": {"l": 0, "t": 10, "w": 50, "h": 12}}
+    paragraph = {"id": 4, "type": "paragraph", "properties": {"isHeader": True}, "content": [line], "box": {"l": 0, "t": 10, "w": 60, "h": 12}}
+    image = {"id": 6, "type": "image", "properties": {}, "content": []}
+
+    page = CompactPage({"elements": [image, paragraph]}, 3)
+    block = page.blocks[1]
+    assert (block.id, block.type, block.idx_page) == (4, "paragraph", 3)
+    assert block.properties is paragraph["properties"]
+    assert (block.box.l, block.box.w) == (0, 60)
+    assert page.blocks[0].box is None and page.blocks[0].lines == []
+
+    [l] = block.lines
+    assert (l.id, l.l, l.t, l.w, l.h) == (5, 0, 10, 50, 12)
+    assert l.block is block
+    assert [(x.content, x.font, x.l, x.w) for x in l.words] == [("Hallo", 2, 0, 20), ("Welt", 2, 30, 20)]
+    assert [x.content for x in block.words] == ["Hallo", "Welt"]
@@ -0,0 +1,23 @@
+import pytest
+
+from pd3f.cpu_backend import *
+
+from .test_batch_scorer import small_scorer
+
+
+def test_torchscript_scorer():
+    scorer = small_scorer()
+    ts_scorer = TorchScriptScorer(scorer, num_threads=1)
+
+    groups = [
+        ["Das ist", "ein Test.", "Das ist ein Test."],
+        ["Zusammen- arbeit", "Zusammen-arbeit", "Zusammenarbeit"],
+        ["ab", "xy"],
+    ]
+    for texts in groups:
+        assert ts_scorer.score(texts) == pytest.approx(scorer.score(texts), rel=1e-5)
+
+    lines = [["Die", "Zusammen-"], ["arbeit", "ist", "gut."]]
+    assert ts_scorer.dehyphen_paragraph(
+        [list(l) for l in lines]
+    ) == scorer.dehyphen_paragraph([list(l) for l in lines])
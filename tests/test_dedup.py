@@ -0,0 +1,97 @@
+import random
+
+from pd3f.compact import CompactPage
+from pd3f.dedup import *
+from pd3f.dehyphen_wrapper import single_score
+from pd3f.doc_info import only_points, only_text, remove_duplicates, super_similiar
+from pd3f.doc_output import Element
+from pd3f.geometry import bbox, sim_bbox
+
+from .test_bounded_export import scorer
+
+TEXTS = ["Vertrag über Zusammenarbeit", "Vertrag über Zusammenarbeit 2", "Kapitel 1 Einleitung", "Kapitel 2 Methoden", "Seite", "Anhang"]
+
+
+def make_groups(n, seed):
+    rnd = random.Random(seed)
+    ids = iter(range(1, 1 << 30))
+    groups = []
+    for idx_page in range(n):
+        elements = []
+        for _ in range(rnd.choice([0, 1, 1, 1, 2])):
+            l, t = rnd.choice([50, 52, 300]), rnd.choice([10, 12, 780])
+            words = rnd.choice(TEXTS).split() + ([str(idx_page)] if rnd.random() < 0.5 else [])
+            content = []
+            for w in words:
+                box = {"l": l, "t": t, "w": 6 * len(w), "h": 12}
+                content.append({"id": next(ids), "type": "word", "content": w, "font": 1, "box": box})
+                l += 6 * len(w) + 4
+            line = {"id": next(ids), "type": "line", "content": content, "box": {"l": 50, "t": t, "w": l - 54, "h": 12}}
+            box = {"l": content[0]["box"]["l"], "t": t, "w": rnd.choice([200, 400]), "h": 12}
+            elements.append({"id": next(ids), "type": "paragraph", "content": [line], "properties": {}, "box": box})
+        groups.append(CompactPage({"elements": elements}, idx_page).blocks)
+    return groups
+
+
+def reference_similiar(es1, es2, sim_factor=0.8, sim_box=0.6):
+    """`super_similiar` without precomputed features
+    """
+    from textdistance import jaccard
+
+    points1, points2 = only_points(es1), only_points(es2)
+    if min(len(points1), len(points2)) < 4:
+        return False
+    return (
+        jaccard(only_text(es1), only_text(es2)) > sim_factor
+        and sim_bbox(points1, points2) > sim_box
+    )
+
+
+def reference_remove_duplicates(page_items, lang):
+    """`remove_duplicates` comparing each group with all kept ones
+    """
+    results = [page_items[0]]
+    for elements in page_items[1:]:
+        cool = True
+        for r in results:
+            if len(r) == 0:
+                continue
+            if reference_similiar(r, elements):
+                if single_score(only_text(r), lang) <= single_score(
+                    only_text(elements), lang
+                ):
+                    cool = False
+                    break
+                else:
+                    results.remove(r)
+        results.append(elements if cool else [])
+    return results
+
+
+def test_remove_duplicates_indexed(scorer):
+    for seed in range(10):
+        groups = make_groups(30, seed)
+        expected = reference_remove_duplicates(groups, "de")
+        assert remove_duplicates(groups, "de") == expected
+        assert remove_duplicates_indexed(groups, "de") == expected
+
+
+def test_group_features(scorer):
+    groups = [g for g in make_groups(10, 0) if len(g) > 0]
+    for group in groups:
+        f = GroupFeatures(group)
+        assert f.text == only_text(group)
+        assert f.bbox == bbox(only_points(group))
+        assert f.score("de") == single_score(f.text, "de")
+
+    n_similiar = 0
+    for g1 in groups:
+        for g2 in groups:
+            expected = reference_similiar(g1, g2)
+            assert similiar_features(GroupFeatures(g1), GroupFeatures(g2)) == expected
+            assert super_similiar(g1, g2) == expected
+            n_similiar += expected
+    assert 0 < n_similiar < len(groups) ** 2
+
+    # the texts of `doc_output.Element`s are not extracted
+    assert GroupFeatures(Element("body", [["Seite", "3"]], 1)).text == ""
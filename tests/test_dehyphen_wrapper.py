@@ -0,0 +1,89 @@
+import pytest
+
+from pd3f import dehyphen_wrapper
+from pd3f.dehyphen_wrapper import *
+from pd3f.memo import LRUCache
+from pd3f.micro_batcher import MicroBatchingScorer
+
+
+class LengthScorer:
+    def __init__(self, lang, fast):
+        self.lang = lang
+
+    def score(self, texts):
+        return [float(len(t)) for t in texts]
+
+
+class LongScorer(LengthScorer):
+    def score(self, texts):
+        return [-float(len(t)) for t in texts]
+
+
+def test_scorer_backends(monkeypatch):
+    monkeypatch.setattr(dehyphen_wrapper, "backend", None)
+    monkeypatch.setattr(dehyphen_wrapper, "micro_batching", None)
+    monkeypatch.setattr(registry, "factory", registry.factory)
+
+    # in any order
+    enable_micro_batching(max_wait=0.001)
+    set_backend("length", LengthScorer)
+    scorer = get_scorer("de")
+    assert isinstance(scorer, MicroBatchingScorer)
+    assert isinstance(scorer.scorer, LengthScorer)
+    assert scorer.score(["ab", "abc"]) == [2.0, 3.0]
+
+    # only one backend
+    with pytest.raises(ValueError):
+        enable_prefix_scoring()
+    with pytest.raises(ValueError):
+        use_scoring_server("/tmp/pd3f.sock", authkey=b"key")
+    assert isinstance(get_scorer("de").scorer, LengthScorer)
+    registry.clear()
+
+
+def test_cache_keys(monkeypatch):
+    monkeypatch.setattr(dehyphen_wrapper, "backend", None)
+    monkeypatch.setattr(dehyphen_wrapper, "micro_batching", None)
+    monkeypatch.setattr(dehyphen_wrapper, "memo", LRUCache(100))
+    monkeypatch.setattr(dehyphen_wrapper, "score_store", None)
+    monkeypatch.setattr(registry, "factory", registry.factory)
+
+    assert scoring_variant() == ""
+    set_backend("short", LengthScorer)
+    assert lm_newline_or_not("Das ist", "gut", "de") is True
+
+    # the results of the other backend are not reused
+    dehyphen_wrapper.backend = None
+    set_backend("long", LongScorer)
+    enable_micro_batching(max_wait=0.001)
+    assert scoring_variant() == "long+micro batching"
+    assert lm_newline_or_not("Das ist", "gut", "de") is False
+    registry.clear()
+
+
+def test_prefiltered_dehyphen_cached(monkeypatch):
+    from pd3f.prefilter import Prefilter
+
+    calls = []
+
+    class CountingScorer(LengthScorer):
+        def score(self, texts):
+            calls.append(texts)
+            return super().score(texts)
+
+    monkeypatch.setattr(dehyphen_wrapper, "backend", None)
+    monkeypatch.setattr(dehyphen_wrapper, "micro_batching", None)
+    monkeypatch.setattr(dehyphen_wrapper, "memo", LRUCache(100))
+    monkeypatch.setattr(dehyphen_wrapper, "score_store", None)
+    monkeypatch.setattr(registry, "factory", registry.factory)
+    set_backend("counting", CountingScorer)
+
+    # the prefilter defers, so the language model decides
+    for _ in range(3):
+        lines = [["Die", "Zusammen-"], ["arbeit", "ist", "gut."]]
+        assert dehyphen_paragraph(lines, "de", prefilter=Prefilter()) == [
+            ["Die "],
+            ["Zusammenarbeit", "ist", "gut."],
+        ]
+    assert len(calls) == 1
+    registry.clear()
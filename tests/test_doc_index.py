@@ -0,0 +1,27 @@
+from pd3f.doc_index import *
+from pd3f.doc_info import extract_elements
+
+
+def word(i, text):
+    return {"id": i, "type": "word", "content": text, "font": i % 2}
+
+
+def test_page_index():
+    line1 = {"id": 2, "type": "line", "content": [word(3, "a"), word(4, "b")]}
+    line2 = {"id": 5, "type": "line", "content": [{"type": "group", "content": [word(6, "c")]}]}
+    paragraph = {"id": 1, "type": "paragraph", "content": [line1, line2]}
+    heading = {"id": 7, "type": "heading", "content": [{"id": 8, "type": "line", "content": [word(9, "d")]}]}
+    image = {"id": 10, "type": "image", "content": "no text"}
+    page = {"elements": [paragraph, heading, image]}
+
+    page_index = PageIndex(page)
+    assert [x["id"] for x in page_index.words] == [3, 4, 6, 9]
+    assert list(page_index.word_line) == [0, 0, 1, 2]
+    assert list(page_index.word_element) == [0, 0, 0, 1]
+    assert list(page_index.line_element) == [0, 0, 1]
+
+    for idx, x in enumerate(page["elements"]):
+        assert page_index.element_lines(idx) == extract_elements(x, "line")
+        assert page_index.element_words(idx) == extract_elements(x, "word")
+    for idx, x in enumerate([line1, line2]):
+        assert page_index.line_words(idx) == extract_elements(x, "word")
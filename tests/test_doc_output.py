@@ -0,0 +1,61 @@
+import io
+import random
+import re
+
+from pd3f.doc_output import *
+
+
+def test_newline_collapsing_writer():
+    rnd = random.Random(0)
+    for _ in range(200):
+        text = "".join(rnd.choice(["a", "b ", "\n", "\n\n", "\n\n\n"]) for _ in range(30))
+        f = io.StringIO()
+        writer = NewlineCollapsingWriter(f)
+        pos = 0
+        while pos < len(text):
+            n = rnd.randint(0, 5)
+            writer.write(text[pos : pos + n])
+            pos += n
+        writer.close()
+        assert f.getvalue() == re.sub(r"(\n){3,}", "\n\n", text)
+
+
+def test_document_output_merge():
+    doc = DocumentOutput(
+        [Element("body", [["a"]], i, idx_page=0) for i in range(4)], None, None, [[0, 1, 2, 3]], "en"
+    )
+    doc.merge(doc.get_element(1), doc.get_element(2), Element("body", [["b"], ["c"]], 1))
+    doc.merge(doc.get_element(0), doc.get_element(1), Element("body", [["a"], ["b"], ["c"]], 0))
+
+    assert [e.id for e in doc] == [0, 3]
+    assert len(doc) == 2 and doc[1].id == 3
+    # 2 was merged into 1 and 1 into 0
+    assert doc.get_element(2) is doc.get_element(0)
+    assert str(doc.get_element(2)) == "abc\n\n"
+
+    doc.remove(doc.get_element(0))
+    assert doc.get_element(2) is None
+
+
+def test_document_output_chunks():
+    data = [
+        Element("heading", [["Title"]], 0, level=2),
+        Element("body", [["a", "b"], ["\n\n\n"], ["c"]], 1),
+        Element("footnotes", [["1", "note\n"]], 2),
+        Element("body", [["\n"]], 3),
+    ]
+    doc = DocumentOutput(data, [["head\n\n"]], [["\nfoot"]], [[0, 1, 2, 3]], "en")
+
+    for markdown in (False, True):
+        expected = "\n\n".join(["head\n\n"])
+        expected += "".join(element_text(e, markdown) for e in data)
+        expected += "\n\n".join(["\nfoot"])
+        expected = re.sub(r"(\n){3,}", "\n\n", expected)
+
+        chunks = list(doc.chunks(markdown))
+        assert len(chunks) > 1
+        assert "".join(chunks) == expected == doc.text(markdown)
+
+        f = io.StringIO()
+        doc.write(f, markdown)
+        assert f.getvalue() == expected
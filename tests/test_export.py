@@ -0,0 +1,14 @@
+import copy
+
+from pd3f.export import *
+
+from .test_bounded_export import make_doc, scorer
+
+
+def test_export_batched(scorer):
+    for seed in range(3):
+        doc = make_doc(6, seed)
+        for options in ({}, {"seperate_header_footer": True, "footnotes_last": True}):
+            batched = Export(copy.deepcopy(doc), batch_size=8, **options)
+            expected = Export(copy.deepcopy(doc), **options)
+            assert batched.text() == expected.text()
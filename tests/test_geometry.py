@@ -1,3 +1,5 @@
+import random
+
 from pd3f.geometry import *
 
 
@@ -16,3 +18,16 @@ def test_geometry():
         sim_bbox([[0, 0], (1, 1), (1, 1), (0, 1)], [[5, 5], (1, 1), (1, 5), (5, 1)])
         == 0
     )
+
+
+def test_sim_bounds_many():
+    rnd = random.Random(0)
+    boxes = []
+    for _ in range(100):
+        t, l = rnd.uniform(0, 100), rnd.uniform(0, 100)
+        boxes.append((t, l, t + rnd.uniform(1, 50), l + rnd.uniform(1, 50)))
+
+    sims = sim_bounds_many(boxes[0], boxes)
+    assert sims.tolist() == [sim_bounds(boxes[0], b) for b in boxes]
+    assert sims[0] == 1
+    assert sim_bounds_many((0, 0, 1, 1), [(5, 5, 6, 6)]).tolist() == [0]
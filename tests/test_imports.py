@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+# should only get imported when they are actually used
+HEAVY_MODULES = [
+    "torch",
+    "flair",
+    "dehyphen",
+    "shapely",
+    "cleantext",
+    "textdistance",
+    "parsr_client",
+    "pandas",
+]
+
+
+def test_import_is_light():
+    code = f"import sys, pd3f; print(' '.join(m for m in {HEAVY_MODULES} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
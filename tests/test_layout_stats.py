@@ -0,0 +1,55 @@
+import random
+from collections import Counter
+from statistics import median
+
+import numpy as np
+
+from pd3f.compact import CompactPage
+from pd3f.doc_info import calc_line_space, calc_word_space
+from pd3f.layout_stats import *
+
+
+def random_page(rnd):
+    def box():
+        return {k: rnd.choice([rnd.randint(0, 50), rnd.uniform(0, 50)]) for k in "ltwh"}
+
+    def line():
+        words = [
+            {"type": "word", "content": "a", "font": 1, "box": box()}
+            for _ in range(rnd.randint(0, 5))
+        ]
+        return {"id": 0, "type": "line", "box": box(), "content": words}
+
+    elements = [
+        {
+            "id": 0,
+            "type": "paragraph",
+            "properties": {},
+            "content": [line() for _ in range(rnd.randint(0, 4))],
+        }
+        for _ in range(rnd.randint(0, 6))
+    ]
+    return {"elements": elements}
+
+
+def test_layout_stats():
+    rnd = random.Random(0)
+    for _ in range(100):
+        page = CompactPage(random_page(rnd), 0)
+
+        expected_lineheights, expected_word_spaces = Counter(), Counter()
+        for e in page.blocks:
+            expected_lineheights.update(calc_line_space(e.lines))
+            expected_word_spaces.update(calc_word_space(e.lines))
+
+        boxes = line_boxes(page)
+        assert count(line_spaces(boxes, np.asarray(page.line_blocks))) == expected_lineheights
+        assert count(word_spaces(page)) == expected_word_spaces
+        assert count(boxes[:, 2]) == Counter(x.w for e in page.blocks for x in e.lines)
+
+
+def test_weighted_median():
+    rnd = random.Random(0)
+    for _ in range(100):
+        c = Counter(rnd.choice([1, 2.5, 3, 7.25, 10]) for _ in range(rnd.randint(1, 20)))
+        assert weighted_median(list(c.keys()), list(c.values())) == median(c.elements())
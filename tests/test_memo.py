@@ -0,0 +1,34 @@
+from pd3f.memo import *
+
+
+class Thing:
+    def __init__(self, lines, id):
+        self.lines = lines
+        self.id = id
+
+
+def test_content_key():
+    assert content_key([["a", "b"], ["c"]]) == (("a", "b"), ("c",))
+    assert content_key(Thing([["a"]], 1)) == content_key(Thing([["a"]], 1))
+    assert content_key(Thing([["a"]], 1)) != content_key(Thing([["a"]], 2))
+
+
+def test_lru_cache():
+    c = LRUCache(maxsize=2)
+
+    assert c.get("a", lambda: [1]) == [1]
+    assert c.get("a", lambda: [2]) == [1]
+    c.get("b", lambda: [2])
+    c.get("c", lambda: [3])
+
+    # `a` was evicted
+    assert c.get("a", lambda: [4]) == [4]
+    assert c.cache_info() == CacheInfo(hits=1, misses=4, maxsize=2, currsize=2)
+
+    # values are copied, changes do not alter the cache
+    c.get("a", lambda: None).append(5)
+    assert c.get("a", lambda: None) == [4]
+
+    c.resize(0)
+    assert c.get("a", lambda: [6]) == [6]
+    assert c.cache_info().currsize == 0
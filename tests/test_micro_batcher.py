@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from collections import Counter
+
+import pytest
+
+from pd3f.micro_batcher import *
+
+
+def test_micro_batcher():
+    batches = []
+
+    def score_batch(texts):
+        batches.append(texts)
+        return [float(len(t)) for t in texts]
+
+    batcher = MicroBatcher(score_batch, max_batch_size=4, max_wait=0.5, bucket_width=5)
+    results = {}
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.score(["x" * (i + 2)])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert results == {i: [float(i + 2)] for i in range(8)}
+    # two buckets by length (2-4, 5-9), how the texts of a bucket are split depends on the timing
+    assert all(len({len(t) // 5 for t in b}) == 1 for b in batches)
+    assert all(len(b) <= 4 for b in batches)
+    assert sorted(t for b in batches for t in b) == sorted("x" * (i + 2) for i in range(8))
+    # the second bucket has 5 texts
+    assert len(batches) >= 3
+    stats = batcher.stats()
+    assert stats["texts"] == 8
+    assert stats["batches"] == len(batches)
+    assert stats["batch_sizes"] == dict(Counter(map(len, batches)))
+
+
+def test_score_async():
+    batcher = MicroBatcher(lambda texts: [1.0] * len(texts), max_wait=0.001)
+
+    async def main():
+        return await asyncio.gather(
+            batcher.score_async(["ab", "cd"]), batcher.score_async(["ef"])
+        )
+
+    assert asyncio.run(main()) == [[1.0, 1.0], [1.0]]
+    batcher.close()
+
+
+def test_errors():
+    def score_batch(texts):
+        raise ValueError("broken")
+
+    batcher = MicroBatcher(score_batch, max_wait=0.001)
+    with pytest.raises(ValueError, match="broken"):
+        batcher.score(["ab"])
+    batcher.close()
+
+
+class RoundingScorer:
+    """The batches are off by rounding errors"""
+
+    def score(self, texts):
+        return [float(len(t)) for t in texts]
+
+    def score_batch(self, texts):
+        return [len(t) + 1e-6 * i for i, t in enumerate(texts)]
+
+
+def test_micro_batching_scorer():
+    scorer = MicroBatchingScorer(RoundingScorer(), max_wait=0.001)
+
+    # single texts and ties are scored by the wrapped scorer
+    assert scorer.score(["abc"]) == [3.0]
+    assert scorer.score(["abc", "xyz", "abcd"]) == [3.0, 3.0, 4.0]
+    assert scorer.score(["abc", "abcdefgh"]) == [3.0, 8.0 + 1e-6]
+    scorer.close()
@@ -0,0 +1,53 @@
+import json
+
+from pd3f.parsr_cache import *
+from pd3f.parsr_wrapper import run_parsr
+
+from .test_parsr_wrapper import parsr_stub
+
+
+def test_config_hash():
+    assert config_hash({"a": 1, "b": [1, 2]}, False) == config_hash(
+        {"b": [1, 2], "a": 1}, False
+    )
+    assert config_hash({"a": 1}, False) != config_hash({"a": 2}, False)
+    assert config_hash({"a": 1}, False) != config_hash({"a": 1}, True)
+
+
+def test_parsr_cache(tmp_path):
+    cache = ParsrCache(tmp_path / "cache")
+    (tmp_path / "a.pdf").write_bytes(b"%PDF a")
+
+    key = cache.key(tmp_path / "a.pdf", {"x": 1}, False)
+    assert cache.get(key) == (False, None)
+    cache.set(key, ({"pages": []}, None))
+    assert cache.get(key) == (True, ({"pages": []}, None))
+
+    # same bytes, other name
+    (tmp_path / "b.pdf").write_bytes(b"%PDF a")
+    assert cache.key(tmp_path / "b.pdf", {"x": 1}, False) == key
+    assert cache.key(tmp_path / "b.pdf", {"x": 2}, False) != key
+
+    # room for about one entry
+    cache.max_bytes = int(cache.size() * 1.5)
+    cache.set("other", ({"pages": [1]}, None))
+    # `key` was used least recently
+    assert cache.get(key) == (False, None)
+    assert cache.get("other")[0]
+
+
+def test_run_parsr_cache(tmp_path):
+    cache = ParsrCache(tmp_path / "cache")
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+
+    with parsr_stub({"a": 0.01}) as server:
+        kwargs = dict(parsr_location=server.location, poll_interval=0.01, cache=cache)
+        first = run_parsr(str(tmp_path / "a.pdf"), **kwargs)
+        second = run_parsr(str(tmp_path / "a.pdf"), out_dir=tmp_path / "out", **kwargs)
+        assert len(server.jobs) == 1
+        assert first == second
+
+        run_parsr(str(tmp_path / "a.pdf"), fast=True, **kwargs)
+        assert len(server.jobs) == 2
+
+    assert json.loads((tmp_path / "out" / "a" / "data.json").read_text()) == first[0]
@@ -0,0 +1,165 @@
+import copy
+
+import pytest
+
+from pd3f.parsr_chunks import *
+from pd3f.parsr_wrapper import run_parsr, run_parsr_many
+
+from .test_parsr_wrapper import parsr_stub
+
+
+def chunk(first_page, n_pages, fonts):
+    """Parsr output for some pages, ids start at 0 and the fonts are numbered as given
+    """
+    ids = iter(range(1000))
+    pages = []
+    for p in range(n_pages):
+        words = [
+            {"id": next(ids), "type": "word", "content": f"w{first_page + p}", "font": f}
+            for f in fonts
+        ]
+        line = {"id": next(ids), "type": "line", "content": words}
+        para = {"id": next(ids), "type": "paragraph", "content": [line], "properties": {}}
+        pages.append({"pageNumber": p + 1, "elements": [para]})
+    return {
+        "version": "0",
+        "fonts": [{"id": f, "name": f"font{f % 10}", "size": f % 10} for f in fonts],
+        "metadata": [{"id": next(ids), "type": "x", "elements": [0]}],
+        "pages": pages,
+    }
+
+
+def words(doc):
+    fonts = {f["id"]: f["name"] for f in doc["fonts"]}
+    return [
+        (w["content"], fonts[w["font"]])
+        for p in doc["pages"]
+        for w in p["elements"][0]["content"][0]["content"]
+    ]
+
+
+def test_merge_parsr_json():
+    # same fonts with other ids in the second chunk, plus a new one
+    chunks = [chunk(0, 2, [1, 2]), chunk(2, 3, [12, 11, 13])]
+    expected_words = words(chunks[0]) + words(chunks[1])
+
+    merged = merge_parsr_json(copy.deepcopy(chunks))
+
+    assert [p["pageNumber"] for p in merged["pages"]] == [1, 2, 3, 4, 5]
+    assert words(merged) == expected_words
+    assert len(merged["fonts"]) == 3
+
+    ids = []
+    stack = [merged["pages"]]
+    while stack:
+        x = stack.pop()
+        if isinstance(x, dict):
+            if "id" in x:
+                ids.append(x["id"])
+            stack.extend(x.values())
+        elif isinstance(x, list):
+            stack.extend(x)
+    assert len(ids) == len(set(ids))
+
+    # points to the first element of the second chunk
+    first_id = merged["pages"][2]["elements"][0]["content"][0]["content"][0]["id"]
+    assert merged["metadata"][1]["elements"] == [first_id]
+
+
+def test_run_parsr_chunked(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+
+    writer = pypdf.PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(width=100, height=100)
+    with open(tmp_path / "doc.pdf", "wb") as f:
+        writer.write(f)
+
+    outputs = {
+        "0_doc_00000": chunk(0, 2, [1]),
+        "0_doc_00001": chunk(2, 2, [1]),
+        "0_doc_00002": chunk(4, 1, [1]),
+    }
+    with parsr_stub({n: 0.01 for n in outputs}, outputs) as server:
+        data, _ = run_parsr(
+            str(tmp_path / "doc.pdf"),
+            parsr_location=server.location,
+            poll_interval=0.01,
+            pages_per_chunk=2,
+        )
+        assert len(server.jobs) == 3
+
+    assert [p["pageNumber"] for p in data["pages"]] == [1, 2, 3, 4, 5]
+    assert [w for w, _ in words(data)] == [f"w{i}" for i in range(5)]
+
+
+def test_run_parsr_many_chunked(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+
+    for name, n_pages in (("long", 3), ("short", 1)):
+        writer = pypdf.PdfWriter()
+        for _ in range(n_pages):
+            writer.add_blank_page(width=100, height=100)
+        with open(tmp_path / f"{name}.pdf", "wb") as f:
+            writer.write(f)
+
+    outputs = {
+        "0_long_00000": chunk(0, 2, [1]),
+        "0_long_00001": chunk(2, 1, [1]),
+        "1_short": chunk(0, 1, [1]),
+    }
+    with parsr_stub({"0_long_00000": 0.05, "0_long_00001": 0.01, "1_short": 0.01}, outputs) as server:
+        results = dict(
+            run_parsr_many(
+                [str(tmp_path / "long.pdf"), str(tmp_path / "short.pdf")],
+                parsr_location=server.location,
+                poll_interval=0.01,
+                pages_per_chunk=2,
+            )
+        )
+        # all chunks at the same time
+        assert len(server.jobs) == 3
+
+    data, _ = results[str(tmp_path / "long.pdf")]
+    assert [w for w, _ in words(data)] == ["w0", "w1", "w2"]
+    data, _ = results[str(tmp_path / "short.pdf")]
+    assert [w for w, _ in words(data)] == ["w0"]
+
+
+def test_run_parsr_many_chunked_same_names(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+
+    paths = []
+    for d in ("a", "b"):
+        (tmp_path / d).mkdir()
+        writer = pypdf.PdfWriter()
+        for _ in range(3):
+            writer.add_blank_page(width=100, height=100)
+        with open(tmp_path / d / "report.pdf", "wb") as f:
+            writer.write(f)
+        paths.append(str(tmp_path / d / "report.pdf"))
+    # the same PDF twice
+    paths.append(paths[0])
+
+    outputs = {
+        f"{i}_report_{n:05d}": chunk(2 * n, 2 - n, [1]) for i in range(3) for n in range(2)
+    }
+    with parsr_stub({n: 0.01 for n in outputs}, outputs) as server:
+        results = list(
+            run_parsr_many(
+                paths,
+                out_dir=tmp_path / "out",
+                text=True,
+                parsr_location=server.location,
+                poll_interval=0.01,
+                pages_per_chunk=2,
+            )
+        )
+        assert len(server.jobs) == 6
+
+    assert sorted(p for p, _ in results) == sorted(paths)
+    for _, (data, _) in results:
+        assert [w for w, _ in words(data)] == ["w0", "w1", "w2"]
+    # the text of one PDF, not a mix of both
+    text = (tmp_path / "out" / "report" / "text.txt").read_text()
+    assert text in [f"text of {i}_report_00000text of {i}_report_00001" for i in range(3)]
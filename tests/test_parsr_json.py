@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from pd3f.parsr_json import *
+
+DOC = {
+    "version": "0.1",
+    "fonts": [{"id": 1, "size": 12.5, "sizeUnit": "px"}],
+    "pages": [
+        {"pageNumber": 1, "elements": [{"id": 123456, "content": 'a "b" } ] ,'}]},
+        {"pageNumber": 2, "elements": []},
+        {"pageNumber": 3, "elements": [{"id": 7, "content": "Straße \\u00e4 €"}]},
+    ],
+    "metadata": [],
+    "number": 1234567890,
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1 << 16])
+def test_load_parsr_json(tmp_path, chunk_size):
+    for indent in (None, 4):
+        path = tmp_path / "data.json"
+        path.write_text(json.dumps(DOC, indent=indent, ensure_ascii=False))
+        assert load_parsr_json(path, chunk_size) == DOC
+
+        keys = [k for k, _ in iter_parsr_json(path, chunk_size)]
+        assert keys == ["version", "fonts", "pages", "pages", "pages", "metadata", "number"]
+
+    path.write_text(json.dumps({"pages": []}))
+    assert load_parsr_json(path, chunk_size) == {"pages": []}
+
+
+def test_broken_json(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(DOC)[:-20])
+    with pytest.raises(ValueError):
+        load_parsr_json(path, 5)
@@ -0,0 +1,116 @@
+import socket
+
+import pytest
+
+from pd3f.parsr_pool import *
+from pd3f.parsr_wrapper import run_parsr, run_parsr_many
+
+from .test_parsr_wrapper import parsr_stub
+
+
+def pdfs(tmp_path, names):
+    paths = []
+    for name in names:
+        (tmp_path / f"{name}.pdf").write_bytes(b"%PDF")
+        paths.append(str(tmp_path / f"{name}.pdf"))
+    return paths
+
+
+def unused_location():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return f"localhost:{s.getsockname()[1]}"
+
+
+def test_least_outstanding():
+    pool = ParsrPool(["a:1", "b:1"], max_jobs_per_backend=2)
+    b1, b2, b3, b4 = [pool.acquire() for _ in range(4)]
+    assert b1 is not b2 and b1 is b3 and b2 is b4
+    assert pool.acquire() is None
+
+    pool.release(b2)
+    assert pool.acquire() is b2
+
+
+def test_backend_executor():
+    backend = ParsrBackend("a:1")
+    # kept for all jobs, so are the sessions of its threads
+    assert backend.executor() is backend.executor()
+
+
+def test_get_pool():
+    assert get_pool("a:1") is get_pool(["a:1"])
+    pool = ParsrPool("a:1")
+    assert get_pool(pool) is pool
+
+
+def test_pool(tmp_path):
+    names = "abcdef"
+    paths = pdfs(tmp_path, names)
+    durations = {n: 0.05 for n in names}
+
+    with parsr_stub(durations) as s1, parsr_stub(durations) as s2:
+        pool = ParsrPool([s1.location, s2.location], max_jobs_per_backend=1)
+        results = list(run_parsr_many(paths, parsr_location=pool, poll_interval=0.01))
+        assert sorted(r[0]["file"] for _, r in results) == list(names)
+        assert s1.max_running == 1 and s2.max_running == 1
+        assert len(s1.jobs) + len(s2.jobs) == len(names)
+        assert len(s1.jobs) > 0 and len(s2.jobs) > 0
+        assert all(b.outstanding == 0 for b in pool.backends)
+
+
+def test_retry_on_other_backend(tmp_path):
+    paths = pdfs(tmp_path, "ab")
+
+    with parsr_stub({"a": 0.01, "b": 0.01}) as server:
+        pool = ParsrPool([unused_location(), server.location], timeout=5)
+        results = list(run_parsr_many(paths, parsr_location=pool, poll_interval=0.01))
+        assert len(results) == 2 and len(server.jobs) == 2
+        assert [b.healthy for b in pool.backends] == [False, True]
+        assert pool.check_health() == pool.backends[1:]
+
+    pool = ParsrPool([unused_location()], timeout=5)
+    with pytest.raises(ConnectionError):
+        run_parsr(paths[0], parsr_location=pool, poll_interval=0.01)
+
+
+def test_retry_single_backend(tmp_path, monkeypatch):
+    import requests
+
+    import pd3f.parsr_wrapper
+
+    paths = pdfs(tmp_path, "a")
+
+    def fail_once(f, error):
+        calls = []
+
+        def wrapper(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise error
+            return f(*args, **kwargs)
+
+        return wrapper
+
+    with parsr_stub({"a": 0.01}) as server:
+        # the instance can't be reached once
+        monkeypatch.setattr(
+            pd3f.parsr_wrapper,
+            "send_to_parsr",
+            fail_once(pd3f.parsr_wrapper.send_to_parsr, requests.ConnectionError()),
+        )
+        pool = ParsrPool(server.location)
+        data, _ = run_parsr(paths[0], parsr_location=pool, poll_interval=0.01)
+        assert data == {"file": "a"}
+        assert pool.backends[0].healthy and pool.backends[0].outstanding == 0
+
+        # an error response for the job, the instance stays in the pool
+        monkeypatch.setattr(
+            pd3f.parsr_wrapper,
+            "parsr_finished",
+            fail_once(pd3f.parsr_wrapper.parsr_finished, requests.HTTPError()),
+        )
+        pool = ParsrPool(server.location)
+        data, _ = run_parsr(paths[0], parsr_location=pool, poll_interval=0.01)
+        assert data == {"file": "a"}
+        assert pool.backends[0].last_check == 0.0
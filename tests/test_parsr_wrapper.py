@@ -0,0 +1,161 @@
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pd3f.parsr_wrapper import *
+
+
+class ParsrStub(ThreadingHTTPServer):
+    """Fake Parsr server, a job for `name.pdf` runs for `durations[name]` seconds and returns `outputs[name]` or `{"file": name}`
+    """
+
+    def __init__(self, durations, outputs={}):
+        super().__init__(("localhost", 0), ParsrStubHandler)
+        self.durations = durations
+        self.outputs = outputs
+        # id -> (file name, time when finished)
+        self.jobs = {}
+        self.max_running = 0
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+    def running(self):
+        now = time.monotonic()
+        return sum(1 for _, end in self.jobs.values() if end > now)
+
+    @property
+    def location(self):
+        return f"localhost:{self.server_address[1]}"
+
+
+class ParsrStubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body):
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        name = re.search(rb'filename="([^"]*)\.pdf"', body).group(1).decode()
+        name = name.split("/")[-1]
+        job = uuid.uuid4().hex
+        with self.server.lock:
+            end = time.monotonic() + self.server.durations[name]
+            self.server.jobs[job] = (name, end)
+            self.server.max_running = max(self.server.max_running, self.server.running())
+        self.reply(202, job)
+
+    def do_GET(self):
+        if self.path == "/api/v1/default-config":
+            self.reply(200, {})
+            return
+        kind, job, *table = self.path.split("/")[3:]
+        name, end = self.server.jobs[job]
+        self.server.requests[kind] += 1
+        if kind == "queue":
+            if time.monotonic() < end:
+                self.reply(200, {"progress-percentage": 50})
+            else:
+                self.reply(201, {"id": job})
+        elif kind == "json":
+            self.reply(200, self.server.outputs.get(name, {"file": name}))
+        elif kind in ("text", "markdown"):
+            self.reply(200, f"{kind} of {name}")
+        elif kind == "csv" and table:
+            self.reply(200, f"page;table\n{table[0]};{table[1]}\n")
+        elif kind == "csv":
+            self.reply(200, str([f"/api/v1/csv/{job}/1/1", f"/api/v1/csv/{job}/2/1"]))
+        else:
+            self.reply(404, "")
+
+
+@contextmanager
+def parsr_stub(durations, outputs={}):
+    server = ParsrStub(durations, outputs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_run_parsr_many(tmp_path):
+    durations = {"a": 0.3, "b": 0.05, "c": 0.05, "d": 0.05}
+    paths = []
+    for name in durations:
+        (tmp_path / f"{name}.pdf").write_bytes(b"%PDF")
+        paths.append(str(tmp_path / f"{name}.pdf"))
+
+    with parsr_stub(durations) as server:
+        results = list(
+            run_parsr_many(
+                paths, max_in_flight=2, parsr_location=server.location, poll_interval=0.01
+            )
+        )
+        assert server.max_running <= 2
+
+    # the long job finishes last
+    assert [r[1][0]["file"] for r in results] == ["b", "c", "d", "a"]
+    assert [r[0] for r in results] == paths[1:] + paths[:1]
+    assert all(tables is None for _, (_, tables) in results)
+
+    with parsr_stub(durations) as server:
+        data, _ = run_parsr(paths[0], parsr_location=server.location, poll_interval=0.01)
+    assert data == {"file": "a"}
+
+
+def test_fetch_results(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+
+    with parsr_stub({"a": 0.01}) as server:
+        data, tables = run_parsr(
+            str(tmp_path / "a.pdf"),
+            out_dir=tmp_path / "out",
+            text=True,
+            markdown=True,
+            check_tables=True,
+            parsr_location=server.location,
+            poll_interval=0.01,
+        )
+        assert server.requests["json"] == 1
+        assert server.requests["text"] == 1
+        assert server.requests["markdown"] == 1
+        # list of tables and two tables
+        assert server.requests["csv"] == 3
+
+    assert data == {"file": "a"}
+    out_dir = tmp_path / "out" / "a"
+    assert json.loads((out_dir / "data.json").read_text()) == data
+    assert (out_dir / "text.txt").read_text() == "text of a"
+    assert (out_dir / "text.md").read_text() == "markdown of a"
+    assert len(tables) == 2 and "page,table" in tables[0]
+    assert (out_dir / "table_1.csv").read_text() == tables[1]
+
+
+def test_fetch_results_encoding(tmp_path, monkeypatch):
+    # `open` uses the encoding of the locale by default
+    bootlocale = pytest.importorskip("_bootlocale")
+    monkeypatch.setattr(bootlocale, "getpreferredencoding", lambda *args: "latin-1")
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+
+    with parsr_stub({"a": 0.01}, {"a": '{"file": "Übersicht"}'}) as server:
+        data, _ = run_parsr(
+            str(tmp_path / "a.pdf"),
+            out_dir=tmp_path / "out",
+            parsr_location=server.location,
+            poll_interval=0.01,
+        )
+    assert data == {"file": "Übersicht"}
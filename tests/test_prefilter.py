@@ -0,0 +1,73 @@
+from pd3f.prefilter import *
+
+TEXT = """Die Zusammenarbeit ist gut.
+Die Zusammenarbeit ist nach Abs. 1 geregelt.
+Die Zusammenarbeit ist nach Abs. 2 geregelt.
+Die Zusammenarbeit ist nach Abs. 3 geregelt.
+Die Zusammenarbeit ist nach Abs. 4 geregelt.
+Die Zusammenarbeit ist nach Abs. 5 geregelt.
+"""
+
+
+def test_word_frequency_prefilter(tmp_path):
+    p = WordFrequencyPrefilter.from_text(TEXT, min_count=5)
+
+    assert p.newline_or_not("Das ist nach Abs.", "3 geregelt") is False
+    # never seen together
+    assert p.newline_or_not("Das ist nach Abs.", "7 geregelt") is None
+    assert p.newline_or_not("Das ist gut", "Die Regel") is None
+    assert p.newline_or_not("Das ist geregelt.", "Die Regel") is True
+    assert p.avoided() == {"newline_or_not": 0.5}
+
+    assert p.dehyphen(("Zusammen- arbeit", "Zusammen-arbeit", "Zusammenarbeit")) == 2
+    assert p.dehyphen(("Haus- und", "Haus-und", "Hausund")) is None
+
+    p.save(tmp_path / "de.json")
+    assert WordFrequencyPrefilter.load(tmp_path / "de.json").words == p.words
+
+
+def test_prefiltered_scorer():
+    p = WordFrequencyPrefilter.from_text(TEXT, min_count=5)
+
+    def no_scorer():
+        raise AssertionError("language model should not be needed")
+
+    lines = [["Die", "Zusammen-"], ["arbeit", "ist", "gut."]]
+    result = PrefilteredScorer(no_scorer, p).dehyphen_paragraph(lines)
+    assert result == [["Die "], ["Zusammenarbeit", "ist", "gut."]]
+
+
+def test_prefilter_empty_lines():
+    p = WordFrequencyPrefilter.from_text(TEXT, min_count=5)
+
+    assert p.decide_newline("", "Die Regel") is None
+    assert p.decide_newline("Das ist nach Abs.", "  ") is None
+    # left to the special cases of the language model
+    assert p.newline_or_not("Das ist nach Abs.", "3") is None
+    assert p.newline_or_not("a", "Die Regel") is None
+    assert CasePrefilter().newline_or_not(" ", "die Regel") is None
+
+
+def test_case_prefilter():
+    p = CasePrefilter()
+
+    assert p.newline_or_not("Das ist", "gut geregelt.") is False
+    assert p.newline_or_not("Das ist geregelt.", "Die Regel") is True
+    assert p.newline_or_not("Das ist geregelt!", "Die Regel") is True
+    # abbreviation
+    assert p.newline_or_not("Das ist nach Abs.", "Die Regel") is None
+    assert p.newline_or_not("Das ist nach Abs.", "3 geregelt") is None
+    assert p.newline_or_not("Das ist gut", "Die Regel") is None
+    assert p.dehyphen(("Zusammen- arbeit", "Zusammen-arbeit", "Zusammenarbeit")) is None
+
+
+def test_chained_prefilter():
+    p = ChainedPrefilter(
+        CasePrefilter(), WordFrequencyPrefilter.from_text(TEXT, min_count=5)
+    )
+
+    assert p.newline_or_not("Das ist", "gut geregelt.") is False
+    assert p.newline_or_not("Das ist nach Abs.", "3 geregelt") is False
+    assert p.newline_or_not("Das ist gut", "Die Regel") is None
+    assert p.avoided() == {"newline_or_not": 2 / 3}
+    assert p.dehyphen(("Zusammen- arbeit", "Zusammen-arbeit", "Zusammenarbeit")) == 2
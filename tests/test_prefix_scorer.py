@@ -0,0 +1,27 @@
+import pytest
+
+from pd3f.prefix_scorer import *
+
+from .test_batch_scorer import small_scorer
+
+
+def test_common_prefix_length():
+    assert common_prefix_length("abc", "abd") == 2
+    assert common_prefix_length("ab", "abd") == 2
+    assert common_prefix_length("x", "abd") == 0
+
+
+def test_prefix_scorer():
+    scorer = small_scorer()
+    prefix_scorer = PrefixScorer(scorer)
+
+    groups = [
+        ["Das ist", "ein Test.", "Das ist ein Test."],
+        ["Zusammen- arbeit", "Zusammen-arbeit", "Zusammenarbeit"],
+        ["ab", "abc", "abcd", "abd", "xy"],
+    ]
+    for texts in groups:
+        assert prefix_scorer.score(texts) == pytest.approx(scorer.score(texts), rel=1e-5)
+
+    assert prefix_scorer.chars_fed < prefix_scorer.chars_total
+    assert 0 < prefix_scorer.saved_share() < 1
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+import pickle
+import stat
+
+from pd3f.doc_output import Element
+from pd3f.score_store import *
+
+
+def write_many(path, offset):
+    store = SQLiteScoreStore(path)
+    for i in range(offset, offset + 50):
+        store.set("de", "newline_or_not", ("a", i), i % 2 == 0)
+
+
+def test_sqlite_score_store(tmp_path):
+    store = SQLiteScoreStore(tmp_path / "scores.sqlite", max_bytes=10 ** 6)
+
+    assert store.get("de", "newline_or_not", ("a", "b")) == (False, None)
+    store.set("de", "newline_or_not", ("a", "b"), True)
+    assert store.get("de", "newline_or_not", ("a", "b")) == (True, True)
+    # keyed by model
+    assert store.get("en", "newline_or_not", ("a", "b")) == (False, None)
+
+    calls = []
+    assert store.get_or_compute("de", "f", (1,), lambda: calls.append(1) or [1]) == [1]
+    assert store.get_or_compute("de", "f", (1,), lambda: calls.append(1) or [1]) == [1]
+    assert len(calls) == 1
+
+
+def test_values(tmp_path):
+    store = SQLiteScoreStore(tmp_path / "scores.sqlite")
+
+    store.set("de", "lm_dehyphen_paragraph", (1,), [["Die "], ["Zusammenarbeit", "ist"]])
+    assert store.get("de", "lm_dehyphen_paragraph", (1,)) == (
+        True,
+        [["Die "], ["Zusammenarbeit", "ist"]],
+    )
+
+    element = Element("body", [["Das", "ist "], ["gut."]], 7, idx_page=1, num_newlines=2)
+    store.set("de", "is_split_paragraph", (1,), element)
+    found, value = store.get("de", "is_split_paragraph", (1,))
+    assert found and isinstance(value, Element)
+    assert vars(value) == vars(element)
+
+    # values of older versions are not unpickled
+    with store.connection() as con:
+        con.execute(
+            "UPDATE results SET value=? WHERE function=?",
+            (pickle.dumps(True), "is_split_paragraph"),
+        )
+    assert store.get("de", "is_split_paragraph", (1,)) == (False, None)
+
+    for name in ("scores.sqlite", "scores.sqlite-wal"):
+        assert stat.S_IMODE(os.stat(tmp_path / name).st_mode) == 0o600
+
+
+def test_reduce_size(tmp_path):
+    store = SQLiteScoreStore(tmp_path / "scores.sqlite", touch_interval=0)
+    for i in range(10):
+        store.set("de", "f", (i,), "x" * 100)
+
+    # first one was used recently, keep it
+    store.get("de", "f", (0,))
+    store.reduce_size(max_bytes=store.size() // 2)
+
+    assert store.get("de", "f", (0,))[0]
+    assert not store.get("de", "f", (1,))[0]
+    assert store.get("de", "f", (9,))[0]
+
+
+def test_snapshot(tmp_path):
+    store = SQLiteScoreStore(tmp_path / "scores.sqlite")
+    store.set("de", "f", (1,), 1.5)
+    store.export_snapshot(tmp_path / "snapshot.sqlite")
+
+    new_store = SQLiteScoreStore(tmp_path / "new.sqlite")
+    new_store.set("de", "f", (2,), 2.5)
+    new_store.import_snapshot(tmp_path / "snapshot.sqlite")
+    assert new_store.get("de", "f", (1,)) == (True, 1.5)
+    assert new_store.get("de", "f", (2,)) == (True, 2.5)
+
+
+def test_multiple_processes(tmp_path):
+    path = tmp_path / "scores.sqlite"
+    procs = [
+        multiprocessing.Process(target=write_many, args=(path, i * 50))
+        for i in range(4)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+        assert p.exitcode == 0
+
+    store = SQLiteScoreStore(path)
+    assert all(store.get("de", "newline_or_not", ("a", i))[0] for i in range(200))
@@ -0,0 +1,41 @@
+import pytest
+
+from pd3f.scorer_registry import *
+
+
+class FakeScorer:
+    def __init__(self, lang, fast):
+        torch = pytest.importorskip("torch")
+        self.lang = lang
+        self.fast = fast
+        # 12 float32 parameters -> 48 bytes
+        self.lms = [torch.nn.Linear(3, 2, bias=True), torch.nn.Linear(1, 2, bias=True)]
+
+
+def test_parse_model_name():
+    assert parse_model_name("multi-v0-fast") == ("multi-v0", True)
+    assert parse_model_name("de") == ("de", False)
+
+
+def test_registry():
+    registry = ScorerRegistry(max_bytes=100, factory=FakeScorer)
+
+    de = registry.get("de")
+    assert (de.lang, de.fast) == ("de", False)
+    assert registry.get("de") is de
+    assert registry.total_bytes() == 48
+
+    en = registry.get("en-fast")
+    assert (en.lang, en.fast) == ("en", True)
+    assert registry.loaded() == [("de", False), ("en", True)]
+
+    # `de` is used more recently, so `en-fast` gets evicted
+    registry.get("de")
+    registry.get("fr")
+    assert registry.loaded() == [("de", False), ("fr", False)]
+
+
+def test_preload():
+    registry = ScorerRegistry(max_models=1, factory=FakeScorer)
+    registry.preload("de", "en")
+    assert registry.loaded() == [("en", False)]
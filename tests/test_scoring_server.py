@@ -0,0 +1,93 @@
+import os
+import socket
+import stat
+import struct
+import threading
+from multiprocessing import AuthenticationError
+
+import pytest
+from dehyphen.dehyphen import Scorer
+
+from pd3f.scorer_registry import ScorerRegistry
+from pd3f.scoring_server import *
+
+
+class LengthScorer(Scorer):
+    """Prefers short texts"""
+
+    def __init__(self, lang, fast):
+        self.name = (lang, fast)
+
+    def score(self, texts):
+        assert min(map(len, texts)) > 1, "flair fails if there is only one character"
+        return [float(len(t)) for t in texts]
+
+    def is_split_paragraph(self, para1, para2):
+        # can't be pickled
+        raise ValueError(lambda: None)
+
+
+@pytest.fixture
+def server(tmp_path):
+    address = str(tmp_path / "pd3f.sock")
+    authkey = create_key_file(tmp_path / "pd3f.key")
+    server = ScoringServer(
+        address, authkey, registry=ScorerRegistry(factory=LengthScorer), auth_timeout=0.5
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    assert thread.is_alive()
+    server.shutdown()
+    thread.join()
+
+
+def test_remote_scorer(server):
+    scorer = RemoteScorer(server.address, "de-fast", server.authkey)
+
+    assert scorer.score(["abc", "ab"]) == [3.0, 2.0]
+    assert scorer.dehyphen_paragraph([["Zusammen-"], ["arbeit"]]) == [["Zusammenarbeit"]]
+    assert server.registry.loaded() == [("de", True)]
+
+    # errors are passed on to the client
+    with pytest.raises(AssertionError):
+        scorer.score(["a"])
+    assert scorer.score(["xyz"]) == [3.0]
+
+    with pytest.raises(RuntimeError):
+        scorer.is_split_paragraph([["a"]], [["b"]])
+    assert scorer.score(["xyz"]) == [3.0]
+
+
+def test_authentication(server, tmp_path):
+    assert stat.S_IMODE(os.stat(server.address).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(tmp_path / "pd3f.key").st_mode) == 0o600
+    assert read_key_file(tmp_path / "pd3f.key") == server.authkey
+
+    with pytest.raises(ValueError):
+        RemoteScorer(server.address, "de", None)
+    with pytest.raises(AuthenticationError):
+        RemoteScorer(server.address, "de", b"wrong").score(["ab"])
+
+
+def test_bad_clients(server):
+    scorer = RemoteScorer(server.address, "de", server.authkey)
+
+    # connects and sends nothing: the other clients are served, it gets disconnected
+    idle = socket.socket(socket.AF_UNIX)
+    idle.connect(server.address)
+    idle.settimeout(5)
+    assert RemoteScorer(server.address, "de", server.authkey).score(["ab"]) == [2.0]
+    while idle.recv(1024):
+        pass
+    idle.close()
+
+    # resets the connection during the handshake
+    for _ in range(3):
+        client = socket.socket(socket.AF_UNIX)
+        client.connect(server.address)
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        client.close()
+
+    assert scorer.score(["abc"]) == [3.0]
+    assert RemoteScorer(server.address, "de", server.authkey).score(["ab"]) == [2.0]